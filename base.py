@@ -1,82 +1,631 @@
+import configparser
 import sqlite3
-import csv
-import json
 import os
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog, scrolledtext
+from collections import deque
+# Диалоги файлов и ввода импортируются при первом использовании: быстрее запуск
+from tkinter import ttk, messagebox, scrolledtext
 from datetime import datetime
 
+from blogdb import (
+    BACKUP_DIR, BACKUP_KEEP, CONFIG_FILE, DEFAULT_EXPORT_COLUMNS, EXPORT_VIEWS,
+    IMPORT_BATCH_SIZE, REJECT_SUFFIX, SLOW_LOG_FILE, STATS_LIMIT, ArchiveRepository,
+    BulkImporter, CsvSource, ExportQuery, JsonSource, PostRepository, QueryMonitor, ReadPool,
+    ResultCache, ShardImporter, SyncImporter, UserRepository, configure_slow_log,
+    connect, create_snapshot, export_changes, export_rows, find_shards, get_cursor,
+    is_interrupted, load_config, open_database, save_cursor,
+)
+
+# Количество строк, подгружаемых в таблицу за один запрос
+PAGE_SIZE = 200
+# Доля прокрутки, после которой подгружается следующая страница
+PREFETCH_THRESHOLD = 0.9
+# Количество строк результата, передаваемых в интерфейс за раз
+STREAM_CHUNK_SIZE = 500
+# Интервал опроса очереди результатов фонового потока, мс
+POLL_INTERVAL = 50
+# Интервал обновления вкладки метрик, мс
+METRICS_REFRESH_INTERVAL = 2000
+# Количество строк результата, выводимых сразу и по кнопке "Показать еще"
+RESULTS_PAGE_SIZE = 1000
+# Количество последних строк лога в окне; более старые переносятся в файл
+LOG_MAX_LINES = 2000
+LOG_SPILL_FILE = 'operations.log'
+# Получатель журнала изменений, выгружаемого из приложения
+CHANGES_CONSUMER = 'desktop'
+
+class TaskCancelled(Exception):
+    """Фоновая задача отменена пользователем"""
+
+class DbTask:
+    """Задача фонового потока и ее обработчики в главном потоке"""
+    
+    def __init__(self, worker, job, on_done, on_error, on_progress, on_cancel,
+                 operation=None):
+        self.worker = worker
+        self.job = job
+        # Имя операции для статистики запросов
+        self.operation = operation
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.on_cancel = on_cancel
+        self.connection = None
+        self.cancelled = False
+    
+    def progress(self, value):
+        """Передача промежуточного результата в главный поток"""
+        if self.on_progress:
+            self.worker.results.put((self, self.on_progress, value))
+    
+    def check(self):
+        """Прерывание задачи, если она отменена"""
+        if self.cancelled:
+            raise TaskCancelled()
+
+class DbWorker:
+    """Фоновые потоки со своими соединениями для долгих операций с БД"""
+    
+    def __init__(self, root, db_name, monitor=None, profile=None, readers=0,
+                 poll_interval=POLL_INTERVAL):
+        self.root = root
+        self.db_name = db_name
+        self.monitor = monitor
+        self.profile = profile
+        self.poll_interval = poll_interval
+        # Изменяющие задачи выполняются по очереди одним соединением,
+        # задачи чтения - параллельно соединениями из пула
+        self.tasks = queue.Queue()
+        self.read_tasks = queue.Queue()
+        self.pool = ReadPool(db_name, readers, monitor, profile) if readers else None
+        self.results = queue.Queue()
+        self.active = set()
+        # Передача соединения задаче и его прерывание при отмене: поздняя отмена
+        # не должна прервать следующую задачу того же соединения
+        self.lock = threading.Lock()
+        self.running = True
+        
+        self.threads = [threading.Thread(target=self.loop, daemon=True)]
+        self.threads += [threading.Thread(target=self.read_loop, daemon=True)
+                         for _ in range(readers)]
+        for thread in self.threads:
+            thread.start()
+        self.root.after(self.poll_interval, self.poll)
+    
+    def submit(self, job, on_done=None, on_error=None, on_progress=None, on_cancel=None,
+               operation=None, read_only=False):
+        """Постановка задачи job(task) в очередь фонового потока"""
+        task = DbTask(self, job, on_done, on_error, on_progress, on_cancel, operation)
+        (self.read_tasks if read_only and self.pool else self.tasks).put(task)
+        return task
+    
+    def cancel(self, task):
+        """Отмена задачи; выполняющийся запрос прерывается"""
+        task.cancelled = True
+        with self.lock:
+            if task.connection:
+                task.connection.interrupt()
+    
+    def stop(self):
+        """Завершение фоновых потоков после текущих задач"""
+        self.running = False
+        for task in list(self.active):
+            self.cancel(task)
+        self.tasks.put(None)
+        for _ in self.threads[1:]:
+            self.read_tasks.put(None)
+    
+    def loop(self):
+        """Цикл выполнения изменяющих задач (фоновый поток)"""
+        connection = connect(self.db_name, self.monitor, self.profile)
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                break
+            self.execute(task, connection)
+        connection.close()
+    
+    def read_loop(self):
+        """Цикл выполнения задач чтения (фоновый поток пула)"""
+        while True:
+            task = self.read_tasks.get()
+            if task is None:
+                break
+            with self.pool.acquire() as connection:
+                self.execute(task, connection)
+        self.pool.close()
+    
+    def execute(self, task, connection):
+        """Выполнение задачи и передача результата в главный поток"""
+        self.active.add(task)
+        with self.lock:
+            task.connection = connection
+        try:
+            task.check()
+            if self.monitor:
+                with self.monitor.operation(task.operation):
+                    result = task.job(task)
+            else:
+                result = task.job(task)
+            task.check()
+            self.results.put((task, task.on_done, result))
+        except Exception as e:
+            if connection.in_transaction:
+                connection.rollback()
+            if task.cancelled or isinstance(e, TaskCancelled) or is_interrupted(e):
+                task.cancelled = True
+                self.results.put((task, task.on_cancel, None))
+            else:
+                self.results.put((task, task.on_error, e))
+        finally:
+            with self.lock:
+                task.connection = None
+            self.active.discard(task)
+    
+    def poll(self):
+        """Доставка результатов в главный поток (через root.after)"""
+        if self.running:
+            self.root.after(self.poll_interval, self.poll)
+        
+        while True:
+            try:
+                task, callback, value = self.results.get_nowait()
+            except queue.Empty:
+                break
+            # Промежуточные результаты отмененной задачи больше не нужны
+            if callback is task.on_progress and task.cancelled:
+                continue
+            if callback:
+                callback(value)
+
+class ProgressDialog:
+    """Окно прогресса долгой операции с кнопкой отмены"""
+    
+    def __init__(self, root, title, text, on_cancel, determinate=True):
+        self.window = tk.Toplevel(root)
+        self.window.title(title)
+        self.window.transient(root)
+        self.window.resizable(False, False)
+        
+        ttk.Label(self.window, text=text).pack(padx=10, pady=5)
+        self.bar = ttk.Progressbar(self.window, length=300, maximum=100,
+                                   mode='determinate' if determinate else 'indeterminate')
+        self.bar.pack(padx=10, pady=5)
+        if not determinate:
+            self.bar.start(10)
+        self.status = ttk.Label(self.window, text="Подготовка...")
+        self.status.pack(padx=10, pady=5)
+        
+        ttk.Button(self.window, text="Отмена", command=on_cancel).pack(pady=5)
+        self.window.protocol("WM_DELETE_WINDOW", on_cancel)
+    
+    def update(self, fraction=None, status=None):
+        """Обновление полосы прогресса и подписи"""
+        if fraction is not None:
+            self.bar['value'] = fraction * 100
+        if status is not None:
+            self.status['text'] = status
+    
+    def close(self):
+        """Закрытие окна"""
+        self.window.destroy()
+
+class ExportDialog:
+    """Окно выбора источника, столбцов и фильтров экспорта"""
+    
+    # Типы файлов экспорта: формат и сжатие определяются по расширению
+    FILETYPES = [
+        ("CSV files", "*.csv"),
+        ("CSV gzip", "*.csv.gz"),
+        ("CSV zstd", "*.csv.zst"),
+        ("JSON files", "*.json"),
+        ("JSON Lines", "*.jsonl *.jsonl.gz"),
+        ("All files", "*.*"),
+    ]
+    
+    def __init__(self, root, on_export, view='users'):
+        # on_export(query, filename) вызывается после выбора файла
+        self.on_export = on_export
+        self.views = list(EXPORT_VIEWS)
+        self.window = tk.Toplevel(root)
+        self.window.title("Экспорт данных")
+        self.window.transient(root)
+        
+        source_frame = ttk.LabelFrame(self.window, text="Источник", padding=10)
+        source_frame.pack(fill='x', padx=10, pady=5)
+        self.view_box = ttk.Combobox(source_frame, state='readonly', width=30,
+                                     values=[EXPORT_VIEWS[name]['title'] for name in self.views])
+        self.view_box.current(self.views.index(view))
+        self.view_box.bind('<<ComboboxSelected>>', lambda event: self.fill_columns())
+        self.view_box.pack(fill='x')
+        
+        columns_frame = ttk.LabelFrame(self.window, text="Столбцы", padding=10)
+        columns_frame.pack(fill='both', expand=True, padx=10, pady=5)
+        self.columns_list = tk.Listbox(columns_frame, selectmode='multiple', height=7,
+                                       exportselection=False)
+        self.columns_list.pack(fill='both', expand=True)
+        
+        filters_frame = ttk.LabelFrame(self.window, text="Фильтры", padding=10)
+        filters_frame.pack(fill='x', padx=10, pady=5)
+        self.filter_entries = {}
+        for row, (name, label) in enumerate([('user_id', "ID автора:"),
+                                             ('since', "Дата с (ГГГГ-ММ-ДД):"),
+                                             ('until', "Дата до (ГГГГ-ММ-ДД):"),
+                                             ('contains', "Содержит текст:")]):
+            ttk.Label(filters_frame, text=label).grid(row=row, column=0, sticky='w', padx=5, pady=2)
+            entry = ttk.Entry(filters_frame, width=25)
+            entry.grid(row=row, column=1, padx=5, pady=2)
+            self.filter_entries[name] = entry
+        
+        button_frame = ttk.Frame(self.window)
+        button_frame.pack(fill='x', padx=10, pady=5)
+        ttk.Button(button_frame, text="Экспортировать...", 
+                  command=self.export).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Отмена", 
+                  command=self.window.destroy).pack(side='left', padx=5)
+        
+        self.fill_columns()
+    
+    @property
+    def view(self):
+        """Выбранный источник"""
+        return self.views[self.view_box.current()]
+    
+    def fill_columns(self):
+        """Столбцы выбранного источника; отмечены столбцы по умолчанию"""
+        self.columns_list.delete(0, 'end')
+        for index, column in enumerate(EXPORT_VIEWS[self.view]['columns']):
+            self.columns_list.insert('end', column)
+            if column in DEFAULT_EXPORT_COLUMNS[self.view]:
+                self.columns_list.selection_set(index)
+    
+    def export(self):
+        """Проверка параметров, выбор файла и запуск экспорта"""
+        from tkinter import filedialog
+        columns = [self.columns_list.get(index) for index in self.columns_list.curselection()]
+        if not columns:
+            messagebox.showwarning("Предупреждение", "Выберите хотя бы один столбец",
+                                   parent=self.window)
+            return
+        
+        filters = {name: entry.get().strip() for name, entry in self.filter_entries.items()}
+        if filters['user_id'] and not filters['user_id'].isdigit():
+            messagebox.showerror("Ошибка", "ID автора должен быть числом", parent=self.window)
+            return
+        
+        try:
+            query = ExportQuery(self.view, columns, filters)
+            # Условия проверяются до выбора файла
+            query.where()
+        except ValueError as e:
+            messagebox.showerror("Ошибка", str(e), parent=self.window)
+            return
+        
+        filename = filedialog.asksaveasfilename(parent=self.window, defaultextension=".csv",
+                                                filetypes=self.FILETYPES)
+        if filename:
+            self.window.destroy()
+            self.on_export(query, filename)
+
+class TreePager:
+    """Постраничная подгрузка строк в Treeview по мере прокрутки"""
+    
+    def __init__(self, tree, scrollbar, fetch_page, tags_for=None, page_size=PAGE_SIZE):
+        self.tree = tree
+        self.scrollbar = scrollbar
+        # fetch_page(after_id, limit) возвращает строки с id > after_id
+        self.fetch_page = fetch_page
+        # tags_for(row) возвращает теги строки (например, id автора поста)
+        self.tags_for = tags_for
+        self.page_size = page_size
+        self.last_id = 0
+        self.exhausted = False
+        self.pending = False
+        
+        self.tree.configure(yscrollcommand=self.on_scroll)
+    
+    def reload(self, rows):
+        """Замена содержимого таблицы первой страницей, прочитанной заранее"""
+        self.tree.delete(*self.tree.get_children())
+        self.last_id = 0
+        self.exhausted = False
+        self.fill(rows)
+    
+    def load_more(self):
+        """Загрузка следующей страницы (keyset-пагинация по id)"""
+        self.pending = False
+        if self.exhausted:
+            return 0
+        return self.fill(self.fetch_page(self.last_id, self.page_size))
+    
+    def fill(self, rows):
+        """Добавление страницы строк в конец таблицы"""
+        for row in rows:
+            self.insert_row(row)
+        
+        if rows:
+            self.last_id = rows[-1][0]
+        if len(rows) < self.page_size:
+            self.exhausted = True
+        return len(rows)
+    
+    def insert_row(self, row):
+        """Вставка одной строки в конец таблицы"""
+        tags = self.tags_for(row) if self.tags_for else ()
+        self.tree.insert('', 'end', iid=str(row[0]), values=row, tags=tags)
+    
+    def add_row(self, row):
+        """Добавление новой строки без перезагрузки таблицы"""
+        # Пока не все страницы загружены, строка придет при прокрутке
+        if not self.exhausted or row[0] <= self.last_id:
+            return
+        self.insert_row(row)
+        self.last_id = row[0]
+    
+    def remove(self, row_id):
+        """Удаление строки из таблицы, если она загружена"""
+        self.remove_many([row_id])
+    
+    def remove_many(self, row_ids):
+        """Удаление загруженных строк одним вызовом Treeview"""
+        items = [str(row_id) for row_id in row_ids if self.tree.exists(str(row_id))]
+        if items:
+            self.tree.delete(*items)
+    
+    def update_row(self, row):
+        """Замена значений загруженной строки"""
+        if self.tree.exists(str(row[0])):
+            tags = self.tags_for(row) if self.tags_for else ()
+            self.tree.item(str(row[0]), values=row, tags=tags)
+    
+    def remove_tagged(self, tag):
+        """Удаление всех загруженных строк с указанным тегом"""
+        items = self.tree.tag_has(tag)
+        if items:
+            self.tree.delete(*items)
+    
+    def on_scroll(self, first, last):
+        """Синхронизация скроллбара и подгрузка при приближении к концу"""
+        self.scrollbar.set(first, last)
+        if float(last) >= PREFETCH_THRESHOLD and not self.exhausted and not self.pending:
+            self.pending = True
+            self.tree.after_idle(self.load_more)
+
+class LogView:
+    """Лог операций: последние строки в окне, более старые - в файле"""
+    
+    def __init__(self, spill_path=LOG_SPILL_FILE, max_lines=LOG_MAX_LINES):
+        self.spill_path = spill_path
+        self.max_lines = max_lines
+        self.text = None
+        # Строки, которые сейчас в окне (или будут выведены при его создании)
+        self.lines = deque()
+        self.pending = []
+        self.scheduled = False
+    
+    def attach(self, text):
+        """Вывод накопленных строк в созданное окно лога"""
+        self.text = text
+        self.text.insert('end', ''.join(self.lines))
+        self.text.see('end')
+    
+    def append(self, line):
+        """Добавление строки; сообщения подряд выводятся одной вставкой"""
+        self.lines.append(line)
+        if self.text is None:
+            self.trim()
+            return
+        self.pending.append(line)
+        if not self.scheduled:
+            self.scheduled = True
+            self.text.after_idle(self.flush)
+    
+    def flush(self):
+        """Вставка накопленных строк в окно"""
+        self.scheduled = False
+        if self.pending:
+            self.text.insert('end', ''.join(self.pending))
+            self.pending = []
+        self.trim()
+        self.text.see('end')
+    
+    def trim(self):
+        """Перенос старых строк в файл, когда их больше max_lines"""
+        if len(self.lines) <= self.max_lines:
+            return
+        # Запас в десятую часть: окно обрезается не на каждом сообщении
+        count = len(self.lines) - self.max_lines + self.max_lines // 10
+        old = [self.lines.popleft() for _ in range(count)]
+        try:
+            with open(self.spill_path, 'a', encoding='utf-8') as file:
+                file.writelines(old)
+        except OSError:
+            pass  # Файл недоступен: старые строки только убираются из окна
+        if self.text is not None:
+            # Сообщение может занимать несколько строк окна
+            lines = sum(line.count('\n') for line in old)
+            self.text.delete('1.0', f'{lines + 1}.0')
+
+class ResultsView:
+    """Вывод результата запроса в Text: одна вставка на пакет строк, остальное по кнопке"""
+    
+    def __init__(self, text, more_button, status_label, page_size=RESULTS_PAGE_SIZE):
+        self.text = text
+        self.more_button = more_button
+        self.status_label = status_label
+        self.page_size = page_size
+        self.render_row = None
+        # Полученные, но еще не выведенные строки
+        self.hidden = []
+        self.shown = 0
+        self.limit = page_size
+        self.scheduled = False
+        
+        self.more_button.configure(command=self.show_more)
+        self.update_controls()
+    
+    def reset(self, header, render_row):
+        """Очистка результатов перед новым запросом"""
+        self.text.delete('1.0', 'end')
+        self.text.insert('end', header)
+        self.render_row = render_row
+        self.hidden = []
+        self.shown = 0
+        self.limit = self.page_size
+        self.update_controls()
+    
+    def add(self, rows):
+        """Добавление строк; вывод откладывается до простоя, чтобы собрать их вместе"""
+        self.hidden.extend(rows)
+        if not self.scheduled:
+            self.scheduled = True
+            self.text.after_idle(self.flush)
+    
+    def flush(self):
+        """Вывод строк до текущего предела одной вставкой"""
+        self.scheduled = False
+        count = min(len(self.hidden), self.limit - self.shown)
+        if count > 0:
+            rows, self.hidden = self.hidden[:count], self.hidden[count:]
+            self.text.insert('end', ''.join(map(self.render_row, rows)))
+            self.shown += count
+        self.update_controls()
+    
+    def finish(self, empty_message):
+        """Завершение вывода; пустой результат заменяется сообщением"""
+        self.flush()
+        if not self.shown and not self.hidden:
+            self.text.insert('end', empty_message)
+    
+    def show_more(self):
+        """Вывод следующей страницы скрытых строк"""
+        self.limit = self.shown + self.page_size
+        self.flush()
+    
+    def update_controls(self):
+        """Число выведенных строк и доступность кнопки показа скрытых"""
+        if self.hidden:
+            self.status_label.configure(text=f"Показано {self.shown}, скрыто {len(self.hidden)}")
+            self.more_button.configure(state='normal')
+        else:
+            self.status_label.configure(text=f"Показано {self.shown}" if self.shown else "")
+            self.more_button.configure(state='disabled')
+
 class DatabaseApp:
     def __init__(self, root):
         self.root = root
         self.root.title("🗃️ Система управления базой данных")
         self.root.geometry("1000x700")
         
-        self.db_name = 'blog_database.db'
+        self.config = self.load_config()
+        self.db_name = self.config.db_name
         self.connection = None
-        self.cursor = None
+        self.users = None
+        self.posts = None
+        # Время запросов обоих соединений для вкладки метрик и журнала медленных запросов
+        self.monitor = QueryMonitor()
+        # Результаты отчетов вкладки запросов до изменения данных
+        self.report_cache = ResultCache()
+        # Столбцы постов для аналитики (NumPy), загружаются при первом отчете
+        self.analytics = None
+        self.worker = None
+        self.results_task = None
+        # Таблицы построенных вкладок и репозитории для их первой страницы
+        self.users_pager = None
+        self.posts_pager = None
+        self.pagers = {}
+        # Кнопки вкладок, отключенные до открытия базы
+        self.waiting_buttons = []
+        # Сообщения, выведенные до открытия вкладки файлов, хранятся в LogView
+        self.log_view = LogView()
+        self.results_view = None
         
-        self.setup_database()
         self.create_widgets()
+        # База открывается после первой отрисовки окна
+        self.root.after_idle(lambda: self.root.after(0, self.start))
+    
+    def start(self):
+        """Подключение к базе, запуск фоновых потоков и заполнение таблиц"""
+        configure_slow_log(SLOW_LOG_FILE)
+        self.setup_database()
+        # Долгие запросы, импорт и экспорт выполняются в фоновом потоке
+        self.worker = DbWorker(self.root, self.db_name, self.monitor, self.config.profile,
+                               readers=self.config.profile.readers)
+        # Кнопки вкладок, построенных до открытия базы, становятся доступны
+        if self.connection is not None:
+            for button in self.waiting_buttons:
+                button.state(['!disabled'])
+            self.waiting_buttons = []
         self.load_data()
     
+    def load_config(self):
+        """Настройки из blogdb.ini; при ошибке в файле - значения по умолчанию"""
+        try:
+            return load_config(CONFIG_FILE)
+        except (ValueError, configparser.Error) as e:
+            messagebox.showerror("Ошибка настроек", f"{CONFIG_FILE}: {e}\n"
+                                 "Используются настройки по умолчанию")
+            return load_config(None)
+    
     def setup_database(self):
         """Настройка базы данных"""
         try:
-            self.connection = sqlite3.connect(self.db_name)
-            self.cursor = self.connection.cursor()
-            
-            # Создание таблиц
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS users (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    email TEXT UNIQUE NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
-                )
-            ''')
-            
-            self.cursor.execute('''
-                CREATE TABLE IF NOT EXISTS posts (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    title TEXT NOT NULL,
-                    content TEXT NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
-                )
-            ''')
-            
-            self.connection.commit()
+            # Создание и обновление схемы до текущей версии
+            self.connection = open_database(self.db_name, self.monitor, self.config.profile)
+            self.users = UserRepository(self.connection)
+            self.posts = PostRepository(self.connection)
         except sqlite3.Error as e:
             messagebox.showerror("Ошибка базы данных", f"Ошибка: {e}")
     
     def create_widgets(self):
         """Создание интерфейса"""
         # Создание вкладок
-        notebook = ttk.Notebook(self.root)
+        self.notebook = notebook = ttk.Notebook(self.root)
         notebook.pack(fill='both', expand=True, padx=10, pady=10)
         
-        # Вкладка пользователей
-        users_frame = ttk.Frame(notebook)
-        notebook.add(users_frame, text="👥 Пользователи")
-        
-        # Вкладка постов
-        posts_frame = ttk.Frame(notebook)
-        notebook.add(posts_frame, text="📝 Посты")
-        
-        # Вкладка файлов
-        files_frame = ttk.Frame(notebook)
-        notebook.add(files_frame, text="📁 Файлы")
-        
-        # Вкладка запросов
-        queries_frame = ttk.Frame(notebook)
-        notebook.add(queries_frame, text="🔍 Запросы")
-        
-        self.setup_users_tab(users_frame)
-        self.setup_posts_tab(posts_frame)
-        self.setup_files_tab(files_frame)
-        self.setup_queries_tab(queries_frame)
+        # Содержимое вкладки строится при первом открытии
+        self.tab_builders = {}
+        for text, setup in (("👥 Пользователи", self.setup_users_tab),
+                            ("📝 Посты", self.setup_posts_tab),
+                            ("📁 Файлы", self.setup_files_tab),
+                            ("🔍 Запросы", self.setup_queries_tab),
+                            ("📈 Метрики", self.setup_metrics_tab)):
+            frame = ttk.Frame(notebook)
+            notebook.add(frame, text=text)
+            self.tab_builders[str(frame)] = (setup, frame)
+            if setup == self.setup_metrics_tab:
+                self.metrics_frame = frame
+        
+        notebook.bind('<<NotebookTabChanged>>', lambda event: self.build_tab(notebook.select()))
+        self.build_tab(notebook.select())
+    
+    def build_tab(self, tab):
+        """Построение вкладки при первом открытии"""
+        builder = self.tab_builders.pop(str(tab), None)
+        if not builder:
+            return
+        setup, frame = builder
+        pagers = set(self.pagers)
+        setup(frame)
+        # Обработчикам кнопок нужны репозитории: без открытой базы кнопки недоступны
+        if self.connection is None:
+            self.waiting_buttons.extend(self.disable_buttons(frame))
+        # Таблицы вкладки, открытой после запуска, заполняются сразу
+        new_pagers = [pager for pager in self.pagers if pager not in pagers]
+        if new_pagers and self.worker:
+            self.load_data(new_pagers)
+    
+    def disable_buttons(self, widget):
+        """Отключение доступных кнопок внутри виджета; возвращает отключенные кнопки"""
+        disabled = []
+        for child in widget.winfo_children():
+            if child.winfo_class() == 'TButton' and child.instate(['!disabled']):
+                child.state(['disabled'])
+                disabled.append(child)
+            disabled.extend(self.disable_buttons(child))
+        return disabled
     
     def setup_users_tab(self, parent):
         """Вкладка управления пользователями"""
@@ -116,7 +665,8 @@ class DatabaseApp:
         
         # Scrollbar для таблицы
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.users_tree.yview)
-        self.users_tree.configure(yscrollcommand=scrollbar.set)
+        self.users_pager = TreePager(self.users_tree, scrollbar, self.fetch_users_page)
+        self.pagers[self.users_pager] = UserRepository
         
         self.users_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -127,7 +677,7 @@ class DatabaseApp:
         
         ttk.Button(button_frame, text="Обновить", 
                   command=self.load_data).pack(side='left', padx=5)
-        ttk.Button(button_frame, text="Удалить выбранного", 
+        ttk.Button(button_frame, text="Удалить выбранных", 
                   command=self.delete_user).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Очистить форму", 
                   command=self.clear_user_form).pack(side='left', padx=5)
@@ -157,8 +707,10 @@ class DatabaseApp:
         table_frame = ttk.LabelFrame(parent, text="Список постов", padding=10)
         table_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
-        columns = ('ID', 'Title', 'Author', 'Created')
-        self.posts_tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        # Скрытый столбец UserID нужен для удаления постов вместе с автором
+        columns = ('ID', 'Title', 'Author', 'Created', 'UserID')
+        self.posts_tree = ttk.Treeview(table_frame, columns=columns, show='headings',
+                                       displaycolumns=columns[:-1])
         
         self.posts_tree.heading('ID', text='ID')
         self.posts_tree.heading('Title', text='Заголовок')
@@ -171,7 +723,9 @@ class DatabaseApp:
         self.posts_tree.column('Created', width=150)
         
         scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.posts_tree.yview)
-        self.posts_tree.configure(yscrollcommand=scrollbar.set)
+        self.posts_pager = TreePager(self.posts_tree, scrollbar, self.fetch_posts_page,
+                                     tags_for=lambda post: (self.author_tag(post[4]),))
+        self.pagers[self.posts_pager] = PostRepository
         
         self.posts_tree.pack(side='left', fill='both', expand=True)
         scrollbar.pack(side='right', fill='y')
@@ -182,8 +736,10 @@ class DatabaseApp:
         
         ttk.Button(button_frame, text="Обновить", 
                   command=self.load_data).pack(side='left', padx=5)
-        ttk.Button(button_frame, text="Удалить выбранный", 
+        ttk.Button(button_frame, text="Удалить выбранные", 
                   command=self.delete_post).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Сменить автора...", 
+                  command=self.change_post_author).pack(side='left', padx=5)
         ttk.Button(button_frame, text="Показать содержание", 
                   command=self.show_post_content).pack(side='left', padx=5)
     
@@ -193,10 +749,54 @@ class DatabaseApp:
         csv_frame = ttk.LabelFrame(parent, text="CSV операции", padding=10)
         csv_frame.pack(fill='x', padx=5, pady=5)
         
-        ttk.Button(csv_frame, text="Экспорт пользователей в CSV", 
+        ttk.Button(csv_frame, text="Экспорт в CSV (выбор данных)...", 
                   command=self.export_to_csv).pack(fill='x', pady=2)
         ttk.Button(csv_frame, text="Импорт пользователей из CSV", 
                   command=self.import_from_csv).pack(fill='x', pady=2)
+        ttk.Button(csv_frame, text="Импорт постов из CSV", 
+                  command=self.import_posts_from_csv).pack(fill='x', pady=2)
+        
+        # Параметры массового импорта
+        import_frame = ttk.LabelFrame(parent, text="Параметры импорта", padding=10)
+        import_frame.pack(fill='x', padx=5, pady=5)
+        
+        ttk.Label(import_frame, text="Строк в транзакции:").pack(side='left', padx=5)
+        self.batch_size_var = tk.IntVar(value=IMPORT_BATCH_SIZE)
+        ttk.Spinbox(import_frame, from_=100, to=100000, increment=1000, width=10,
+                    textvariable=self.batch_size_var).pack(side='left', padx=5)
+        
+        self.fast_import_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(import_frame, text="Быстрый режим (synchronous=OFF, WAL)",
+                        variable=self.fast_import_var).pack(side='left', padx=5)
+        
+        # Синхронизация: существующие строки обновляются (пользователи по email, посты по ID)
+        sync_frame = ttk.Frame(parent)
+        sync_frame.pack(fill='x', padx=15)
+        self.sync_import_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sync_frame, text="Синхронизация (обновлять существующие)",
+                        variable=self.sync_import_var).pack(side='left', padx=5)
+        self.delete_missing_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sync_frame, text="Удалять отсутствующие в файле",
+                        variable=self.delete_missing_var).pack(side='left', padx=5)
+        
+        # Пакетный импорт всех файлов каталога
+        batch_frame = ttk.LabelFrame(parent, text="Пакетный импорт (CSV/JSON из каталога)",
+                                     padding=10)
+        batch_frame.pack(fill='x', padx=5, pady=5)
+        
+        ttk.Button(batch_frame, text="Пользователи из каталога...", 
+                  command=lambda: self.import_directory('users')).pack(side='left', padx=5)
+        ttk.Button(batch_frame, text="Посты из каталога...", 
+                  command=lambda: self.import_directory('posts')).pack(side='left', padx=5)
+        
+        # Резервная копия работающей базы
+        backup_frame = ttk.LabelFrame(parent, text="Резервное копирование", padding=10)
+        backup_frame.pack(fill='x', padx=5, pady=5)
+        
+        ttk.Button(backup_frame, text="Создать резервную копию", 
+                  command=self.create_backup).pack(side='left', padx=5)
+        ttk.Label(backup_frame, text=f"Копии сохраняются в {BACKUP_DIR}/, "
+                                     f"хранятся последние {BACKUP_KEEP}").pack(side='left', padx=5)
         
         # JSON операции
         json_frame = ttk.LabelFrame(parent, text="JSON операции", padding=10)
@@ -204,15 +804,22 @@ class DatabaseApp:
         
         ttk.Button(json_frame, text="Экспорт пользователей в JSON", 
                   command=self.export_to_json).pack(fill='x', pady=2)
+        ttk.Button(json_frame, text="Экспорт постов в JSON", 
+                  command=self.export_posts_to_json).pack(fill='x', pady=2)
+        ttk.Button(json_frame, text="Экспорт изменений с прошлой выгрузки (JSON Lines)", 
+                  command=self.export_changed_rows).pack(fill='x', pady=2)
         ttk.Button(json_frame, text="Импорт пользователей из JSON", 
                   command=self.import_from_json).pack(fill='x', pady=2)
+        ttk.Button(json_frame, text="Импорт постов из JSON", 
+                  command=self.import_posts_from_json).pack(fill='x', pady=2)
         
         # Лог операций
         log_frame = ttk.LabelFrame(parent, text="Лог операций", padding=10)
         log_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
-        self.log_text = scrolledtext.ScrolledText(log_frame, height=15)
-        self.log_text.pack(fill='both', expand=True)
+        log_text = scrolledtext.ScrolledText(log_frame, height=15)
+        log_text.pack(fill='both', expand=True)
+        self.log_view.attach(log_text)
     
     def setup_queries_tab(self, parent):
         """Вкладка расширенных запросов"""
@@ -222,8 +829,19 @@ class DatabaseApp:
         
         ttk.Button(stats_frame, text="Показать статистику пользователей", 
                   command=self.show_user_stats).pack(fill='x', pady=2)
+        # Отчеты по снимку постов в массивах NumPy
+        analytics_frame = ttk.Frame(stats_frame)
+        analytics_frame.pack(fill='x', pady=2)
+        for text, command in (("Посты по дням", self.show_posts_per_day),
+                              ("Посты по часам", self.show_posts_per_hour),
+                              ("Длина постов", self.show_length_histogram),
+                              ("Авторы по объему текста", self.show_top_authors)):
+            ttk.Button(analytics_frame, text=text,
+                       command=command).pack(side='left', fill='x', expand=True)
         ttk.Button(stats_frame, text="Показать последние посты", 
                   command=self.show_recent_posts).pack(fill='x', pady=2)
+        ttk.Button(stats_frame, text="Пересчитать счетчики постов", 
+                  command=self.rebuild_counters).pack(fill='x', pady=2)
         
         # Поиск
         search_frame = ttk.LabelFrame(parent, text="Поиск", padding=10)
@@ -232,45 +850,172 @@ class DatabaseApp:
         search_input_frame = ttk.Frame(search_frame)
         search_input_frame.pack(fill='x', pady=5)
         
-        ttk.Label(search_input_frame, text="Поиск пользователей:").pack(side='left', padx=5)
-        self.search_entry = ttk.Entry(search_input_frame, width=20)
+        ttk.Label(search_input_frame, text="Поиск:").pack(side='left', padx=5)
+        self.search_entry = ttk.Entry(search_input_frame, width=30)
         self.search_entry.pack(side='left', padx=5)
-        ttk.Button(search_input_frame, text="Найти", 
+        ttk.Button(search_input_frame, text="Найти пользователей", 
                   command=self.search_users).pack(side='left', padx=5)
+        ttk.Button(search_input_frame, text="Найти посты", 
+                  command=self.search_posts).pack(side='left', padx=5)
+        # Рейтинг и поиск постов по основной и архивным базам (python -m blogdb archive)
+        self.with_archive_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(search_input_frame, text="С архивом",
+                        variable=self.with_archive_var).pack(side='left', padx=5)
         
         # Результаты запросов
         results_frame = ttk.LabelFrame(parent, text="Результаты", padding=10)
         results_frame.pack(fill='both', expand=True, padx=5, pady=5)
         
-        self.results_text = scrolledtext.ScrolledText(results_frame, height=20)
-        self.results_text.pack(fill='both', expand=True)
+        more_frame = ttk.Frame(results_frame)
+        more_frame.pack(side='bottom', fill='x', pady=(5, 0))
+        more_button = ttk.Button(more_frame, text="Показать еще")
+        more_button.pack(side='right', padx=5)
+        results_status = ttk.Label(more_frame)
+        results_status.pack(side='left', padx=5)
+        
+        results_text = scrolledtext.ScrolledText(results_frame, height=20)
+        results_text.pack(fill='both', expand=True)
+        self.results_view = ResultsView(results_text, more_button, results_status)
+    
+    def setup_metrics_tab(self, parent):
+        """Вкладка статистики выполнения запросов"""
+        table_frame = ttk.LabelFrame(parent, text="Запросы (самые затратные первыми)", padding=10)
+        table_frame.pack(fill='both', expand=True, padx=5, pady=5)
+        
+        columns = ('Operation', 'Query', 'Calls', 'Total', 'Average', 'Max', 'Rows', 'Slow')
+        self.metrics_tree = ttk.Treeview(table_frame, columns=columns, show='headings')
+        
+        self.metrics_tree.heading('Operation', text='Операция')
+        self.metrics_tree.heading('Query', text='Запрос')
+        self.metrics_tree.heading('Calls', text='Вызовов')
+        self.metrics_tree.heading('Total', text='Всего, мс')
+        self.metrics_tree.heading('Average', text='Среднее, мс')
+        self.metrics_tree.heading('Max', text='Макс., мс')
+        self.metrics_tree.heading('Rows', text='Строк')
+        self.metrics_tree.heading('Slow', text='Медленных')
+        
+        self.metrics_tree.column('Operation', width=120)
+        self.metrics_tree.column('Query', width=350)
+        for column in columns[2:]:
+            self.metrics_tree.column(column, width=70, anchor='e')
+        
+        scrollbar = ttk.Scrollbar(table_frame, orient='vertical', command=self.metrics_tree.yview)
+        self.metrics_tree.configure(yscrollcommand=scrollbar.set)
+        
+        self.metrics_tree.pack(side='left', fill='both', expand=True)
+        scrollbar.pack(side='right', fill='y')
+        
+        # Кнопки управления
+        button_frame = ttk.Frame(parent)
+        button_frame.pack(fill='x', padx=5, pady=5)
+        
+        ttk.Button(button_frame, text="Обновить", 
+                  command=self.refresh_metrics).pack(side='left', padx=5)
+        ttk.Button(button_frame, text="Сбросить", 
+                  command=self.reset_metrics).pack(side='left', padx=5)
+        threshold = self.monitor.slow_threshold * 1000
+        ttk.Label(button_frame, text=f"Запросы дольше {threshold:.0f} мс записываются "
+                                     f"в {SLOW_LOG_FILE}").pack(side='left', padx=5)
+        self.cache_label = ttk.Label(button_frame)
+        self.cache_label.pack(side='right', padx=5)
+        
+        self.root.after(METRICS_REFRESH_INTERVAL, self.schedule_metrics)
     
     def log_message(self, message):
         """Добавление сообщения в лог"""
         timestamp = datetime.now().strftime("%H:%M:%S")
-        self.log_text.insert('end', f"[{timestamp}] {message}\n")
-        self.log_text.see('end')
-    
-    def load_data(self):
-        """Загрузка данных в таблицы"""
-        # Загрузка пользователей
-        self.users_tree.delete(*self.users_tree.get_children())
-        self.cursor.execute("SELECT * FROM users ORDER BY id")
-        for user in self.cursor.fetchall():
-            self.users_tree.insert('', 'end', values=user)
-        
-        # Загрузка постов
-        self.posts_tree.delete(*self.posts_tree.get_children())
-        self.cursor.execute('''
-            SELECT p.id, p.title, u.name, p.created_at 
-            FROM posts p 
-            JOIN users u ON p.user_id = u.id 
-            ORDER BY p.id
-        ''')
-        for post in self.cursor.fetchall():
-            self.posts_tree.insert('', 'end', values=post)
-        
-        self.log_message("Данные загружены")
+        self.log_view.append(f"[{timestamp}] {message}\n")
+    
+    def load_data(self, pagers=None):
+        """Фоновая загрузка первых страниц построенных таблиц"""
+        pagers = list(pagers or self.pagers)
+        remaining = [len(pagers)]
+        
+        def fill(pager, rows):
+            pager.reload(rows)
+            remaining[0] -= 1
+            if not remaining[0]:
+                self.log_message("Данные загружены")
+        
+        # Остальные страницы подгружаются при прокрутке
+        for pager in pagers:
+            repository = self.pagers[pager]
+            self.run_in_background(
+                lambda task, repository=repository, size=pager.page_size:
+                    repository(task.connection).page(0, size),
+                on_done=lambda rows, pager=pager: fill(pager, rows),
+                error_title="Ошибка базы данных", operation='load_data', read_only=True
+            )
+    
+    def fetch_users_page(self, after_id, limit):
+        """Страница пользователей с id больше after_id"""
+        with self.monitor.operation('load_data'):
+            return self.users.page(after_id, limit)
+    
+    def fetch_posts_page(self, after_id, limit):
+        """Страница постов с id больше after_id"""
+        with self.monitor.operation('load_data'):
+            return self.posts.page(after_id, limit)
+    
+    # Метрики запросов
+    
+    def refresh_metrics(self):
+        """Вывод накопленной статистики запросов"""
+        self.metrics_tree.delete(*self.metrics_tree.get_children())
+        for row in self.monitor.snapshot():
+            self.metrics_tree.insert('', 'end', values=row)
+        self.cache_label['text'] = (f"Кэш отчетов: попаданий {self.report_cache.hits}, "
+                                    f"промахов {self.report_cache.misses}")
+    
+    def schedule_metrics(self):
+        """Периодическое обновление открытой вкладки метрик"""
+        self.root.after(METRICS_REFRESH_INTERVAL, self.schedule_metrics)
+        if self.notebook.select() == str(self.metrics_frame):
+            self.refresh_metrics()
+    
+    def reset_metrics(self):
+        """Сброс статистики запросов"""
+        self.monitor.reset()
+        self.refresh_metrics()
+        self.log_message("Статистика запросов сброшена")
+    
+    # Инкрементальное обновление таблиц после изменений
+    
+    @staticmethod
+    def author_tag(user_id):
+        """Тег строк постов, принадлежащих пользователю"""
+        return f"user-{user_id}"
+    
+    def on_user_added(self, user):
+        """Добавление нового пользователя в таблицу"""
+        if self.users_pager:
+            self.users_pager.add_row(user)
+    
+    def on_users_deleted(self, user_ids):
+        """Удаление пользователей и их постов из таблиц"""
+        if self.users_pager:
+            self.users_pager.remove_many(user_ids)
+        if self.posts_pager:
+            for user_id in user_ids:
+                self.posts_pager.remove_tagged(self.author_tag(user_id))
+    
+    def on_post_added(self, post):
+        """Добавление нового поста в таблицу"""
+        if self.posts_pager:
+            self.posts_pager.add_row(post)
+    
+    def on_posts_deleted(self, post_ids):
+        """Удаление постов из таблицы"""
+        self.posts_pager.remove_many(post_ids)
+    
+    def on_posts_moved(self, post_ids, user):
+        """Новый автор у загруженных строк постов"""
+        user_id, name = user[0], user[1]
+        for post_id in post_ids:
+            item = str(post_id)
+            if self.posts_tree.exists(item):
+                post_id, title, _, created_at, _ = self.posts_tree.item(item)['values']
+                self.posts_pager.update_row((post_id, title, name, created_at, user_id))
     
     def add_user(self):
         """Добавление нового пользователя"""
@@ -281,33 +1026,59 @@ class DatabaseApp:
             messagebox.showwarning("Предупреждение", "Заполните все поля")
             return
         
-        try:
-            self.cursor.execute(
-                "INSERT INTO users (name, email) VALUES (?, ?)", 
-                (name, email)
-            )
-            self.connection.commit()
+        # Запись идет через очередь фонового потока: пока другая задача держит
+        # блокировку записи, окно не ждет busy_timeout
+        def job(task):
+            users = UserRepository(task.connection)
+            try:
+                user_id = users.add(name, email)
+            finally:
+                self.report_cache.invalidate('users')
+            return users.get(user_id)
+        
+        def on_done(user):
             self.log_message(f"Добавлен пользователь: {name} ({email})")
             self.clear_user_form()
-            self.load_data()
-        except sqlite3.IntegrityError:
-            messagebox.showerror("Ошибка", "Пользователь с таким email уже существует")
+            self.on_user_added(user)
+        
+        def on_error(error):
+            if isinstance(error, sqlite3.IntegrityError):
+                messagebox.showerror("Ошибка", "Пользователь с таким email уже существует")
+            else:
+                messagebox.showerror("Ошибка базы данных", f"Ошибка: {error}")
+        
+        self.worker.submit(job, on_done=on_done, on_error=on_error, operation='add_user')
     
     def delete_user(self):
-        """Удаление выбранного пользователя"""
+        """Удаление выбранных пользователей одним запросом"""
         selected = self.users_tree.selection()
         if not selected:
             messagebox.showwarning("Предупреждение", "Выберите пользователя для удаления")
             return
         
-        user_id = self.users_tree.item(selected[0])['values'][0]
-        user_name = self.users_tree.item(selected[0])['values'][1]
+        user_ids = [int(item) for item in selected]
+        if len(selected) == 1:
+            user_name = self.users_tree.item(selected[0])['values'][1]
+            question = f"Удалить пользователя {user_name}?"
+            done_message = f"Удален пользователь: {user_name}"
+        else:
+            question = f"Удалить выбранных пользователей ({len(selected)}) вместе с их постами?"
+            done_message = "Удалено пользователей: {}"
+        if not messagebox.askyesno("Подтверждение", question):
+            return
         
-        if messagebox.askyesno("Подтверждение", f"Удалить пользователя {user_name}?"):
-            self.cursor.execute("DELETE FROM users WHERE id = ?", (user_id,))
-            self.connection.commit()
-            self.log_message(f"Удален пользователь: {user_name}")
-            self.load_data()
+        def job(task):
+            try:
+                return UserRepository(task.connection).delete_many(user_ids)
+            finally:
+                self.report_cache.invalidate('users', 'posts')
+        
+        def on_done(deleted):
+            self.log_message(done_message.format(deleted))
+            self.on_users_deleted(user_ids)
+        
+        self.run_in_background(job, on_done, error_title="Ошибка удаления",
+                               operation='delete_users')
     
     def add_post(self):
         """Добавление нового поста"""
@@ -325,39 +1096,93 @@ class DatabaseApp:
             messagebox.showerror("Ошибка", "ID автора должен быть числом")
             return
         
-        # Проверка существования пользователя
-        self.cursor.execute("SELECT id FROM users WHERE id = ?", (user_id,))
-        if not self.cursor.fetchone():
-            messagebox.showerror("Ошибка", f"Пользователь с ID {user_id} не существует")
-            return
-        
-        try:
-            self.cursor.execute(
-                "INSERT INTO posts (title, content, user_id) VALUES (?, ?, ?)",
-                (title, content, user_id)
-            )
-            self.connection.commit()
+        def job(task):
+            # Проверка существования пользователя
+            if not UserRepository(task.connection).exists(user_id):
+                return None
+            posts = PostRepository(task.connection)
+            try:
+                post_id = posts.add(title, content, user_id)
+            finally:
+                # Триггер увеличивает счетчик постов автора
+                self.report_cache.invalidate('posts', 'users')
+            return posts.get(post_id)
+        
+        def on_done(post):
+            if post is None:
+                messagebox.showerror("Ошибка", f"Пользователь с ID {user_id} не существует")
+                return
             self.log_message(f"Добавлен пост: {title}")
             self.clear_post_form()
-            self.load_data()
-        except sqlite3.Error as e:
-            messagebox.showerror("Ошибка базы данных", f"Ошибка: {e}")
+            self.on_post_added(post)
+        
+        self.run_in_background(job, on_done, error_title="Ошибка базы данных",
+                               operation='add_post')
     
     def delete_post(self):
-        """Удаление выбранного поста"""
+        """Удаление выбранных постов одним запросом"""
         selected = self.posts_tree.selection()
         if not selected:
             messagebox.showwarning("Предупреждение", "Выберите пост для удаления")
             return
         
-        post_id = self.posts_tree.item(selected[0])['values'][0]
-        post_title = self.posts_tree.item(selected[0])['values'][1]
+        post_ids = [int(item) for item in selected]
+        if len(selected) == 1:
+            post_title = self.posts_tree.item(selected[0])['values'][1]
+            question = f"Удалить пост '{post_title}'?"
+            done_message = f"Удален пост: {post_title}"
+        else:
+            question = f"Удалить выбранные посты ({len(selected)})?"
+            done_message = "Удалено постов: {}"
+        if not messagebox.askyesno("Подтверждение", question):
+            return
         
-        if messagebox.askyesno("Подтверждение", f"Удалить пост '{post_title}'?"):
-            self.cursor.execute("DELETE FROM posts WHERE id = ?", (post_id,))
-            self.connection.commit()
-            self.log_message(f"Удален пост: {post_title}")
-            self.load_data()
+        def job(task):
+            try:
+                return PostRepository(task.connection).delete_many(post_ids)
+            finally:
+                self.report_cache.invalidate('posts', 'users')
+        
+        def on_done(deleted):
+            self.log_message(done_message.format(deleted))
+            self.on_posts_deleted(post_ids)
+        
+        self.run_in_background(job, on_done, error_title="Ошибка удаления",
+                               operation='delete_posts')
+    
+    def change_post_author(self):
+        """Смена автора выбранных постов одним запросом"""
+        from tkinter import simpledialog
+        selected = self.posts_tree.selection()
+        if not selected:
+            messagebox.showwarning("Предупреждение", "Выберите посты")
+            return
+        
+        user_id = simpledialog.askinteger(
+            "Смена автора", f"ID нового автора для постов ({len(selected)}):",
+            parent=self.root, minvalue=1
+        )
+        if user_id is None:
+            return
+        user = self.users.get(user_id)
+        if not user:
+            messagebox.showerror("Ошибка", "Пользователь с таким ID не найден")
+            return
+        
+        post_ids = [int(item) for item in selected]
+        
+        def job(task):
+            try:
+                return PostRepository(task.connection).set_author(post_ids, user_id)
+            finally:
+                self.report_cache.invalidate('posts', 'users')
+        
+        def on_done(changed):
+            self.log_message(f"Автор {user[1]} назначен постам: {changed}")
+            self.on_posts_moved(post_ids, user)
+        
+        self.run_in_background(job, on_done, error_title="Ошибка смены автора",
+                               operation='change_post_author')
     
     def show_post_content(self):
         """Показать содержание выбранного поста"""
@@ -368,179 +1193,525 @@ class DatabaseApp:
         
         post_id = self.posts_tree.item(selected[0])['values'][0]
         
-        self.cursor.execute("SELECT content FROM posts WHERE id = ?", (post_id,))
-        content = self.cursor.fetchone()[0]
-        
         # Создаем окно для показа содержания
         content_window = tk.Toplevel(self.root)
         content_window.title("Содержание поста")
         content_window.geometry("500x400")
         
         text_widget = scrolledtext.ScrolledText(content_window, wrap='word')
-        text_widget.insert('1.0', content)
-        text_widget.config(state='disabled')
         text_widget.pack(fill='both', expand=True, padx=10, pady=10)
+        
+        # Текст читается из базы частями: окно открывается сразу и для больших постов
+        chunks = self.posts.iter_content(post_id)
+        
+        def show_chunk():
+            # Окно закрыто до окончания чтения
+            if not content_window.winfo_exists():
+                chunks.close()
+                return
+            try:
+                chunk = next(chunks, None)
+            except (sqlite3.Error, ValueError) as e:
+                # Пост изменен или удален во время чтения: sqlite3.Blob больше недействителен
+                chunks.close()
+                text_widget.insert('end', "\n\n[Чтение прервано]")
+                text_widget.config(state='disabled')
+                self.log_message(f"Ошибка чтения поста {post_id}: {e}")
+                return
+            if chunk is None:
+                text_widget.config(state='disabled')
+                return
+            text_widget.insert('end', chunk)
+            content_window.after_idle(show_chunk)
+        
+        show_chunk()
     
-    def export_to_csv(self):
-        """Экспорт пользователей в CSV"""
+    # Фоновое выполнение операций
+    
+    def run_in_background(self, job, on_done=None, on_progress=None, on_cancel=None,
+                          error_title="Ошибка", operation=None, read_only=False):
+        """Выполнение job(task) в фоновом потоке с выводом ошибки в окно"""
+        def on_error(error):
+            messagebox.showerror(error_title, f"Ошибка: {error}")
+        
+        return self.worker.submit(job, on_done=on_done, on_error=on_error,
+                                  on_progress=on_progress, on_cancel=on_cancel,
+                                  operation=operation, read_only=read_only)
+    
+    def stream_results(self, header, query, render_row, empty_message, log_text,
+                       operation=None, cache_key=None, tables=()):
+        """Фоновый запрос с выводом строк в результаты по мере поступления"""
+        # Незавершенный предыдущий запрос больше не нужен
+        if self.results_task and not self.results_task.cancelled:
+            self.worker.cancel(self.results_task)
+        
+        self.results_view.reset(header, render_row)
+        
+        def job(task):
+            # Отчет с ключом cache_key берется из кэша, пока не изменились его таблицы
+            if cache_key is not None:
+                cached, stamp = self.report_cache.lookup(task.connection, cache_key, tables)
+                if cached is not None:
+                    for start in range(0, len(cached), STREAM_CHUNK_SIZE):
+                        task.progress(cached[start:start + STREAM_CHUNK_SIZE])
+                    return len(cached), True
+            
+            # query(connection) возвращает курсор с результатом или готовый список строк
+            cursor = query(task.connection)
+            if isinstance(cursor, list):
+                for start in range(0, len(cursor), STREAM_CHUNK_SIZE):
+                    task.progress(cursor[start:start + STREAM_CHUNK_SIZE])
+                return len(cursor), False
+            result = []
+            while True:
+                rows = cursor.fetchmany(STREAM_CHUNK_SIZE)
+                if not rows:
+                    break
+                task.check()
+                task.progress(rows)
+                result.extend(rows)
+            
+            if cache_key is not None:
+                self.report_cache.store(cache_key, stamp, result)
+            return len(result), False
+        
+        def on_rows(rows):
+            if self.results_task.job is job:
+                self.results_view.add(rows)
+        
+        def on_done(result):
+            # Результат устаревшего запроса не выводится
+            if self.results_task.job is not job:
+                return
+            _, cached = result
+            self.results_view.finish(empty_message)
+            self.log_message(f"{log_text} (из кэша)" if cached else log_text)
+        
+        self.results_task = self.run_in_background(job, on_done=on_done, on_progress=on_rows,
+                                                   error_title="Ошибка базы данных",
+                                                   operation=operation, read_only=True)
+    
+    def run_export(self, query, filename, operation=None):
+        """Фоновый постраничный экспорт выборки; формат и сжатие по расширению файла"""
+        self.start_export(
+            lambda task: export_rows(task.connection, filename, query, check=task.check),
+            filename, operation
+        )
+    
+    def start_export(self, job, filename, operation=None, on_exported=None):
+        """Фоновая запись файла экспорта с окном ожидания и возможностью отмены"""
+        def on_done(result):
+            dialog.close()
+            count = on_exported(result) if on_exported else result
+            self.log_message(f"Экспортировано записей: {count} в {filename}")
+            messagebox.showinfo("Успех", "Данные успешно экспортированы")
+        
+        def on_cancel(_):
+            dialog.close()
+            # Недописанный файл удаляется
+            if os.path.exists(filename):
+                os.remove(filename)
+            self.log_message(f"Экспорт отменен: {filename}")
+        
+        def on_error(error):
+            dialog.close()
+            messagebox.showerror("Ошибка", f"Ошибка экспорта: {error}")
+        
+        # Экспорт читает через пул и не ждет завершения импорта
+        task = self.worker.submit(job, on_done=on_done, on_error=on_error, on_cancel=on_cancel,
+                                  operation=operation, read_only=True)
+        dialog = ProgressDialog(self.root, "Экспорт данных",
+                                f"Экспорт в {os.path.basename(filename)}",
+                                lambda: self.worker.cancel(task), determinate=False)
+    
+    def export_changed_rows(self):
+        """Выгрузка изменений users и posts с прошлой выгрузки из приложения"""
+        from tkinter import filedialog
         filename = filedialog.asksaveasfilename(
-            defaultextension=".csv",
-            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
+            defaultextension=".jsonl",
+            filetypes=[("JSON Lines", "*.jsonl"), ("JSON Lines gzip", "*.jsonl.gz"),
+                       ("All files", "*.*")]
         )
+        if not filename:
+            return
         
-        if filename:
-            try:
-                users = self.cursor.execute("SELECT * FROM users").fetchall()
-                with open(filename, 'w', newline='', encoding='utf-8') as file:
-                    writer = csv.writer(file)
-                    writer.writerow(['ID', 'Name', 'Email', 'Created At'])
-                    writer.writerows(users)
-                
-                self.log_message(f"Данные экспортированы в {filename}")
-                messagebox.showinfo("Успех", "Данные успешно экспортированы в CSV")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка экспорта: {e}")
+        def job(task):
+            since = get_cursor(task.connection, CHANGES_CONSUMER) or 0
+            return export_changes(task.connection, filename, since=since)
+        
+        def on_exported(result):
+            # Курсор сдвигается только после успешной записи файла
+            count, until = result
+            save_cursor(self.connection, CHANGES_CONSUMER, until)
+            return count
+        
+        self.start_export(job, filename, 'export_changes', on_exported)
+    
+    def create_backup(self):
+        """Резервная копия базы без остановки работы с ней"""
+        def job(task):
+            path, backup = create_snapshot(task.connection, self.db_name, check=task.check)
+            return path, backup.summary()
+        
+        def on_done(result):
+            dialog.close()
+            path, stats = result
+            self.log_message(f"Резервная копия: {path} ({stats['pages']} страниц за "
+                             f"{stats['elapsed_s']} с, перезапусков {stats['restarts']}, "
+                             f"блокировка на шаг до {stats['lock_max_ms']} мс)")
+        
+        def on_cancel(_):
+            dialog.close()
+            self.log_message("Резервное копирование отменено")
+        
+        def on_error(error):
+            dialog.close()
+            messagebox.showerror("Ошибка", f"Ошибка резервного копирования: {error}")
+        
+        # Копия читается через пул и не останавливает запись
+        task = self.worker.submit(job, on_done=on_done, on_error=on_error, on_cancel=on_cancel,
+                                  operation='backup', read_only=True)
+        dialog = ProgressDialog(self.root, "Резервное копирование",
+                                f"Копирование {os.path.basename(self.db_name)}",
+                                lambda: self.worker.cancel(task), determinate=False)
+    
+    def export_to_csv(self):
+        """Экспорт с выбором источника, столбцов и фильтров"""
+        ExportDialog(self.root, lambda query, filename: self.run_export(
+            query, filename, f"export_{query.view}"
+        ))
     
     def import_from_csv(self):
         """Импорт пользователей из CSV"""
+        self.import_csv_table('users')
+    
+    def import_posts_from_csv(self):
+        """Импорт постов из CSV"""
+        self.import_csv_table('posts')
+    
+    def import_csv_table(self, table):
+        """Массовый импорт CSV в указанную таблицу"""
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
             filetypes=[("CSV files", "*.csv"), ("All files", "*.*")]
         )
         
-        if filename:
+        importer = self.create_importer(table, filename) if filename else None
+        if importer:
+            self.run_import(importer, CsvSource(filename), filename)
+    
+    def import_batch_size(self):
+        """Строк в транзакции из параметров импорта"""
+        try:
+            return self.batch_size_var.get()
+        except tk.TclError:
+            return IMPORT_BATCH_SIZE
+    
+    def import_sync_options(self, table):
+        """Режим синхронизации из параметров импорта; None, если импорт отменен"""
+        if not self.sync_import_var.get():
+            return {}
+        delete_missing = self.delete_missing_var.get()
+        if delete_missing:
+            message = "Удалить строки, которых нет в файле?"
+            if table == 'users':
+                message += "\nПосты удаленных пользователей тоже будут удалены."
+            if not messagebox.askyesno("Подтверждение", message):
+                return None
+        return {'sync': True, 'delete_missing': delete_missing}
+    
+    def create_importer(self, table, filename):
+        """Импортер с параметрами из вкладки файлов (None, если импорт отменен)"""
+        sync = self.import_sync_options(table)
+        if sync is None:
+            return None
+        options = {
+            'batch_size': self.import_batch_size(),
+            'fast': self.fast_import_var.get(),
+            'reject_path': filename + REJECT_SUFFIX,
+        }
+        if sync:
+            return SyncImporter(table, delete_missing=sync['delete_missing'], **options)
+        return BulkImporter(table, **options)
+    
+    def import_directory(self, table):
+        """Параллельный импорт всех CSV/JSON-файлов каталога"""
+        from tkinter import filedialog
+        directory = filedialog.askdirectory()
+        if not directory:
+            return
+        
+        filenames = find_shards(directory)
+        if not filenames:
+            messagebox.showwarning("Предупреждение", "В каталоге нет файлов CSV/JSON")
+            return
+        
+        sync = self.import_sync_options(table)
+        if sync is None:
+            return
+        importer = ShardImporter(
+            table,
+            batch_size=self.import_batch_size(),
+            fast=self.fast_import_var.get(),
+            # Отчет пишется рядом с базой: в каталоге его подхватил бы следующий импорт,
+            # а дочерние процессы могут еще читать файлы каталога
+            reject_path=os.path.join(os.path.dirname(os.path.abspath(self.db_name)),
+                                     f'{os.path.basename(os.path.normpath(directory))}.'
+                                     f'{table}{REJECT_SUFFIX}'),
+            **sync
+        )
+        self.run_import(importer, filenames, directory, importer.progress)
+    
+    def run_import(self, importer, source, filename, progress=None):
+        """Фоновый импорт с окном прогресса и возможностью отмены"""
+        # Доля выполненной работы: по умолчанию позиция в файле источника
+        progress = progress or source.progress
+        
+        def job(task):
+            steps = importer.run(task.connection, source)
             try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    reader = csv.reader(file)
-                    next(reader)  # Пропускаем заголовок
-                    
-                    for row in reader:
-                        if len(row) >= 3:
-                            try:
-                                self.cursor.execute(
-                                    "INSERT OR IGNORE INTO users (name, email) VALUES (?, ?)",
-                                    (row[1], row[2])
-                                )
-                            except:
-                                continue
-                
-                self.connection.commit()
-                self.log_message(f"Данные импортированы из {filename}")
-                self.load_data()
-                messagebox.showinfo("Успех", "Данные успешно импортированы из CSV")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка импорта: {e}")
+                for processed in steps:
+                    task.check()
+                    task.progress((processed, progress()))
+            finally:
+                steps.close()
+                # Зафиксированные пакеты видны следующим задачам сразу,
+                # поэтому кэш сбрасывается здесь, а не в главном потоке
+                self.report_cache.invalidate('users', 'posts')
+        
+        def on_progress(value):
+            processed, fraction = value
+            dialog.update(fraction, f"Обработано строк: {processed}")
+        
+        def finish(message):
+            dialog.close()
+            self.log_message(f"{message} ({filename}): {importer.summary()}")
+            for shard, error in getattr(importer, 'failed', ()):
+                self.log_message(f"Ошибка в файле {shard}: {error}")
+            if importer.rejected:
+                self.log_message(f"Отклоненные строки: {importer.reject_path}")
+            self.load_data()
+        
+        def on_done(_):
+            finish("Данные импортированы")
+            messagebox.showinfo("Успех", f"Импорт завершен: {importer.summary()}")
+        
+        def on_error(error):
+            finish("Импорт прерван")
+            messagebox.showerror("Ошибка", f"Ошибка импорта: {error}")
+        
+        task = self.worker.submit(job, on_done=on_done, on_error=on_error,
+                                  on_progress=on_progress,
+                                  on_cancel=lambda _: finish("Импорт отменен"),
+                                  operation=f"import_{importer.table}")
+        dialog = ProgressDialog(self.root, "Импорт данных",
+                                f"Импорт из {os.path.basename(filename)}",
+                                lambda: self.worker.cancel(task))
     
     def export_to_json(self):
         """Экспорт пользователей в JSON"""
+        self.export_json_table('users')
+    
+    def export_posts_to_json(self):
+        """Экспорт постов в JSON"""
+        self.export_json_table('posts')
+    
+    def export_json_table(self, table):
+        """Потоковый экспорт таблицы в JSON-массив или JSON Lines"""
+        from tkinter import filedialog
         filename = filedialog.asksaveasfilename(
             defaultextension=".json",
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("JSON files", "*.json"), ("JSON Lines", "*.jsonl *.ndjson"),
+                       ("JSON gzip", "*.json.gz *.jsonl.gz"), ("All files", "*.*")]
         )
         
         if filename:
-            try:
-                users = self.cursor.execute("SELECT * FROM users").fetchall()
-                columns = ['id', 'name', 'email', 'created_at']
-                result = [dict(zip(columns, user)) for user in users]
-                
-                with open(filename, 'w', encoding='utf-8') as file:
-                    json.dump(result, file, indent=2, ensure_ascii=False)
-                
-                self.log_message(f"Данные экспортированы в {filename}")
-                messagebox.showinfo("Успех", "Данные успешно экспортированы в JSON")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка экспорта: {e}")
+            self.run_export(ExportQuery(table), filename, f"export_{table}")
     
     def import_from_json(self):
         """Импорт пользователей из JSON"""
+        self.import_json_table('users')
+    
+    def import_posts_from_json(self):
+        """Импорт постов из JSON"""
+        self.import_json_table('posts')
+    
+    def import_json_table(self, table):
+        """Массовый импорт JSON-массива или JSON Lines в указанную таблицу"""
+        from tkinter import filedialog
         filename = filedialog.askopenfilename(
-            filetypes=[("JSON files", "*.json"), ("All files", "*.*")]
+            filetypes=[("JSON files", "*.json *.jsonl *.ndjson"), ("All files", "*.*")]
         )
         
-        if filename:
-            try:
-                with open(filename, 'r', encoding='utf-8') as file:
-                    data = json.load(file)
-                    for item in data:
-                        self.cursor.execute(
-                            "INSERT OR IGNORE INTO users (name, email) VALUES (?, ?)",
-                            (item['name'], item['email'])
-                        )
-                
-                self.connection.commit()
-                self.log_message(f"Данные импортированы из {filename}")
-                self.load_data()
-                messagebox.showinfo("Успех", "Данные успешно импортированы из JSON")
-            except Exception as e:
-                messagebox.showerror("Ошибка", f"Ошибка импорта: {e}")
+        importer = self.create_importer(table, filename) if filename else None
+        if importer:
+            self.run_import(importer, JsonSource(filename, table), filename)
     
     def show_user_stats(self):
         """Показать статистику пользователей"""
-        self.cursor.execute('''
-            SELECT u.name, COUNT(p.id) as post_count 
-            FROM users u 
-            LEFT JOIN posts p ON u.id = p.user_id 
-            GROUP BY u.id 
-            ORDER BY post_count DESC
-        ''')
-        stats = self.cursor.fetchall()
-        
-        self.results_text.delete('1.0', 'end')
-        self.results_text.insert('end', "📊 СТАТИСТИКА ПОЛЬЗОВАТЕЛЕЙ:\n\n")
-        
-        for stat in stats:
-            self.results_text.insert('end', f"👤 {stat[0]}: {stat[1]} постов\n")
-        
-        self.log_message("Показана статистика пользователей")
+        with_archive = self.with_archive_var.get()
+        
+        def query(connection):
+            # Посты архива не учтены в счетчиках, они считаются через all_posts
+            if with_archive:
+                return ArchiveRepository(connection, self.db_name).top_posters(STATS_LIMIT)
+            return UserRepository(connection).top_posters(STATS_LIMIT)
+        
+        self.stream_results(
+            f"📊 СТАТИСТИКА ПОЛЬЗОВАТЕЛЕЙ (топ {STATS_LIMIT}"
+            f"{', с архивом' if with_archive else ''}):\n\n",
+            query,
+            lambda stat: f"👤 {stat[0]}: {stat[1]} постов\n",
+            "Пользователи не найдены\n",
+            "Показана статистика пользователей",
+            'show_user_stats',
+            cache_key=('show_user_stats', STATS_LIMIT, with_archive),
+            tables=('users', 'posts') if with_archive else ('users',)
+        )
+    
+    def show_analytics(self, header, report, render_row, log_text, operation):
+        """Отчет report(snapshot, connection) по снимку постов, обновленному перед расчетом"""
+        if self.analytics is None:
+            # numpy загружается только при первом отчете: запуск приложения не замедляется
+            from blogdb.analytics import PostSnapshot
+            try:
+                self.analytics = PostSnapshot()
+            except RuntimeError as e:
+                messagebox.showerror("Аналитика недоступна", str(e))
+                return
+        snapshot = self.analytics
+        
+        def query(connection):
+            # Загружаются только посты, измененные после предыдущего отчета
+            snapshot.refresh(connection)
+            return report(snapshot, connection)
+        
+        self.stream_results(header, query, render_row, "Постов нет\n", log_text, operation)
+    
+    def show_posts_per_day(self):
+        """Число постов по дням"""
+        self.show_analytics(
+            "📅 ПОСТЫ ПО ДНЯМ (месяц до последнего поста, UTC):\n\n",
+            lambda snapshot, connection: snapshot.posts_per_day(),
+            lambda day: f"{day[0]}: {day[1]}\n",
+            "Показаны посты по дням",
+            'posts_per_day'
+        )
+    
+    def show_posts_per_hour(self):
+        """Число постов по часам суток"""
+        self.show_analytics(
+            "🕐 ПОСТЫ ПО ЧАСАМ (UTC):\n\n",
+            lambda snapshot, connection: snapshot.posts_per_hour(),
+            lambda hour: f"{hour[0]:02d}:00: {hour[1]}\n",
+            "Показаны посты по часам",
+            'posts_per_hour'
+        )
+    
+    def show_length_histogram(self):
+        """Распределение длины текста постов"""
+        self.show_analytics(
+            "📏 ДЛИНА ПОСТОВ (символов):\n\n",
+            lambda snapshot, connection: snapshot.length_histogram(),
+            lambda part: f"{part[0]}: {part[1]} ({part[2]}%)\n",
+            "Показано распределение длины постов",
+            'length_histogram'
+        )
+    
+    def show_top_authors(self):
+        """Авторы с наибольшим объемом текста"""
+        self.show_analytics(
+            f"✍ АВТОРЫ ПО ОБЪЕМУ ТЕКСТА (топ {STATS_LIMIT}):\n\n",
+            lambda snapshot, connection: snapshot.top_authors(connection, STATS_LIMIT),
+            lambda author: (f"👤 {author[0]}: {author[2]} символов, {author[1]} постов, "
+                            f"в среднем {author[3]}\n"),
+            "Показаны авторы по объему текста",
+            'top_authors'
+        )
+    
+    def rebuild_counters(self):
+        """Пересчет счетчиков постов пользователей"""
+        def on_done(fixed):
+            self.log_message(f"Счетчики постов пересчитаны, исправлено: {fixed}")
+            messagebox.showinfo("Успех", f"Исправлено счетчиков: {fixed}")
+        
+        def job(task):
+            fixed = UserRepository(task.connection).rebuild_post_counts()
+            self.report_cache.invalidate('users')
+            return fixed
+        
+        self.run_in_background(job, on_done=on_done, error_title="Ошибка базы данных",
+                               operation='rebuild_counters')
     
     def show_recent_posts(self):
         """Показать последние посты"""
-        self.cursor.execute('''
-            SELECT p.title, u.name, p.created_at 
-            FROM posts p 
-            JOIN users u ON p.user_id = u.id 
-            ORDER BY p.created_at DESC 
-            LIMIT 10
-        ''')
-        posts = self.cursor.fetchall()
-        
-        self.results_text.delete('1.0', 'end')
-        self.results_text.insert('end', "🆕 ПОСЛЕДНИЕ ПОСТЫ:\n\n")
-        
-        for post in posts:
-            self.results_text.insert('end', f"📝 {post[0]}\n")
-            self.results_text.insert('end', f"   👤 Автор: {post[1]}\n")
-            self.results_text.insert('end', f"   📅 Дата: {post[2]}\n\n")
-        
-        self.log_message("Показаны последние посты")
+        self.stream_results(
+            "🆕 ПОСЛЕДНИЕ ПОСТЫ:\n\n",
+            lambda connection: PostRepository(connection).recent(),
+            lambda post: (f"📝 {post[0]}\n"
+                          f"   👤 Автор: {post[1]}\n"
+                          f"   📅 Дата: {post[2]}\n\n"),
+            "Посты не найдены\n",
+            "Показаны последние посты",
+            'show_recent_posts',
+            cache_key=('show_recent_posts',),
+            tables=('users', 'posts')
+        )
     
-    def search_users(self):
-        """Поиск пользователей"""
+    def search_keyword(self):
+        """Поисковый запрос из поля ввода (None, если он пустой)"""
         keyword = self.search_entry.get().strip()
         if not keyword:
             messagebox.showwarning("Предупреждение", "Введите поисковый запрос")
+            return None
+        return keyword
+    
+    def search_users(self):
+        """Поиск пользователей"""
+        keyword = self.search_keyword()
+        if not keyword:
             return
         
-        self.cursor.execute(
-            "SELECT * FROM users WHERE name LIKE ? OR email LIKE ?", 
-            (f'%{keyword}%', f'%{keyword}%')
+        self.stream_results(
+            f"🔍 РЕЗУЛЬТАТЫ ПОИСКА '{keyword}':\n\n",
+            lambda connection: UserRepository(connection).search(keyword),
+            lambda user: (f"ID: {user[0]}\n"
+                          f"Имя: {user[1]}\n"
+                          f"Email: {user[2]}\n"
+                          f"Дата: {user[3]}\n" + "-" * 30 + "\n"),
+            "Пользователи не найдены\n",
+            f"Выполнен поиск: '{keyword}'",
+            'search_users',
+            cache_key=('search_users', keyword),
+            tables=('users',)
         )
-        results = self.cursor.fetchall()
-        
-        self.results_text.delete('1.0', 'end')
-        self.results_text.insert('end', f"🔍 РЕЗУЛЬТАТЫ ПОИСКА '{keyword}':\n\n")
-        
-        if results:
-            for user in results:
-                self.results_text.insert('end', f"ID: {user[0]}\n")
-                self.results_text.insert('end', f"Имя: {user[1]}\n")
-                self.results_text.insert('end', f"Email: {user[2]}\n")
-                self.results_text.insert('end', f"Дата: {user[3]}\n")
-                self.results_text.insert('end', "-" * 30 + "\n")
-        else:
-            self.results_text.insert('end', "Пользователи не найдены\n")
+    
+    def search_posts(self):
+        """Поиск постов по заголовку и содержанию"""
+        keyword = self.search_keyword()
+        if not keyword:
+            return
         
-        self.log_message(f"Выполнен поиск: '{keyword}'")
+        with_archive = self.with_archive_var.get()
+        
+        def query(connection):
+            if with_archive:
+                return ArchiveRepository(connection, self.db_name).search(keyword)
+            return PostRepository(connection).search(keyword)
+        
+        self.stream_results(
+            f"🔍 ПОСТЫ ПО ЗАПРОСУ '{keyword}'{' (с архивом)' if with_archive else ''}:\n\n",
+            query,
+            lambda post: (f"📝 {post[1]} (ID: {post[0]})\n"
+                          f"   👤 Автор: {post[2]}\n"
+                          f"   📅 Дата: {post[3]}\n"
+                          f"   {post[4]}\n\n"),
+            "Посты не найдены\n",
+            f"Выполнен поиск постов: '{keyword}'",
+            'search_posts',
+            cache_key=('search_posts', keyword, with_archive),
+            tables=('users', 'posts')
+        )
     
     def clear_user_form(self):
         """Очистка формы пользователя"""
@@ -555,6 +1726,8 @@ class DatabaseApp:
     
     def __del__(self):
         """Закрытие соединения с БД при удалении объекта"""
+        if getattr(self, 'worker', None):
+            self.worker.stop()
         if self.connection:
             self.connection.close()
 
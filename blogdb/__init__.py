@@ -0,0 +1,47 @@
+from .archive import (
+    ARCHIVE_BATCH_SIZE, ARCHIVE_PERIODS, ArchiveRepository, PostArchiver, attach_archives,
+    find_archives,
+)
+from .backup import (
+    BACKUP_DIR, BACKUP_KEEP, BACKUP_PAGES, BACKUP_PAUSE, OnlineBackup, check_integrity,
+    create_snapshot, list_snapshots, prune_snapshots, restore_snapshot,
+)
+from .bodies import (
+    BODY_CHUNK_SIZE, COMPRESSIONS, codec_for, iter_body, pack_body,
+    register_body_functions, unpack_body,
+)
+from .changes import (
+    CHANGE_TABLES, ChangeQuery, compact_changelog, compacted_through, export_changes,
+    get_cursor, last_seq, save_cursor,
+)
+from .cache import REPORT_CACHE_SIZE, REPORT_CACHE_TTL, ResultCache
+from .config import (
+    CONFIG_FILE, DEFAULT_DB_NAME, Config, ConnectionProfile, load_config,
+)
+from .db import ReadPool, connect, has_table, is_interrupted
+from .export import (
+    DEFAULT_EXPORT_COLUMNS, EXPORT_FILTERS, EXPORT_PAGE_SIZE, EXPORT_VIEWS, ExportQuery,
+    PagedCursor, export_format, export_rows, open_export_file, split_compression,
+)
+from .files import (
+    CSV_HEADERS, IMPORT_BATCH_SIZE, REJECT_SUFFIX, TABLE_COLUMNS, BulkImporter, CsvSource,
+    JsonSource, is_csv, is_json_lines, iter_json_array, write_csv_rows,
+    write_json_rows,
+)
+from .instrument import (
+    SLOW_LOG_FILE, SLOW_QUERY_THRESHOLD, InstrumentedConnection, InstrumentedCursor,
+    QueryMonitor, configure_slow_log,
+)
+from .migrations import MIGRATIONS, apply_migrations, rebuild_post_counts
+from .repository import (
+    RECENT_LIMIT, SEARCH_LIMIT, STATS_LIMIT, PostRepository, UserRepository,
+    build_fts_query,
+)
+from .shards import SHARD_EXTENSIONS, ShardImporter, find_shards, parse_shard
+from .sync import SYNC_TABLES, SyncImporter
+
+def open_database(db_name=DEFAULT_DB_NAME, monitor=None, profile=None):
+    """Соединение с базой, схема которой обновлена до последней версии"""
+    connection = connect(db_name, monitor, profile)
+    apply_migrations(connection)
+    return connection
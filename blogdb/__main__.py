@@ -0,0 +1,403 @@
+import argparse
+import os
+import sqlite3
+import sys
+import time
+
+from . import (
+    ARCHIVE_BATCH_SIZE, ARCHIVE_PERIODS, BACKUP_DIR, BACKUP_KEEP, BACKUP_PAGES, BACKUP_PAUSE,
+    CHANGE_TABLES, CONFIG_FILE, EXPORT_VIEWS, IMPORT_BATCH_SIZE, RECENT_LIMIT, REJECT_SUFFIX,
+    SEARCH_LIMIT, STATS_LIMIT, ArchiveRepository, BulkImporter, CsvSource, ExportQuery,
+    JsonSource, PostArchiver, PostRepository, ShardImporter, SyncImporter, UserRepository,
+    apply_migrations, compact_changelog, compacted_through, create_snapshot, export_changes,
+    export_rows, find_shards, get_cursor, is_csv, last_seq, list_snapshots, load_config,
+    open_database, restore_snapshot, save_cursor,
+)
+
+def command_import(connection, args):
+    """Массовый импорт CSV/JSON/JSON Lines"""
+    source = (CsvSource(args.file) if is_csv(args.file)
+              else JsonSource(args.file, args.table))
+    options = {'batch_size': args.batch_size, 'fast': args.fast,
+               'reject_path': args.file + REJECT_SUFFIX}
+    if args.sync:
+        importer = SyncImporter(args.table, delete_missing=args.delete_missing, **options)
+    else:
+        importer = BulkImporter(args.table, **options)
+    try:
+        for processed in importer.run(connection, source):
+            print(f"\rОбработано строк: {processed}", end='', file=sys.stderr)
+    except ValueError as e:
+        sys.exit(f"\nОшибка: {e}")
+    print(file=sys.stderr)
+    
+    print(f"Импорт завершен: {importer.summary()}")
+    if importer.rejected:
+        print(f"Отклоненные строки: {importer.reject_path}")
+
+def command_import_batch(connection, args):
+    """Параллельный импорт набора файлов (каталог или шаблон glob)"""
+    filenames = find_shards(args.path)
+    if not filenames:
+        sys.exit(f"Нет файлов для импорта: {args.path}")
+    
+    importer = ShardImporter(args.table, workers=args.workers, batch_size=args.batch_size,
+                             fast=args.fast, reject_path=args.reject_file, sync=args.sync,
+                             delete_missing=args.delete_missing)
+    try:
+        for processed in importer.run(connection, filenames):
+            print(f"\rФайлов: {importer.done}/{len(filenames)}, строк: {processed}",
+                  end='', file=sys.stderr)
+    except ValueError as e:
+        sys.exit(f"\nОшибка: {e}")
+    print(file=sys.stderr)
+    
+    print(f"Импорт завершен: {importer.summary()}")
+    for filename, error in importer.failed:
+        print(f"Ошибка в файле {filename}: {error}")
+    if importer.rejected:
+        print(f"Отклоненные строки: {importer.reject_path}")
+
+def command_export(connection, args):
+    """Постраничный экспорт в CSV/JSON/JSON Lines, при необходимости сжатый"""
+    try:
+        query = ExportQuery(
+            args.table,
+            columns=args.columns.split(',') if args.columns else None,
+            filters={'user_id': args.user_id, 'since': args.since, 'until': args.until,
+                     'contains': args.contains}
+        )
+        count = export_rows(connection, args.file, query)
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Ошибка: {e}")
+    print(f"Экспортировано записей: {count} в {args.file}")
+
+def command_export_changes(connection, args):
+    """Выгрузка изменений после номера --since или курсора получателя"""
+    since = args.since
+    if since is None:
+        since = (get_cursor(connection, args.consumer) or 0) if args.consumer else 0
+    try:
+        count, until = export_changes(
+            connection, args.file,
+            tables=args.tables.split(',') if args.tables else CHANGE_TABLES,
+            since=since,
+            columns=args.columns.split(',') if args.columns else None
+        )
+    except (ValueError, RuntimeError) as e:
+        sys.exit(f"Ошибка: {e}")
+    # Курсор сдвигается только после успешной записи файла
+    if args.consumer:
+        save_cursor(connection, args.consumer, until)
+    print(f"Выгружено изменений: {count} в {args.file}; последний номер: {until}")
+
+def command_compact_changes(connection, args):
+    """Удаление выгруженных изменений из журнала"""
+    deleted = compact_changelog(connection, args.through)
+    print(f"Удалено записей журнала: {deleted}; журнал сжат до номера "
+          f"{compacted_through(connection)}, последний номер {last_seq(connection)}")
+    for consumer, seq, updated_at in connection.execute(
+            "SELECT consumer, seq, updated_at FROM changelog_cursors ORDER BY consumer"):
+        print(f"  {consumer}: {seq} ({updated_at})")
+
+def command_stats(connection, args):
+    """Рейтинг пользователей и последние посты"""
+    print("Пользователи с наибольшим числом постов:")
+    if args.with_archive:
+        try:
+            posters = ArchiveRepository(connection, args.database).top_posters(args.limit)
+        except ValueError as e:
+            sys.exit(f"Ошибка: {e}")
+    else:
+        posters = UserRepository(connection).top_posters(args.limit)
+    for name, post_count in posters:
+        print(f"  {name}: {post_count}")
+    
+    print("Последние посты:")
+    for title, author, created_at in PostRepository(connection).recent(args.recent):
+        print(f"  {created_at}  {title} ({author})")
+
+def command_search(connection, args):
+    """Полнотекстовый поиск пользователей или постов"""
+    found = 0
+    if args.posts:
+        try:
+            posts = (ArchiveRepository(connection, args.database) if args.with_archive
+                     else PostRepository(connection))
+        except ValueError as e:
+            sys.exit(f"Ошибка: {e}")
+        for post_id, title, author, created_at, snippet in posts.search(args.query, args.limit):
+            print(f"{post_id}\t{title}\t{author}\t{created_at}\t{snippet}")
+            found += 1
+    else:
+        for user in UserRepository(connection).search(args.query, args.limit):
+            print('\t'.join(str(value) for value in user))
+            found += 1
+    print(f"Найдено: {found}", file=sys.stderr)
+
+def command_rebuild_counts(connection, args):
+    """Пересчет счетчиков постов"""
+    fixed = UserRepository(connection).rebuild_post_counts()
+    print(f"Исправлено счетчиков: {fixed}")
+
+def command_vacuum(connection, args):
+    """Сжатие файла базы после удаления данных или переноса тел постов"""
+    before = os.path.getsize(args.database)
+    connection.execute("VACUUM")
+    after = os.path.getsize(args.database)
+    print(f"Размер базы: {before // 1024} КБ -> {after // 1024} КБ")
+
+def command_analytics(connection, args):
+    """Отчеты по снимку постов в массивах NumPy"""
+    # numpy загружается только для этой команды
+    from .analytics import ANALYTICS_DAYS, PostSnapshot
+    try:
+        snapshot = PostSnapshot()
+    except RuntimeError as e:
+        sys.exit(f"Ошибка: {e}")
+    started = time.perf_counter()
+    snapshot.refresh(connection)
+    loaded = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    if args.report == 'daily':
+        days = snapshot.posts_per_day(args.days or ANALYTICS_DAYS)
+        rows = [f"  {day}: {count}" for day, count in days]
+    elif args.report == 'hourly':
+        rows = [f"  {hour:02d}:00: {count}" for hour, count in snapshot.posts_per_hour()]
+    elif args.report == 'lengths':
+        rows = [f"  {label}: {count} ({share}%)"
+                for label, count, share in snapshot.length_histogram()]
+    else:
+        rows = [f"  {name}: {chars} символов, {posts} постов, в среднем {average}"
+                for name, posts, chars, average in snapshot.top_authors(connection, args.limit)]
+    elapsed = time.perf_counter() - started
+    
+    print("\n".join(rows) or "Постов нет")
+    summary = snapshot.summary()
+    print(f"Постов {summary['posts']}, авторов {summary['authors']}, медианная длина "
+          f"{summary['median_length']}; загрузка {loaded:.3f} с, отчет {elapsed * 1000:.1f} мс",
+          file=sys.stderr)
+
+def command_archive(connection, args):
+    """Перенос старых постов в архивные базы по периодам"""
+    try:
+        archiver = PostArchiver(args.database, args.before, args.period, args.batch_size,
+                                args.dir)
+        for moved in archiver.run(connection):
+            print(f"\rПеренесено постов: {moved}", end='', file=sys.stderr)
+    except (ValueError, sqlite3.Error) as e:
+        sys.exit(f"\nОшибка архивации: {e}")
+    print(file=sys.stderr)
+    print(f"Архивация завершена: {archiver.summary()}")
+    try:
+        archives = ArchiveRepository(connection, args.database, args.dir)
+    except ValueError as e:
+        sys.exit(f"Ошибка: {e}")
+    for period, count in archives.posts_by_period():
+        print(f"  {period}: {count}")
+    if archiver.moved:
+        print("Место в файле основной базы освобождается командой vacuum")
+
+def command_backup(connection, args):
+    """Резервная копия работающей базы; с --every - копии по расписанию"""
+    while True:
+        try:
+            path, backup = create_snapshot(connection, args.database, args.dir, args.keep,
+                                           args.pages, args.pause)
+        except (RuntimeError, sqlite3.Error) as e:
+            sys.exit(f"Ошибка резервного копирования: {e}")
+        stats = backup.summary()
+        print(f"Копия: {path} ({os.path.getsize(path) // 1024} КБ)")
+        print(f"  страниц {stats['pages']}, шагов {stats['steps']}, "
+              f"перезапусков {stats['restarts']}"
+              f"{' (скопирована за один шаг)' if stats['single_step'] else ''}, "
+              f"время {stats['elapsed_s']} с")
+        print(f"  блокировка на шаг: p50 {stats['lock_p50_ms']} мс, "
+              f"p99 {stats['lock_p99_ms']} мс, максимум {stats['lock_max_ms']} мс")
+        if not args.every:
+            break
+        time.sleep(args.every * 60)
+
+def command_restore(connection, args):
+    """Восстановление базы из резервной копии"""
+    snapshot = args.snapshot
+    if snapshot is None:
+        snapshots = list_snapshots(args.database, args.dir)
+        if not snapshots:
+            sys.exit(f"Нет резервных копий в {args.dir}")
+        snapshot = snapshots[-1]
+    try:
+        restore_snapshot(snapshot, connection)
+    except (ValueError, sqlite3.Error) as e:
+        sys.exit(f"Ошибка восстановления: {e}")
+    # Копия могла быть сделана более старой версией схемы
+    apply_migrations(connection)
+    print(f"База {args.database} восстановлена из {snapshot}")
+
+def add_sync_arguments(parser):
+    """Параметры режима синхронизации импорта"""
+    parser.add_argument('--sync', action='store_true',
+                        help="обновлять существующие строки (пользователи - по email, "
+                             "посты - по ID)")
+    parser.add_argument('--delete-missing', action='store_true',
+                        help="с --sync: удалить строки, которых нет в файле "
+                             "(с пользователями удаляются их посты)")
+
+def build_parser():
+    """Разбор аргументов командной строки"""
+    parser = argparse.ArgumentParser(
+        prog='python -m blogdb',
+        description="Работа с базой данных блога без графического интерфейса"
+    )
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help=f"файл настроек (по умолчанию {CONFIG_FILE})")
+    parser.add_argument('--db', help="файл базы данных (по умолчанию из файла настроек)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    import_parser = commands.add_parser('import', help="импорт CSV/JSON/JSON Lines")
+    import_parser.add_argument('table', choices=['users', 'posts'])
+    import_parser.add_argument('file')
+    import_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                               help="строк в одной транзакции")
+    import_parser.add_argument('--fast', action='store_true',
+                               help="synchronous=OFF и WAL на время импорта")
+    add_sync_arguments(import_parser)
+    import_parser.set_defaults(handler=command_import)
+    
+    batch_parser = commands.add_parser(
+        'import-batch', help="параллельный импорт файлов каталога или шаблона glob"
+    )
+    batch_parser.add_argument('table', choices=['users', 'posts'])
+    batch_parser.add_argument('path', help="каталог или шаблон, например 'feeds/*.jsonl'")
+    batch_parser.add_argument('--workers', type=int,
+                              help="процессов разбора (по умолчанию - число ядер)")
+    batch_parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+                              help="строк в одной транзакции")
+    batch_parser.add_argument('--fast', action='store_true',
+                              help="synchronous=OFF и WAL на время импорта")
+    batch_parser.add_argument('--reject-file', default='import-batch.rejected.csv',
+                              help="отчет об отклоненных строках")
+    add_sync_arguments(batch_parser)
+    batch_parser.set_defaults(handler=command_import_batch)
+    
+    export_parser = commands.add_parser(
+        'export', help="экспорт в CSV/JSON/JSON Lines (.gz и .zst - со сжатием)"
+    )
+    export_parser.add_argument('table', choices=list(EXPORT_VIEWS))
+    export_parser.add_argument('file')
+    export_parser.add_argument('--columns', help="столбцы через запятую")
+    export_parser.add_argument('--user-id', type=int, help="только посты автора")
+    export_parser.add_argument('--since', help="созданные не раньше даты (ГГГГ-ММ-ДД)")
+    export_parser.add_argument('--until', help="созданные раньше даты (ГГГГ-ММ-ДД)")
+    export_parser.add_argument('--contains', help="содержащие текст")
+    export_parser.set_defaults(handler=command_export)
+    
+    changes_parser = commands.add_parser(
+        'export-changes', help="изменения после номера в CSV/JSON Lines (журнал CDC)"
+    )
+    changes_parser.add_argument('file')
+    changes_parser.add_argument('--tables', help="таблицы через запятую (users,posts)")
+    changes_parser.add_argument('--columns', help="столбцы через запятую (для одной таблицы)")
+    cursor_group = changes_parser.add_mutually_exclusive_group()
+    cursor_group.add_argument('--since', type=int, help="номер последнего выгруженного изменения")
+    cursor_group.add_argument('--consumer', help="получатель: номер хранится в базе")
+    changes_parser.set_defaults(handler=command_export_changes)
+    
+    compact_parser = commands.add_parser(
+        'compact-changes', help="удаление выгруженных всеми получателями изменений"
+    )
+    compact_parser.add_argument('--through', type=int,
+                                help="удалить изменения до номера включительно "
+                                     "(по умолчанию - минимальный курсор получателей)")
+    compact_parser.set_defaults(handler=command_compact_changes)
+    
+    stats_parser = commands.add_parser('stats', help="статистика пользователей и постов")
+    stats_parser.add_argument('--limit', type=int, default=STATS_LIMIT)
+    stats_parser.add_argument('--recent', type=int, default=RECENT_LIMIT)
+    stats_parser.add_argument('--with-archive', action='store_true',
+                              help="рейтинг с учетом архивных постов")
+    stats_parser.set_defaults(handler=command_stats)
+    
+    search_parser = commands.add_parser('search', help="полнотекстовый поиск")
+    search_parser.add_argument('query')
+    search_parser.add_argument('--posts', action='store_true', help="искать посты")
+    search_parser.add_argument('--limit', type=int, default=SEARCH_LIMIT)
+    search_parser.add_argument('--with-archive', action='store_true',
+                               help="искать посты и в архиве (LIKE, без индекса)")
+    search_parser.set_defaults(handler=command_search)
+    
+    rebuild_parser = commands.add_parser('rebuild-counts', help="пересчет счетчиков постов")
+    rebuild_parser.set_defaults(handler=command_rebuild_counts)
+    
+    analytics_parser = commands.add_parser(
+        'analytics', help="отчеты по постам в массивах NumPy (нужен пакет numpy)"
+    )
+    analytics_parser.add_argument('report', choices=('daily', 'hourly', 'lengths', 'authors'),
+                                  help="посты по дням, по часам, длина текста "
+                                       "или авторы по объему текста")
+    analytics_parser.add_argument('--days', type=int,
+                                  help="дней в отчете daily (по умолчанию 30)")
+    analytics_parser.add_argument('--limit', type=int, default=STATS_LIMIT)
+    analytics_parser.set_defaults(handler=command_analytics)
+    
+    archive_parser = commands.add_parser(
+        'archive', help="перенос старых постов в архивные базы (ATTACH DATABASE)"
+    )
+    archive_parser.add_argument('--before', required=True,
+                                help="перенести посты, созданные раньше даты (ГГГГ-ММ-ДД)")
+    archive_parser.add_argument('--period', choices=ARCHIVE_PERIODS, default='year',
+                                help="одна архивная база на год или на месяц")
+    archive_parser.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE,
+                                help="постов в одной транзакции")
+    archive_parser.add_argument('--dir', help="каталог архивов (по умолчанию archive/ "
+                                              "рядом с базой)")
+    archive_parser.set_defaults(handler=command_archive)
+    
+    backup_parser = commands.add_parser(
+        'backup', help="резервная копия работающей базы с проверкой целостности"
+    )
+    backup_parser.add_argument('--dir', default=BACKUP_DIR, help="каталог копий")
+    backup_parser.add_argument('--keep', type=int, default=BACKUP_KEEP,
+                               help="сколько последних копий хранить")
+    backup_parser.add_argument('--pages', type=int, default=BACKUP_PAGES,
+                               help="страниц за один шаг копирования")
+    backup_parser.add_argument('--pause', type=float, default=BACKUP_PAUSE,
+                               help="пауза между шагами, секунды")
+    backup_parser.add_argument('--every', type=float,
+                               help="повторять каждые N минут (до прерывания)")
+    backup_parser.set_defaults(handler=command_backup)
+    
+    restore_parser = commands.add_parser('restore', help="восстановление из резервной копии")
+    restore_parser.add_argument('snapshot', nargs='?',
+                                help="файл копии (по умолчанию - последняя копия)")
+    restore_parser.add_argument('--dir', default=BACKUP_DIR, help="каталог копий")
+    restore_parser.set_defaults(handler=command_restore)
+    
+    commands.add_parser('migrate', help="обновление схемы базы").set_defaults(
+        handler=lambda connection, args: print("Схема базы данных актуальна")
+    )
+    commands.add_parser('vacuum', help="сжатие файла базы").set_defaults(
+        handler=command_vacuum
+    )
+    return parser
+
+def main(argv=None):
+    """Запуск консольного интерфейса"""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    if getattr(args, 'delete_missing', False) and not args.sync:
+        parser.error("--delete-missing используется только вместе с --sync")
+    try:
+        config = load_config(args.config, args.db)
+    except ValueError as e:
+        sys.exit(f"Ошибка настроек: {e}")
+    args.database = config.db_name
+    connection = open_database(config.db_name, profile=config.profile)
+    try:
+        args.handler(connection, args)
+    finally:
+        connection.close()
+
+if __name__ == '__main__':
+    main()
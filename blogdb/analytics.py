@@ -0,0 +1,197 @@
+import json
+import threading
+from datetime import datetime, timezone
+
+try:
+    import numpy
+except ImportError:  # необязательная зависимость
+    numpy = None
+
+from .changes import compacted_through, last_seq
+from .repository import STATS_LIMIT
+
+# Строк, читаемых из базы за один fetchmany при загрузке столбцов
+ANALYTICS_FETCH_SIZE = 50000
+# Дней в отчете по дням (до последнего дня с постами)
+ANALYTICS_DAYS = 30
+# Границы интервалов длины текста, символов (последний интервал открытый)
+LENGTH_BINS = (0, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+SECONDS_PER_DAY = 86400
+
+# id, автор, время создания (секунды UTC, -1 без даты) и длина текста поста
+SNAPSHOT_COLUMNS = '''
+    SELECT p.id, p.user_id, COALESCE(CAST(strftime('%s', p.created_at) AS INTEGER), -1),
+           COALESCE(b.content_length, length(unpack_body(b.body)))
+    FROM posts p
+    JOIN post_bodies b ON b.post_id = p.id
+'''
+
+def require_numpy():
+    """Ошибка, если numpy не установлен"""
+    if numpy is None:
+        raise RuntimeError("Для аналитики установите пакет numpy")
+
+class PostSnapshot:
+    """Столбцы постов в массивах NumPy для отчетов без построчного обхода базы"""
+    
+    # Автор и длина текста умещаются в 32 бита: снимок вдвое компактнее
+    DTYPES = (('ids', 'int64'), ('user_ids', 'int32'), ('created', 'int64'),
+              ('lengths', 'int32'))
+    
+    def __init__(self, fetch_size=ANALYTICS_FETCH_SIZE):
+        require_numpy()
+        self.fetch_size = fetch_size
+        # refresh заменяет словарь столбцов целиком; отчеты читают self.columns
+        # один раз, чтобы не смешать столбцы двух снимков
+        self.columns = self.empty()
+        # Номер изменения в журнале, на котором снимок актуален (None - не загружен)
+        self.seq = None
+        self.max_id = 0
+        # Снимок общий для фоновых задач чтения, обновляет его один поток
+        self.lock = threading.Lock()
+    
+    def empty(self):
+        """Пустые столбцы"""
+        return {name: numpy.empty(0, dtype) for name, dtype in self.DTYPES}
+    
+    def __len__(self):
+        return len(self.columns['ids'])
+    
+    def load(self, cursor):
+        """Столбцы из курсора по SNAPSHOT_COLUMNS, частями по fetch_size строк"""
+        parts = []
+        while True:
+            rows = cursor.fetchmany(self.fetch_size)
+            if not rows:
+                break
+            parts.append(numpy.array(rows, dtype='int64').reshape(-1, len(self.DTYPES)))
+        if not parts:
+            return self.empty()
+        table = numpy.concatenate(parts)
+        return {name: numpy.ascontiguousarray(table[:, index], dtype)
+                for index, (name, dtype) in enumerate(self.DTYPES)}
+    
+    def refresh(self, connection):
+        """Обновление снимка; возвращает число перечитанных постов"""
+        with self.lock:
+            seq = last_seq(connection)
+            if seq == self.seq:
+                return 0
+            # Первая загрузка, сжатый журнал или база восстановлена из копии
+            if self.seq is None or seq < self.seq or self.seq < compacted_through(connection):
+                columns = self.load(connection.execute(SNAPSHOT_COLUMNS))
+                loaded = len(columns['ids'])
+            else:
+                columns, loaded = self.apply_changes(connection, seq)
+            
+            self.columns = columns
+            self.max_id = int(columns['ids'].max()) if len(columns['ids']) else 0
+            self.seq = seq
+            return loaded
+    
+    def apply_changes(self, connection, seq):
+        """Новые посты по rowid и перечитанные измененные или удаленные по журналу"""
+        # Посты с id больше загруженных читаются диапазоном, по журналу - только
+        # измененные, удаленные и вставленные с явным меньшим id
+        changed = [row[0] for row in connection.execute('''
+            SELECT DISTINCT row_id FROM changelog
+            WHERE table_name = 'posts' AND seq > ? AND seq <= ? AND row_id <= ?
+        ''', (self.seq, seq, self.max_id))]
+        columns = self.columns
+        parts = []
+        if changed:
+            keep = ~numpy.isin(columns['ids'], numpy.array(changed, dtype='int64'))
+            columns = {name: values[keep] for name, values in columns.items()}
+            parts.append(self.load(connection.execute(
+                SNAPSHOT_COLUMNS + "WHERE p.id IN (SELECT value FROM json_each(?))",
+                (json.dumps(changed),)
+            )))
+        parts.append(self.load(connection.execute(
+            SNAPSHOT_COLUMNS + "WHERE p.id > ?", (self.max_id,)
+        )))
+        
+        loaded = sum(len(part['ids']) for part in parts)
+        if loaded:
+            columns = {name: numpy.concatenate([columns[name]] + [part[name] for part in parts])
+                       for name in columns}
+        return columns, loaded
+    
+    def dated(self):
+        """Время создания постов, у которых оно известно"""
+        created = self.columns['created']
+        return created[created >= 0]
+    
+    def posts_per_day(self, days=ANALYTICS_DAYS):
+        """Число постов по дням за days дней до последнего дня с постами: [(дата, число)]"""
+        day_numbers = self.dated() // SECONDS_PER_DAY
+        if not len(day_numbers):
+            return []
+        last = int(day_numbers.max())
+        first = last - days + 1
+        counts = numpy.bincount(day_numbers[day_numbers >= first] - first, minlength=days)
+        return [(datetime.fromtimestamp((first + offset) * SECONDS_PER_DAY, timezone.utc)
+                 .strftime('%Y-%m-%d'), int(count))
+                for offset, count in enumerate(counts)]
+    
+    def posts_per_hour(self):
+        """Число постов по часам суток (UTC): [(час, число)]"""
+        hours = self.dated() % SECONDS_PER_DAY // 3600
+        if not len(hours):
+            return []
+        return [(hour, int(count))
+                for hour, count in enumerate(numpy.bincount(hours, minlength=24))]
+    
+    def length_histogram(self, bins=LENGTH_BINS):
+        """Распределение длины текста: [(интервал, число постов, доля в процентах)]"""
+        lengths = self.columns['lengths']
+        if not len(lengths):
+            return []
+        # Номер интервала для каждого поста; последний интервал без верхней границы
+        counts = numpy.bincount(numpy.searchsorted(bins, lengths, side='right') - 1,
+                                minlength=len(bins))
+        labels = [f"{low}–{high - 1}" for low, high in zip(bins, bins[1:])]
+        labels.append(f"{bins[-1]}+")
+        return [(label, int(count), round(100 * int(count) / len(lengths), 1))
+                for label, count in zip(labels, counts)]
+    
+    def user_totals(self, columns=None):
+        """Число постов и суммарная длина текста по id автора"""
+        if columns is None:
+            columns = self.columns
+        user_ids = columns['user_ids']
+        posts = numpy.bincount(user_ids)
+        chars = numpy.bincount(user_ids, weights=columns['lengths']).astype('int64')
+        return posts, chars
+    
+    def top_authors(self, connection, limit=STATS_LIMIT):
+        """Авторы с наибольшим объемом текста: [(имя, постов, символов, средняя длина)]"""
+        columns = self.columns
+        if not len(columns['ids']):
+            return []
+        posts, chars = self.user_totals(columns)
+        # id без постов не попадают в рейтинг даже при пустых текстах авторов
+        volume = numpy.where(posts > 0, chars, -1)
+        limit = min(limit, int(numpy.count_nonzero(posts)))
+        # Частичная сортировка: упорядочиваются только limit лучших
+        top = numpy.argpartition(-volume, limit - 1)[:limit]
+        top = top[numpy.lexsort((top, -volume[top]))]
+        names = dict(connection.execute(
+            "SELECT id, name FROM users WHERE id IN (SELECT value FROM json_each(?))",
+            (json.dumps(top.tolist()),)
+        ))
+        return [(names.get(user_id, f"#{user_id}"), int(posts[user_id]), int(chars[user_id]),
+                 round(int(chars[user_id]) / int(posts[user_id])))
+                for user_id in top.tolist()]
+    
+    def summary(self):
+        """Всего постов, авторов и медианная длина текста"""
+        columns = self.columns
+        lengths = columns['lengths']
+        if not len(lengths):
+            return {'posts': 0, 'authors': 0, 'median_length': 0}
+        return {
+            'posts': len(lengths),
+            'authors': len(numpy.unique(columns['user_ids'])),
+            'median_length': int(numpy.median(lengths)),
+        }
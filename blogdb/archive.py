@@ -0,0 +1,275 @@
+import glob
+import os
+import re
+import sqlite3
+from datetime import datetime
+
+from .changes import last_seq
+from .repository import SEARCH_LIMIT, STATS_LIMIT
+
+# Постов, переносимых в архив одной транзакцией
+ARCHIVE_BATCH_SIZE = 5000
+# Каталог архивных баз (рядом с основной базой)
+ARCHIVE_DIR = 'archive'
+# Период архивной базы: год или месяц создания поста
+ARCHIVE_PERIODS = ('year', 'month')
+# Архивируются только посты с датой ГГГГ-ММ-ДД в начале created_at
+DATED_POST = "created_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]*'"
+
+ARCHIVE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS {schema}.posts (
+        id INTEGER PRIMARY KEY,
+        title TEXT NOT NULL,
+        user_id INTEGER NOT NULL,
+        created_at TIMESTAMP,
+        body BLOB NOT NULL
+    )
+'''
+ARCHIVE_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_posts_user_id ON posts (user_id)",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_posts_created_at ON posts (created_at)",
+)
+
+def archive_dir(db_name):
+    """Каталог архивных баз для основной базы db_name"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_name)), ARCHIVE_DIR)
+
+def archive_path(db_name, period, directory=None):
+    """Файл архивной базы периода ('2020' или '2020-01')"""
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    return os.path.join(directory or archive_dir(db_name), f"{stem}-{period}.db")
+
+def schema_name(period):
+    """Имя присоединенной архивной базы периода"""
+    return 'archive_' + period.replace('-', '_')
+
+def period_bounds(period):
+    """Начало периода и начало следующего в формате created_at"""
+    year, _, month = period.partition('-')
+    year = int(year)
+    if not month:
+        return f"{year:04d}-01-01", f"{year + 1:04d}-01-01"
+    month = int(month)
+    if month == 12:
+        return f"{year:04d}-12-01", f"{year + 1:04d}-01-01"
+    return f"{year:04d}-{month:02d}-01", f"{year:04d}-{month + 1:02d}-01"
+
+def find_archives(db_name, directory=None):
+    """Периоды архивных баз, найденных в каталоге, по возрастанию"""
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    pattern = os.path.join(glob.escape(directory or archive_dir(db_name)),
+                           glob.escape(stem) + '-*.db')
+    periods = []
+    for path in glob.glob(pattern):
+        period = os.path.basename(path)[len(stem) + 1:-3]
+        if re.fullmatch(r'\d{4}(-\d{2})?', period):
+            periods.append(period)
+    return sorted(periods)
+
+def attached_schemas(connection):
+    """Имена присоединенных баз соединения"""
+    return {row[1] for row in connection.execute("PRAGMA database_list")}
+
+def attach_archive(connection, db_name, period, directory=None):
+    """Присоединение архивной базы периода (создается при первом обращении)"""
+    schema = schema_name(period)
+    attached = attached_schemas(connection) - {'main', 'temp'}
+    if schema not in attached:
+        limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(attached) >= limit:
+            raise ValueError(f"одновременно присоединяется не больше {limit} архивных баз, "
+                             "архивируйте по годам (--period year)")
+        path = archive_path(db_name, period, directory)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        connection.execute("ATTACH DATABASE ? AS " + schema, (path,))
+    return schema
+
+def attach_archives(connection, db_name, directory=None):
+    """Присоединение всех архивов и представление temp.all_posts (основные и архивные посты)"""
+    # ATTACH и DETACH невозможны внутри транзакции
+    connection.commit()
+    parts = ['''
+        SELECT p.id, p.title, p.user_id, p.created_at, b.body, NULL AS archive
+        FROM main.posts p
+        JOIN main.post_bodies b ON b.post_id = p.id
+    ''']
+    for period in find_archives(db_name, directory):
+        schema = attach_archive(connection, db_name, period, directory)
+        parts.append(f"SELECT id, title, user_id, created_at, body, '{period}' "
+                     f"FROM {schema}.posts")
+    view = f'''
+        CREATE TEMP VIEW all_posts AS
+        SELECT id, title, unpack_body(body) AS content, user_id, created_at, archive
+        FROM ({' UNION ALL '.join(parts)})
+    '''
+    # Временное представление не меняет файлы баз: query_only соединений
+    # для чтения снимается только на время его создания
+    query_only = connection.execute("PRAGMA query_only").fetchone()[0]
+    if query_only:
+        connection.execute("PRAGMA query_only = OFF")
+    try:
+        connection.execute("DROP VIEW IF EXISTS temp.all_posts")
+        connection.execute(view)
+    finally:
+        if query_only:
+            connection.execute("PRAGMA query_only = ON")
+    return len(parts) - 1
+
+def parse_cutoff(value):
+    """Граница архивации ГГГГ-ММ-ДД в формате created_at"""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%Y-%m-%d')
+    except (TypeError, ValueError):
+        raise ValueError(f"дата должна быть в формате ГГГГ-ММ-ДД: {value}")
+
+class PostArchiver:
+    """Перенос постов, созданных раньше границы, в архивные базы по периодам"""
+    
+    def __init__(self, db_name, before, period='year', batch_size=ARCHIVE_BATCH_SIZE,
+                 directory=None):
+        if period not in ARCHIVE_PERIODS:
+            raise ValueError(f"период архива: {', '.join(ARCHIVE_PERIODS)}")
+        self.db_name = db_name
+        self.before = parse_cutoff(before)
+        self.period = period
+        self.batch_size = max(1, batch_size)
+        self.directory = directory
+        
+        self.moved = 0
+        # Период -> перенесено постов
+        self.periods = {}
+        # Посты раньше границы с пустой или нестандартной датой остаются в основной базе
+        self.skipped = 0
+    
+    def pending_periods(self, connection):
+        """Периоды постов, которые нужно перенести"""
+        length = 4 if self.period == 'year' else 7
+        return [row[0] for row in connection.execute(
+            "SELECT DISTINCT substr(created_at, 1, ?) FROM posts "
+            f"WHERE created_at < ? AND {DATED_POST} ORDER BY 1",
+            (length, self.before)
+        )]
+    
+    def undated_posts(self, connection):
+        """Число постов раньше границы, дату которых нельзя отнести к периоду"""
+        return connection.execute(
+            f"SELECT COUNT(*) FROM posts WHERE created_at < ? AND NOT {DATED_POST}",
+            (self.before,)
+        ).fetchone()[0]
+    
+    def run(self, connection):
+        """Перенос пакетами; генератор отдает управление после каждой транзакции"""
+        connection.commit()
+        pending = self.pending_periods(connection)
+        self.skipped = self.undated_posts(connection)
+        # Иначе all_posts не сможет присоединить все архивы сразу
+        periods = set(pending) | set(find_archives(self.db_name, self.directory))
+        limit = connection.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+        if len(periods) > limit:
+            raise ValueError(f"получится {len(periods)} архивных баз, а присоединить можно "
+                             f"не больше {limit}; архивируйте по годам (--period year)")
+        
+        connection.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS archive_batch (id INTEGER PRIMARY KEY)"
+        )
+        for period in pending:
+            schema = attach_archive(connection, self.db_name, period, self.directory)
+            try:
+                connection.execute(ARCHIVE_TABLE.format(schema=schema))
+                for index in ARCHIVE_INDEXES:
+                    connection.execute(index.format(schema=schema))
+                connection.commit()
+                
+                start, end = period_bounds(period)
+                end = min(end, self.before)
+                while True:
+                    moved = self.move_batch(connection, schema, start, end)
+                    if not moved:
+                        break
+                    self.moved += moved
+                    self.periods[period] = self.periods.get(period, 0) + moved
+                    yield self.moved
+            finally:
+                if connection.in_transaction:
+                    connection.rollback()
+                connection.execute(f"DETACH DATABASE {schema}")
+        connection.execute("DROP TABLE IF EXISTS temp.archive_batch")
+    
+    def move_batch(self, connection, schema, start, end):
+        """Перенос одного пакета постов периода одной транзакцией"""
+        with connection:
+            connection.execute("DELETE FROM temp.archive_batch")
+            count = connection.execute(f'''
+                INSERT INTO temp.archive_batch (id)
+                SELECT id FROM posts
+                WHERE created_at >= ? AND created_at < ? AND {DATED_POST}
+                ORDER BY created_at
+                LIMIT ?
+            ''', (start, end, self.batch_size)).rowcount
+            if not count:
+                return 0
+            # Тело переносится сжатым, как хранится в post_bodies. OR REPLACE: пакет,
+            # записанный в архив до сбоя, при повторном запуске перезаписывается
+            connection.execute(f'''
+                INSERT OR REPLACE INTO {schema}.posts (id, title, user_id, created_at, body)
+                SELECT p.id, p.title, p.user_id, p.created_at, b.body
+                FROM posts p
+                JOIN post_bodies b ON b.post_id = p.id
+                WHERE p.id IN (SELECT id FROM temp.archive_batch)
+            ''')
+            # Триггеры удаляют тело поста, запись индекса и уменьшают счетчик автора
+            seq = last_seq(connection)
+            connection.execute("DELETE FROM posts WHERE id IN (SELECT id FROM temp.archive_batch)")
+            # Для получателей изменений пост перенесен, а не удален
+            connection.execute('''
+                UPDATE changelog SET op = 'A'
+                WHERE seq > ? AND table_name = 'posts' AND op = 'D'
+                  AND row_id IN (SELECT id FROM temp.archive_batch)
+            ''', (seq,))
+        return count
+    
+    def summary(self):
+        """Краткий итог архивации"""
+        periods = ', '.join(f"{period}: {count}" for period, count in self.periods.items())
+        summary = f"перенесено постов {self.moved}" + (f" ({periods})" if periods else "")
+        if self.skipped:
+            summary += f", пропущено постов без даты ГГГГ-ММ-ДД: {self.skipped}"
+        return summary
+
+class ArchiveRepository:
+    """Запросы по основным и архивным постам через представление temp.all_posts"""
+    
+    def __init__(self, connection, db_name, directory=None):
+        self.connection = connection
+        self.archives = attach_archives(connection, db_name, directory)
+    
+    def search(self, keyword, limit=SEARCH_LIMIT):
+        """Курсор по постам с текстом: id, title, author, created_at, фрагмент"""
+        return self.connection.execute('''
+            SELECT a.id, a.title, COALESCE(u.name, '—'), a.created_at, substr(a.content, 1, 80)
+            FROM all_posts a
+            LEFT JOIN users u ON u.id = a.user_id
+            WHERE a.title LIKE ? OR a.content LIKE ?
+            ORDER BY a.created_at DESC
+            LIMIT ?
+        ''', (f'%{keyword}%', f'%{keyword}%', limit))
+    
+    def top_posters(self, limit=STATS_LIMIT):
+        """Курсор по пользователям с наибольшим числом постов с учетом архива"""
+        return self.connection.execute('''
+            SELECT u.name, COUNT(*) AS posts
+            FROM all_posts a
+            JOIN users u ON u.id = a.user_id
+            GROUP BY a.user_id
+            ORDER BY posts DESC, a.user_id
+            LIMIT ?
+        ''', (limit,))
+    
+    def posts_by_period(self):
+        """Курсор по числу постов в основной базе и в каждом архиве"""
+        return self.connection.execute('''
+            SELECT COALESCE(archive, 'основная база'), COUNT(*)
+            FROM all_posts
+            GROUP BY archive
+            ORDER BY archive IS NOT NULL, archive
+        ''')
@@ -0,0 +1,187 @@
+import glob
+import os
+import re
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+# Страниц, копируемых за один шаг (источник заблокирован только на время шага)
+BACKUP_PAGES = 256
+# Пауза между шагами, секунды: в это время пишут другие соединения
+BACKUP_PAUSE = 0.005
+# Перезапусков из-за записи в источник, после которых база копируется за один шаг
+BACKUP_MAX_RESTARTS = 3
+# Каталог резервных копий и количество хранимых копий
+BACKUP_DIR = 'backups'
+BACKUP_KEEP = 7
+# Время в имени копии; копии прежних версий именованы с точностью до секунды
+SNAPSHOT_TIME_FORMAT = '%Y%m%d-%H%M%S-%f'
+SNAPSHOT_NAME = re.compile(r'\d{8}-\d{6}(-\d{6})?\.db')
+
+class BackupRestarted(Exception):
+    """Копирование начато заново слишком много раз"""
+
+class OnlineBackup:
+    """Копирование живой базы через sqlite3 backup API шагами с паузами"""
+    
+    def __init__(self, source, pages=BACKUP_PAGES, pause=BACKUP_PAUSE,
+                 max_restarts=BACKUP_MAX_RESTARTS, check=None):
+        self.source = source
+        self.pages = pages
+        self.pause = pause
+        self.max_restarts = max_restarts
+        # check() вызывается после каждого шага и может прервать копирование
+        self.check = check
+        
+        self.total = 0
+        # Длительность шагов - время, на которое источник был заблокирован
+        self.steps = []
+        self.restarts = 0
+        self.single_step = False
+        self.elapsed = 0.0
+    
+    def run(self, target_path):
+        """Копирование источника в файл target_path"""
+        started = time.perf_counter()
+        target = sqlite3.connect(target_path)
+        try:
+            try:
+                self.copy(target, self.pages)
+            except BackupRestarted:
+                # В режиме WAL шаг держит только транзакцию чтения и не мешает записи
+                self.single_step = True
+                self.copy(target, -1)
+        finally:
+            target.close()
+        self.elapsed = time.perf_counter() - started
+    
+    def copy(self, target, pages):
+        """Один вызов Connection.backup с учетом длительности шагов"""
+        step_started = [time.perf_counter()]
+        last_remaining = [None]
+        
+        def progress(status, remaining, total):
+            self.steps.append(time.perf_counter() - step_started[0])
+            self.total = total
+            # Источник изменило другое соединение: копирование начато заново
+            if last_remaining[0] is not None and remaining > last_remaining[0]:
+                self.restarts += 1
+                if self.restarts > self.max_restarts and pages > 0:
+                    raise BackupRestarted()
+            last_remaining[0] = remaining
+            if self.check:
+                self.check()
+            if remaining and self.pause:
+                time.sleep(self.pause)
+            step_started[0] = time.perf_counter()
+        
+        self.source.backup(target, pages=pages, progress=progress)
+    
+    def summary(self):
+        """Итоги копирования: страницы, шаги, перезапуски и время блокировок"""
+        ordered = sorted(self.steps)
+        def step_ms(fraction):
+            if not ordered:
+                return 0.0
+            index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+            return round(ordered[index] * 1000, 3)
+        
+        return {
+            'pages': self.total,
+            'steps': len(self.steps),
+            'restarts': self.restarts,
+            'single_step': self.single_step,
+            'elapsed_s': round(self.elapsed, 3),
+            'lock_p50_ms': step_ms(0.5),
+            'lock_p99_ms': step_ms(0.99),
+            'lock_max_ms': step_ms(1.0),
+        }
+
+def check_integrity(path):
+    """Проверка файла базы; возвращает список найденных проблем (пустой - все в порядке)"""
+    connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    try:
+        problems = [row[0] for row in connection.execute("PRAGMA integrity_check")
+                    if row[0] != 'ok']
+        problems += [f"нарушен внешний ключ: {table} rowid {rowid} -> {parent}"
+                     for table, rowid, parent, _ in
+                     connection.execute("PRAGMA foreign_key_check")]
+    finally:
+        connection.close()
+    return problems
+
+def snapshot_prefix(db_name):
+    """Начало имени копий базы: имя файла без расширения"""
+    return os.path.splitext(os.path.basename(db_name))[0] + '-'
+
+def list_snapshots(db_name, directory=BACKUP_DIR):
+    """Копии базы в каталоге, от старых к новым"""
+    prefix = snapshot_prefix(db_name)
+    pattern = os.path.join(glob.escape(directory), glob.escape(prefix) + '*.db')
+    # Копии базы blog-2.db не попадают в список копий blog.db
+    snapshots = [path for path in glob.glob(pattern)
+                 if SNAPSHOT_NAME.fullmatch(os.path.basename(path)[len(prefix):])]
+    # Время в имени копии сортируется как строка
+    return sorted(snapshots)
+
+def prune_snapshots(db_name, directory=BACKUP_DIR, keep=BACKUP_KEEP):
+    """Удаление старых копий сверх keep; возвращает удаленные файлы"""
+    snapshots = list_snapshots(db_name, directory)
+    removed = snapshots[:max(0, len(snapshots) - max(1, keep))]
+    for path in removed:
+        os.remove(path)
+    return removed
+
+def reserve_snapshot(db_name, directory):
+    """Имя новой копии; файл .partial создается сразу, чтобы имя не заняла другая копия"""
+    stamp = datetime.now()
+    while True:
+        path = os.path.join(directory, f"{snapshot_prefix(db_name)}"
+                                       f"{stamp:{SNAPSHOT_TIME_FORMAT}}.db")
+        if not os.path.exists(path):
+            try:
+                open(path + '.partial', 'x').close()
+                return path
+            except FileExistsError:
+                pass
+        # Имя занято: следующее время сохраняет порядок копий по имени
+        stamp += timedelta(microseconds=1)
+
+def create_snapshot(connection, db_name, directory=BACKUP_DIR, keep=BACKUP_KEEP,
+                    pages=BACKUP_PAGES, pause=BACKUP_PAUSE, check=None):
+    """Проверенная копия базы в каталоге с удалением старых; возвращает (файл, OnlineBackup)"""
+    os.makedirs(directory, exist_ok=True)
+    path = reserve_snapshot(db_name, directory)
+    # Копия получает окончательное имя только после проверки
+    partial = path + '.partial'
+    backup = OnlineBackup(connection, pages=pages, pause=pause, check=check)
+    try:
+        backup.run(partial)
+        # Копия - один самостоятельный файл, без журнала WAL рядом
+        target = sqlite3.connect(partial)
+        try:
+            target.execute("PRAGMA journal_mode = DELETE")
+        finally:
+            target.close()
+        problems = check_integrity(partial)
+        if problems:
+            raise RuntimeError(f"копия не прошла проверку: {'; '.join(problems[:5])}")
+        os.replace(partial, path)
+    finally:
+        if os.path.exists(partial):
+            os.remove(partial)
+    prune_snapshots(db_name, directory, keep)
+    return path, backup
+
+def restore_snapshot(snapshot_path, connection):
+    """Замена содержимого базы соединения connection проверенной копией"""
+    problems = check_integrity(snapshot_path)
+    if problems:
+        raise ValueError(f"копия повреждена: {'; '.join(problems[:5])}")
+    connection.commit()
+    source = sqlite3.connect(f"file:{snapshot_path}?mode=ro", uri=True)
+    try:
+        # Восстановление за один шаг: база не должна оказаться наполовину старой
+        source.backup(connection)
+    finally:
+        source.close()
@@ -0,0 +1,453 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from . import (
+    CONFIG_FILE, CSV_HEADERS, BulkImporter, CsvSource, ExportQuery, JsonSource,
+    PostRepository, SyncImporter, UserRepository, export_changes, export_rows, last_seq,
+    load_config, open_database, write_csv_rows, write_json_rows,
+)
+from .analytics import PostSnapshot, numpy
+
+# Масштабы синтетических данных: количество постов
+SCALES = {
+    '10k': 10_000,
+    '1m': 1_000_000,
+    '10m': 10_000_000,
+}
+# Среднее количество постов на пользователя
+POSTS_PER_USER = 10
+# Размер пакета при генерации данных
+GENERATE_BATCH_SIZE = 50_000
+# Повторы для операций с короткими запросами
+REPEATS = 200
+# Повторы для импорта и экспорта
+FILE_REPEATS = 3
+# Строк в одном файле импорта
+IMPORT_ROWS = 50_000
+# Строк на странице таблицы (как в графическом приложении)
+PAGE_SIZE = 200
+# Порог регрессии при сравнении запусков
+REGRESSION_THRESHOLD = 0.10
+# Бюджет запуска приложения до первой страницы таблиц (p50), мс
+STARTUP_BUDGET_MS = 400
+# Повторы замера запуска (каждый - новый процесс)
+STARTUP_REPEATS = 5
+# Запуск без окна: импорт модуля приложения, открытие базы и первые страницы таблиц
+STARTUP_SCRIPT = '''
+import sys
+import base
+from blogdb import PostRepository, UserRepository, open_database
+connection = open_database(sys.argv[1])
+UserRepository(connection).page(0, base.PAGE_SIZE)
+PostRepository(connection).page(0, base.PAGE_SIZE)
+'''
+# Каталог с base.py (графическое приложение)
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORDS = (
+    'база данных запрос индекс таблица пользователь пост поиск экспорт импорт '
+    'sqlite python json csv cache page index query table user post search'
+).split()
+
+def peak_rss_kb():
+    """Пиковый объем резидентной памяти процесса, КБ (None, если неизвестен)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # В macOS ru_maxrss в байтах, в Linux - в килобайтах
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу"""
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+def text(rng, words):
+    """Случайный текст из словаря"""
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+def generate(connection, posts, seed):
+    """Заполнение базы синтетическими пользователями и постами"""
+    rng = random.Random(seed)
+    users = max(1, posts // POSTS_PER_USER)
+    start = datetime(2020, 1, 1)
+    # При догенерации в существующую базу номера продолжают имеющиеся:
+    # email пользователей уникален, а новые посты ссылаются на новых авторов
+    offset = connection.execute("SELECT COALESCE(MAX(id), 0) FROM users").fetchone()[0]
+    
+    synchronous = connection.execute("PRAGMA synchronous").fetchone()[0]
+    connection.execute("PRAGMA synchronous = OFF")
+    for first in range(0, users, GENERATE_BATCH_SIZE):
+        with connection:
+            connection.executemany(
+                "INSERT INTO users (name, email) VALUES (?, ?)",
+                [(f"{text(rng, 2)} {number}", f"user{number}@bench.local")
+                 for number in range(offset + first,
+                                     offset + min(first + GENERATE_BATCH_SIZE, users))]
+            )
+    
+    for first in range(0, posts, GENERATE_BATCH_SIZE):
+        batch = []
+        for _ in range(first, min(first + GENERATE_BATCH_SIZE, posts)):
+            created_at = start + timedelta(seconds=rng.randrange(5 * 365 * 24 * 3600))
+            batch.append((text(rng, 4), text(rng, rng.randint(20, 120)),
+                          offset + rng.randint(1, users), created_at.strftime('%Y-%m-%d %H:%M:%S')))
+        with connection:
+            connection.executemany(
+                "INSERT INTO posts (title, content, user_id, created_at) VALUES (?, ?, ?, ?)",
+                batch
+            )
+    connection.execute(f"PRAGMA synchronous = {synchronous}")
+    return users
+
+class Benchmark:
+    """Замеры операций графического приложения над одной базой"""
+    
+    def __init__(self, connection, workdir, seed, db_name=None, profile=None,
+                 copy_writes=False):
+        self.connection = connection
+        self.db_name = db_name
+        self.profile = profile
+        # Изменяющие замеры выполняются на копии базы (база передана пользователем)
+        self.copy_writes = copy_writes
+        self.users = UserRepository(connection)
+        self.posts = PostRepository(connection)
+        self.workdir = workdir
+        self.rng = random.Random(seed)
+        self.results = {}
+    
+    def measure(self, name, operation, repeats):
+        """Многократный замер операции; operation() возвращает число строк"""
+        latencies = []
+        rows = 0
+        for run in range(repeats):
+            started = time.perf_counter()
+            rows += operation(run) or 0
+            latencies.append(time.perf_counter() - started)
+        
+        total = sum(latencies)
+        self.results[name] = {
+            'runs': repeats,
+            'rows': rows,
+            'seconds': round(total, 6),
+            'throughput': round(rows / total, 1) if total and rows else None,
+            'ops_per_second': round(repeats / total, 1) if total else None,
+            'p50_ms': round(percentile(latencies, 0.50) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 0.99) * 1000, 3),
+            'peak_rss_kb': peak_rss_kb(),
+        }
+        print(f"{name:20} p50 {self.results[name]['p50_ms']:>10} мс  "
+              f"p99 {self.results[name]['p99_ms']:>10} мс", file=sys.stderr)
+    
+    def run(self):
+        """Замеры чтения, затем операций, изменяющих базу"""
+        self.measure_startup()
+        max_user = self.connection.execute("SELECT MAX(id) FROM users").fetchone()[0] or 0
+        max_post = self.connection.execute("SELECT MAX(id) FROM posts").fetchone()[0] or 0
+        
+        # load_data: первая страница и случайная страница при прокрутке
+        self.measure('load_data', lambda run: len(self.users.page(
+            0 if run % 2 == 0 else self.rng.randrange(max_user + 1), PAGE_SIZE
+        )) + len(self.posts.page(
+            0 if run % 2 == 0 else self.rng.randrange(max_post + 1), PAGE_SIZE
+        )), REPEATS)
+        self.measure('show_user_stats',
+                     lambda run: len(self.users.top_posters().fetchall()), REPEATS)
+        self.measure('show_recent_posts',
+                     lambda run: len(self.posts.recent().fetchall()), REPEATS)
+        self.measure('search_users', lambda run: len(
+            self.users.search(self.rng.choice(WORDS)).fetchall()
+        ), REPEATS)
+        self.measure('search_posts', lambda run: len(
+            self.posts.search(self.rng.choice(WORDS)).fetchall()
+        ), REPEATS)
+        # Метаданные постов без тел и текст одного поста частями
+        self.measure('scan_posts', lambda run: len(self.connection.execute(
+            "SELECT id, title, user_id, created_at FROM posts"
+        ).fetchall()), FILE_REPEATS)
+        self.measure('show_post_content', lambda run: len(''.join(
+            self.posts.iter_content(self.rng.randint(1, max_post))
+        )) and 1, REPEATS)
+        
+        if numpy is not None:
+            self.measure_analytics()
+        
+        self.measure('export_to_csv', self.export_csv, FILE_REPEATS)
+        self.measure('export_to_json', self.export_json, FILE_REPEATS)
+        self.measure('export_csv_gzip', self.export_csv_gzip, FILE_REPEATS)
+        
+        if not self.copy_writes:
+            self.measure_writes()
+            return self.results
+        # Каждый запуск изменяет одни и те же данные, а база пользователя не растет
+        connection = self.connection
+        self.use_connection(self.copy_database())
+        try:
+            self.measure_writes()
+        finally:
+            self.connection.close()
+            self.use_connection(connection)
+        return self.results
+    
+    def measure_writes(self):
+        """Замеры операций, изменяющих базу"""
+        changes_since = last_seq(self.connection)
+        self.measure('add_user', lambda run: self.users.add(
+            f"bench {run}", f"bench-{run}-{time.time_ns()}@bench.local"
+        ) and 1, REPEATS)
+        # Выгрузка только изменений: зависит от их числа, а не от размера базы
+        self.measure('export_changes', lambda run: export_changes(
+            self.connection, self.path('changes.jsonl'), since=changes_since
+        )[0], FILE_REPEATS)
+        
+        files = self.prepare_imports()
+        self.measure('import_from_csv', lambda run: self.import_source(
+            CsvSource(files[run][0])
+        ), FILE_REPEATS)
+        self.measure('import_from_json', lambda run: self.import_source(
+            JsonSource(files[run][1], 'users')
+        ), FILE_REPEATS)
+        # Повторная загрузка того же файла: слияние без изменений
+        self.measure('sync_from_csv', lambda run: self.sync_source(
+            CsvSource(files[run][0])
+        ), FILE_REPEATS)
+    
+    def use_connection(self, connection):
+        """Замеры через другое соединение"""
+        self.connection = connection
+        self.users = UserRepository(connection)
+        self.posts = PostRepository(connection)
+    
+    def copy_database(self):
+        """Копия базы во временном каталоге (sqlite3 backup API); возвращает соединение"""
+        copy_name = self.path('bench-copy.db')
+        target = sqlite3.connect(copy_name)
+        try:
+            self.connection.backup(target)
+        finally:
+            target.close()
+        return open_database(copy_name, profile=self.profile)
+    
+    def measure_startup(self):
+        """Время запуска приложения в новом процессе и проверка бюджета"""
+        if not self.db_name or not os.path.exists(os.path.join(APP_DIR, 'base.py')):
+            return
+        
+        def start(run):
+            subprocess.run([sys.executable, '-c', STARTUP_SCRIPT,
+                            os.path.abspath(self.db_name)],
+                           cwd=APP_DIR, check=True, capture_output=True)
+        
+        try:
+            self.measure('startup', start, STARTUP_REPEATS)
+        except subprocess.CalledProcessError as e:
+            # Например, Python собран без tkinter
+            print(f"Замер запуска пропущен: {e.stderr.decode(errors='replace').strip()}",
+                  file=sys.stderr)
+            return
+        result = self.results['startup']
+        result['budget_ms'] = STARTUP_BUDGET_MS
+        result['within_budget'] = result['p50_ms'] <= STARTUP_BUDGET_MS
+        if not result['within_budget']:
+            print(f"Запуск дольше бюджета: {result['p50_ms']} мс > {STARTUP_BUDGET_MS} мс",
+                  file=sys.stderr)
+    
+    def measure_analytics(self):
+        """Загрузка снимка постов в NumPy и отчеты аналитики по нему"""
+        snapshots = []
+        
+        def load(run):
+            snapshots.append(PostSnapshot())
+            return snapshots[-1].refresh(self.connection)
+        
+        def reports(run):
+            snapshot = snapshots[-1]
+            snapshot.refresh(self.connection)
+            return (len(snapshot.posts_per_day()) + len(snapshot.posts_per_hour())
+                    + len(snapshot.length_histogram())
+                    + len(snapshot.top_authors(self.connection)))
+        
+        self.measure('analytics_load', load, FILE_REPEATS)
+        self.measure('analytics_reports', reports, REPEATS)
+    
+    def path(self, name):
+        """Путь к временному файлу замера"""
+        return os.path.join(self.workdir, name)
+    
+    def export_csv(self, run):
+        """Экспорт пользователей в CSV"""
+        return export_rows(self.connection, self.path('export.csv'), ExportQuery('users'))
+    
+    def export_json(self, run):
+        """Экспорт постов в JSON-массив"""
+        return export_rows(self.connection, self.path('export.json'), ExportQuery('posts'))
+    
+    def export_csv_gzip(self, run):
+        """Экспорт постов с авторами в сжатый CSV"""
+        return export_rows(self.connection, self.path('export.csv.gz'),
+                           ExportQuery('posts_with_authors'))
+    
+    def prepare_imports(self):
+        """Файлы импорта с новыми пользователями (готовятся вне замера)"""
+        files = []
+        for run in range(FILE_REPEATS):
+            csv_name = self.path(f'import-{run}.csv')
+            with open(csv_name, 'w', newline='', encoding='utf-8') as file:
+                write_csv_rows(file, (
+                    (0, f"csv {n}", f"csv-{run}-{n}@bench.local", '') for n in range(IMPORT_ROWS)
+                ), CSV_HEADERS['users'])
+            
+            json_name = self.path(f'import-{run}.jsonl')
+            with open(json_name, 'w', encoding='utf-8') as file:
+                write_json_rows(file, FakeCursor(('id', 'name', 'email', 'created_at'), (
+                    (0, f"json {n}", f"json-{run}-{n}@bench.local", '') for n in range(IMPORT_ROWS)
+                )), lines=True)
+            files.append((csv_name, json_name))
+        return files
+    
+    def sync_source(self, source):
+        """Синхронизация пользователей с источником; возвращает число строк"""
+        importer = SyncImporter('users')
+        for _ in importer.run(self.connection, source):
+            pass
+        return importer.processed
+    
+    def import_source(self, source):
+        """Импорт пользователей из источника; возвращает число добавленных"""
+        importer = BulkImporter('users')
+        for _ in importer.run(self.connection, source):
+            pass
+        return importer.inserted
+
+class FakeCursor:
+    """Генератор строк с описанием столбцов, как у курсора sqlite3"""
+    
+    def __init__(self, columns, rows):
+        self.description = [(column,) for column in columns]
+        self.rows = rows
+    
+    def __iter__(self):
+        return iter(self.rows)
+
+def command_run(args):
+    """Генерация данных и замеры"""
+    posts = SCALES[args.scale]
+    with tempfile.TemporaryDirectory() as workdir:
+        db_name = args.db or os.path.join(workdir, 'bench.db')
+        # Настройки соединения те же, что у приложения
+        profile = load_config(args.config).profile
+        connection = open_database(db_name, profile=profile)
+        existing = connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0]
+        if existing < posts:
+            print(f"Генерация {posts} постов...", file=sys.stderr)
+            generate(connection, posts - existing, args.seed)
+        users = connection.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+        
+        results = Benchmark(connection, workdir, args.seed, db_name, profile,
+                            copy_writes=args.db is not None).run()
+        connection.close()
+    
+    report = {
+        'meta': {
+            'scale': args.scale,
+            'posts': posts,
+            'users': users,
+            'seed': args.seed,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'profile': vars(profile),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        },
+        'peak_rss_kb': peak_rss_kb(),
+        'results': results,
+    }
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(output + '\n')
+    else:
+        print(output)
+
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """Сравнение двух отчетов; возвращает строки сравнения и список регрессий"""
+    lines = []
+    regressions = []
+    for name, old in baseline['results'].items():
+        new = current['results'].get(name)
+        if new is None:
+            continue
+        for metric in ('p50_ms', 'p99_ms'):
+            if not old[metric]:
+                continue
+            change = new[metric] / old[metric] - 1
+            lines.append(f"{name:20} {metric:8} {old[metric]:>10} -> {new[metric]:>10} "
+                         f"({change:+.1%})")
+            if change > threshold:
+                regressions.append((name, metric, change))
+        # Бюджет проверяется независимо от базового запуска
+        if new.get('within_budget') is False:
+            regressions.append((name, 'budget', new['p50_ms'] / new['budget_ms'] - 1))
+        if old.get('throughput') and new.get('throughput'):
+            change = new['throughput'] / old['throughput'] - 1
+            if -change > threshold:
+                regressions.append((name, 'throughput', change))
+    return lines, regressions
+
+def command_compare(args):
+    """Сравнение двух запусков; код возврата 1 при регрессии"""
+    with open(args.baseline, encoding='utf-8') as file:
+        baseline = json.load(file)
+    with open(args.current, encoding='utf-8') as file:
+        current = json.load(file)
+    
+    lines, regressions = compare(baseline, current, args.threshold)
+    print('\n'.join(lines))
+    for name, metric, change in regressions:
+        print(f"РЕГРЕССИЯ: {name} {metric} {change:+.1%}")
+    sys.exit(1 if regressions else 0)
+
+def main(argv=None):
+    """Запуск замеров из командной строки"""
+    parser = argparse.ArgumentParser(
+        prog='python -m blogdb.bench',
+        description="Замеры производительности операций с базой блога"
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    
+    run_parser = commands.add_parser('run', help="сгенерировать данные и выполнить замеры")
+    run_parser.add_argument('--scale', choices=sorted(SCALES), default='10k')
+    run_parser.add_argument('--db', help="база для повторного использования данных "
+                                         "(изменяющие замеры выполняются на ее копии)")
+    run_parser.add_argument('--config', default=CONFIG_FILE,
+                            help="файл настроек соединения")
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--output', '-o', help="файл отчета JSON")
+    run_parser.set_defaults(handler=command_run)
+    
+    compare_parser = commands.add_parser('compare', help="сравнить два отчета")
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=REGRESSION_THRESHOLD)
+    compare_parser.set_defaults(handler=command_compare)
+    
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+if __name__ == '__main__':
+    main()
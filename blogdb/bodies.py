@@ -0,0 +1,88 @@
+import codecs
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+# Первый байт тела поста - способ хранения
+CODEC_PLAIN = 0
+CODEC_ZLIB = 1
+CODEC_ZSTD = 2
+COMPRESSIONS = {'none': CODEC_PLAIN, 'zlib': CODEC_ZLIB, 'zstd': CODEC_ZSTD}
+# Короткие тексты не сжимаются: выигрыш меньше заголовка сжатого потока
+MIN_COMPRESS_SIZE = 256
+# Размер блока при потоковом чтении тела поста
+BODY_CHUNK_SIZE = 64 * 1024
+
+def codec_for(compression):
+    """Код способа сжатия по имени из настроек"""
+    if compression not in COMPRESSIONS:
+        raise ValueError(f"Неизвестный способ сжатия: {compression} "
+                         f"(допустимы: {', '.join(COMPRESSIONS)})")
+    if compression == 'zstd' and zstandard is None:
+        raise ValueError("Для сжатия zstd установите пакет zstandard")
+    return COMPRESSIONS[compression]
+
+def pack_body(text, codec=CODEC_ZLIB):
+    """Тело поста для хранения: байт способа сжатия и данные"""
+    if text is None:
+        return None
+    data = str(text).encode('utf-8')
+    if codec != CODEC_PLAIN and len(data) >= MIN_COMPRESS_SIZE:
+        if codec == CODEC_ZSTD:
+            packed = zstandard.ZstdCompressor().compress(data)
+        else:
+            packed = zlib.compress(data, 6)
+        # Несжимаемые тексты хранятся как есть
+        if len(packed) < len(data):
+            return bytes([codec]) + packed
+    return bytes([CODEC_PLAIN]) + data
+
+def decompressor(codec):
+    """Функция потоковой распаковки блоков тела поста"""
+    if codec == CODEC_PLAIN:
+        return lambda chunk: chunk
+    if codec == CODEC_ZLIB:
+        return zlib.decompressobj().decompress
+    if codec == CODEC_ZSTD:
+        if zstandard is None:
+            raise ValueError("Пост сжат zstd: установите пакет zstandard")
+        return zstandard.ZstdDecompressor().decompressobj().decompress
+    raise ValueError(f"Неизвестный способ хранения тела поста: {codec}")
+
+def unpack_body(blob):
+    """Текст поста из хранимого тела"""
+    if blob is None:
+        return None
+    blob = bytes(blob)
+    return decompressor(blob[0])(blob[1:]).decode('utf-8')
+
+def iter_body(blob, chunk_size=BODY_CHUNK_SIZE):
+    """Потоковое чтение текста из sqlite3.Blob без загрузки тела целиком"""
+    header = blob.read(1)
+    if not header:
+        return
+    decompress = decompressor(header[0])
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = blob.read(chunk_size)
+        if not chunk:
+            break
+        text = decoder.decode(decompress(chunk))
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+def register_body_functions(connection, compression='zlib'):
+    """SQL-функции pack_body и unpack_body для триггеров и представления post_texts"""
+    # Без них соединение читает метаданные постов, но вставка и изменение постов,
+    # тексты в post_texts и поиск по posts_fts завершаются ошибкой "no such function":
+    # внешний код открывает базу через blogdb.connect или вызывает эту функцию сам
+    codec = codec_for(compression)
+    connection.create_function('pack_body', 1, lambda text: pack_body(text, codec),
+                               deterministic=True)
+    connection.create_function('unpack_body', 1, unpack_body, deterministic=True)
@@ -0,0 +1,85 @@
+import threading
+import time
+import weakref
+from collections import OrderedDict
+
+# Количество отчетов в кэше
+REPORT_CACHE_SIZE = 64
+# Время жизни отчета в кэше, секунды
+REPORT_CACHE_TTL = 300
+
+class ResultCache:
+    """LRU-кэш результатов отчетов с поколениями таблиц и сроком жизни"""
+    
+    def __init__(self, max_entries=REPORT_CACHE_SIZE, ttl=REPORT_CACHE_TTL):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        # key -> (поколения таблиц, время сохранения, строки)
+        self.entries = OrderedDict()
+        # Поколение таблицы растет при каждом ее изменении
+        self.generations = {}
+        # Общее поколение: изменение, про которое неизвестно, какие таблицы затронуты
+        self.epoch = 0
+        # Последний PRAGMA data_version каждого соединения; закрытые соединения
+        # не удерживаются
+        self.data_versions = weakref.WeakKeyDictionary()
+        self.hits = 0
+        self.misses = 0
+    
+    def invalidate(self, *tables):
+        """Устаревание отчетов по таблицам (без аргументов - по всем)"""
+        with self.lock:
+            if not tables:
+                self.epoch += 1
+            for table in tables:
+                self.generations[table] = self.generations.get(table, 0) + 1
+    
+    def sync(self, connection):
+        """Учет изменений базы, сделанных другими соединениями и процессами"""
+        # data_version меняется после фиксации транзакции любым другим соединением
+        version = connection.execute("PRAGMA data_version").fetchone()[0]
+        with self.lock:
+            try:
+                previous = self.data_versions.get(connection)
+                self.data_versions[connection] = version
+            except TypeError:
+                # Соединение открыто не через blogdb.connect, отслеживать его нельзя
+                previous = None
+        # Новое соединение: изменения до его открытия неизвестны
+        if previous != version:
+            self.invalidate()
+    
+    def stamp(self, tables):
+        """Текущие поколения таблиц, от которых зависит отчет"""
+        with self.lock:
+            return (self.epoch,) + tuple(self.generations.get(table, 0) for table in tables)
+    
+    def lookup(self, connection, key, tables):
+        """Строки отчета из кэша (или None) и поколения для сохранения нового результата"""
+        self.sync(connection)
+        stamp = self.stamp(tables)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                entry_stamp, stored_at, rows = entry
+                if entry_stamp == stamp and time.monotonic() - stored_at < self.ttl:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return rows, stamp
+                del self.entries[key]
+            self.misses += 1
+        return None, stamp
+    
+    def store(self, key, stamp, rows):
+        """Сохранение результата, полученного при поколениях stamp"""
+        with self.lock:
+            self.entries[key] = (stamp, time.monotonic(), rows)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+    
+    def clear(self):
+        """Очистка кэша"""
+        with self.lock:
+            self.entries.clear()
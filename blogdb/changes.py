@@ -0,0 +1,151 @@
+import heapq
+import json
+
+from .export import DEFAULT_EXPORT_COLUMNS, EXPORT_VIEWS, export_format, open_export_file
+from .files import write_csv_rows
+
+# Таблицы, изменения которых записываются в журнал
+CHANGE_TABLES = ('users', 'posts')
+
+def last_seq(connection):
+    """Номер последнего записанного изменения (0, если изменений не было)"""
+    row = connection.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'changelog'"
+    ).fetchone()
+    return row[0] if row else 0
+
+def compacted_through(connection):
+    """Номер, до которого журнал сжат: более ранние изменения удалены"""
+    return connection.execute(
+        "SELECT COALESCE(MAX(seq), 0) FROM changelog_compactions"
+    ).fetchone()[0]
+
+def get_cursor(connection, consumer):
+    """Последний выгруженный получателем номер или None"""
+    row = connection.execute(
+        "SELECT seq FROM changelog_cursors WHERE consumer = ?", (consumer,)
+    ).fetchone()
+    return row[0] if row else None
+
+def save_cursor(connection, consumer, seq):
+    """Сохранение номера, до которого получатель выгрузил изменения"""
+    with connection:
+        connection.execute('''
+            INSERT INTO changelog_cursors (consumer, seq) VALUES (?, ?)
+            ON CONFLICT (consumer) DO UPDATE
+            SET seq = excluded.seq, updated_at = CURRENT_TIMESTAMP
+        ''', (consumer, seq))
+
+def compact_changelog(connection, through=None):
+    """Удаление изменений, выгруженных всеми получателями; возвращает число удаленных"""
+    if through is None:
+        through = connection.execute("SELECT MIN(seq) FROM changelog_cursors").fetchone()[0]
+        if through is None:
+            return 0
+    with connection:
+        deleted = connection.execute(
+            "DELETE FROM changelog WHERE seq <= ?", (through,)
+        ).rowcount
+        if deleted:
+            connection.execute('''
+                INSERT INTO changelog_compactions (seq, deleted) VALUES (?, ?)
+                ON CONFLICT (seq) DO UPDATE SET deleted = deleted + excluded.deleted
+            ''', (through, deleted))
+    return deleted
+
+class ChangeQuery:
+    """Изменения одной таблицы в диапазоне номеров: текущее состояние каждой строки"""
+    
+    def __init__(self, table, columns=None):
+        if table not in CHANGE_TABLES:
+            raise ValueError(f"Журнал изменений не ведется для {table}")
+        self.table = table
+        self.source = EXPORT_VIEWS[table]
+        self.columns = list(columns or DEFAULT_EXPORT_COLUMNS[table])
+        unknown = [column for column in self.columns if column not in self.source['columns']]
+        if unknown:
+            raise ValueError(f"Неизвестные столбцы для {table}: {', '.join(unknown)}")
+        # Без id удаление нельзя применить
+        if 'id' not in self.columns:
+            self.columns.insert(0, 'id')
+    
+    @property
+    def header(self):
+        """Заголовок CSV: номер изменения, операция и выбранные столбцы"""
+        return ['Seq', 'Op'] + [self.source['columns'][column][1] for column in self.columns]
+    
+    def sql(self):
+        """Запрос: первый номер, последний номер, операция и столбцы строки"""
+        key = self.source['key']
+        # id удаленной строки берется из журнала
+        expressions = ["c.row_id" if column == 'id' else self.source['columns'][column][0]
+                       for column in self.columns]
+        # Операция: I - строка добавлена после since, U - изменена, D - удалена,
+        # A - пост перенесен в архивную базу (значения не выгружаются, только id);
+        # строка, добавленная и удаленная после since, не выгружается
+        return f'''
+            WITH changed AS (
+                SELECT row_id, MIN(seq) AS first_seq, MAX(seq) AS seq
+                FROM changelog
+                WHERE seq > ? AND seq <= ? AND table_name = ?
+                GROUP BY row_id
+            )
+            SELECT c.first_seq, c.seq,
+                   CASE WHEN {key} IS NOT NULL THEN CASE WHEN f.op = 'I' THEN 'I' ELSE 'U' END
+                        WHEN l.op = 'A' THEN 'A' ELSE 'D' END,
+                   {', '.join(expressions)}
+            FROM changed c
+            JOIN changelog f ON f.seq = c.first_seq
+            JOIN changelog l ON l.seq = c.seq
+            LEFT JOIN {self.source['from']} ON {key} = c.row_id
+            WHERE {key} IS NOT NULL OR f.op != 'I' OR l.op = 'A'
+            ORDER BY c.first_seq
+        '''
+    
+    def execute(self, connection, since, until):
+        """Курсор по изменениям с номерами в диапазоне (since, until]"""
+        return connection.execute(self.sql(), (since, until, self.table))
+
+def write_change_lines(file, connection, queries, since, until):
+    """Изменения нескольких таблиц в JSON Lines в порядке первого изменения строки"""
+    def records(query):
+        for row in query.execute(connection, since, until):
+            yield row[0], query, row
+    
+    count = 0
+    # Строка выводится на месте первого изменения: авторы раньше своих новых постов
+    for _, query, row in heapq.merge(*(records(query) for query in queries),
+                                     key=lambda record: record[0]):
+        record = {'seq': row[1], 'table': query.table, 'op': row[2]}
+        record.update(zip(query.columns, row[3:]))
+        file.write(json.dumps(record, ensure_ascii=False) + '\n')
+        count += 1
+    return count
+
+def export_changes(connection, filename, tables=CHANGE_TABLES, since=0, columns=None):
+    """Выгрузка изменений после since в CSV или JSON Lines; возвращает (записей, номер)"""
+    file_format = export_format(filename)
+    if file_format == 'json':
+        raise ValueError("Изменения выгружаются в CSV или JSON Lines (.jsonl)")
+    if file_format == 'csv' and len(tables) != 1:
+        raise ValueError("В CSV выгружаются изменения одной таблицы")
+    queries = [ChangeQuery(table, columns if len(tables) == 1 else None) for table in tables]
+    
+    # Номер последнего изменения и строки читаются из одного снимка базы
+    connection.commit()
+    connection.execute("BEGIN")
+    try:
+        horizon = compacted_through(connection)
+        if since < horizon:
+            raise ValueError(f"изменения до номера {horizon} удалены при сжатии журнала, "
+                             "выполните полный экспорт")
+        until = last_seq(connection)
+        with open_export_file(filename) as file:
+            if file_format == 'csv':
+                rows = (row[1:] for row in queries[0].execute(connection, since, until))
+                count = write_csv_rows(file, rows, queries[0].header)
+            else:
+                count = write_change_lines(file, connection, queries, since, until)
+    finally:
+        connection.rollback()
+    return count, until
@@ -0,0 +1,84 @@
+import configparser
+import os
+
+from .bodies import codec_for
+
+# Файл настроек по умолчанию (в текущем каталоге)
+CONFIG_FILE = 'blogdb.ini'
+# Имя файла базы данных по умолчанию
+DEFAULT_DB_NAME = 'blog_database.db'
+
+# Допустимые значения PRAGMA
+JOURNAL_MODES = ('delete', 'truncate', 'persist', 'memory', 'wal', 'off')
+SYNCHRONOUS_MODES = ('off', 'normal', 'full', 'extra')
+TEMP_STORES = ('default', 'file', 'memory')
+# Параметры раздела [connection]
+PROFILE_KEYS = ('journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store',
+                'busy_timeout', 'readers')
+
+class ConnectionProfile:
+    """Настройки соединений с базой (PRAGMA и пул соединений для чтения)"""
+    
+    def __init__(self, journal_mode='wal', synchronous='normal', cache_size=-65536,
+                 mmap_size=256 * 1024 * 1024, temp_store='memory', busy_timeout=5000,
+                 readers=2, compression='zlib'):
+        self.journal_mode = self.choice('journal_mode', journal_mode, JOURNAL_MODES)
+        self.synchronous = self.choice('synchronous', synchronous, SYNCHRONOUS_MODES)
+        # Отрицательное значение - размер в КБ, положительное - в страницах
+        self.cache_size = int(cache_size)
+        self.mmap_size = max(0, int(mmap_size))
+        self.temp_store = self.choice('temp_store', temp_store, TEMP_STORES)
+        # Ожидание блокировки другим писателем, мс
+        self.busy_timeout = max(0, int(busy_timeout))
+        # Соединений только для чтения (отчеты и экспорт параллельно с записью)
+        self.readers = max(0, int(readers))
+        # Сжатие новых тел постов: none, zlib или zstd
+        self.compression = str(compression).strip().lower()
+        codec_for(self.compression)
+    
+    @staticmethod
+    def choice(name, value, allowed):
+        """Проверка значения из списка допустимых"""
+        value = str(value).strip().lower()
+        if value not in allowed:
+            raise ValueError(f"{name}: недопустимое значение '{value}' "
+                             f"(допустимы: {', '.join(allowed)})")
+        return value
+    
+    def apply(self, connection, read_only=False):
+        """Применение настроек к открытому соединению"""
+        connection.execute(f"PRAGMA busy_timeout = {self.busy_timeout}")
+        # Режим журнала хранится в файле базы, его меняет только пишущее соединение
+        if not read_only:
+            connection.execute(f"PRAGMA journal_mode = {self.journal_mode}")
+        connection.execute(f"PRAGMA synchronous = {self.synchronous}")
+        connection.execute(f"PRAGMA cache_size = {self.cache_size}")
+        connection.execute(f"PRAGMA mmap_size = {self.mmap_size}")
+        connection.execute(f"PRAGMA temp_store = {self.temp_store}")
+
+class Config:
+    """Настройки приложения из INI-файла"""
+    
+    def __init__(self, db_name, profile):
+        self.db_name = db_name
+        self.profile = profile
+
+def load_config(filename=CONFIG_FILE, db_name=None):
+    """Чтение настроек; без файла используются значения по умолчанию"""
+    parser = configparser.ConfigParser()
+    if filename and os.path.exists(filename):
+        with open(filename, encoding='utf-8') as file:
+            parser.read_file(file)
+    
+    section = parser['connection'] if parser.has_section('connection') else {}
+    options = {key: section[key] for key in PROFILE_KEYS if key in section}
+    if parser.has_option('storage', 'compression'):
+        options['compression'] = parser.get('storage', 'compression')
+    try:
+        profile = ConnectionProfile(**options)
+    except ValueError as e:
+        raise ValueError(f"{filename}: {e}")
+    
+    if db_name is None:
+        db_name = parser.get('database', 'path', fallback=DEFAULT_DB_NAME)
+    return Config(db_name, profile)
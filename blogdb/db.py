@@ -0,0 +1,91 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from .bodies import register_body_functions
+from .instrument import InstrumentedConnection
+
+class Connection(sqlite3.Connection):
+    """Соединение sqlite3, на которое можно сослаться через weakref (кэш отчетов)"""
+
+def connect(db_name, monitor=None, profile=None, read_only=False):
+    """Соединение с базой и включенной проверкой внешних ключей"""
+    # Соединение для чтения может передаваться между потоками пула
+    options = {'check_same_thread': False} if read_only else {}
+    # С монитором (QueryMonitor) время каждого запроса учитывается в нем
+    if monitor is None:
+        connection = sqlite3.connect(db_name, factory=Connection, **options)
+    else:
+        connection = sqlite3.connect(db_name, factory=InstrumentedConnection, **options)
+        connection.monitor = monitor
+    # Без этого ON DELETE CASCADE не срабатывает
+    connection.execute("PRAGMA foreign_keys = ON")
+    # Тела постов хранятся сжатыми, триггеры и представления используют эти функции
+    register_body_functions(connection, profile.compression if profile else 'zlib')
+    if profile is not None:
+        profile.apply(connection, read_only)
+    if read_only:
+        connection.execute("PRAGMA query_only = ON")
+    return connection
+
+class ReadPool:
+    """Пул соединений только для чтения"""
+    
+    def __init__(self, db_name, size, monitor=None, profile=None):
+        self.db_name = db_name
+        self.size = size
+        self.monitor = monitor
+        self.profile = profile
+        self.idle = queue.LifoQueue()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.closed = False
+    
+    @contextmanager
+    def acquire(self):
+        """Свободное соединение на время блока; ждет, если все заняты"""
+        connection = self.take()
+        try:
+            yield connection
+        finally:
+            # Незавершенная транзакция чтения удерживала бы старый снимок базы
+            if connection.in_transaction:
+                connection.rollback()
+            if self.closed:
+                connection.close()
+            else:
+                self.idle.put(connection)
+    
+    def take(self):
+        """Соединение из пула; новое создается, пока пул не заполнен"""
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            create = self.created < self.size
+            if create:
+                self.created += 1
+        if create:
+            return connect(self.db_name, self.monitor, self.profile, read_only=True)
+        return self.idle.get()
+    
+    def close(self):
+        """Закрытие свободных соединений; занятые закрываются при возврате"""
+        self.closed = True
+        while True:
+            try:
+                self.idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+def has_table(connection, name):
+    """Наличие таблицы (в том числе виртуальной) в базе"""
+    return connection.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,)
+    ).fetchone() is not None
+
+def is_interrupted(error):
+    """Ошибка вызвана прерыванием запроса через Connection.interrupt"""
+    return isinstance(error, sqlite3.OperationalError) and str(error) == 'interrupted'
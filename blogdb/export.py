@@ -0,0 +1,208 @@
+import gzip
+import io
+import os
+
+try:
+    import zstandard
+except ImportError:  # необязательная зависимость
+    zstandard = None
+
+from .files import is_json_lines, write_csv_rows, write_json_rows
+
+# Строк в одной странице keyset-выборки экспорта
+EXPORT_PAGE_SIZE = 10_000
+# Буфер записи в файл экспорта
+EXPORT_BUFFER_SIZE = 1024 * 1024
+# Уровень сжатия gzip: быстрые уровни не отстают от записи на диск
+EXPORT_GZIP_LEVEL = 1
+
+# Текст поста распаковывается, только если столбец выбран
+POST_CONTENT = "(SELECT unpack_body(body) FROM post_bodies WHERE post_id = p.id)"
+
+# Источники экспорта: FROM, ключ keyset-пагинации и столбцы (имя -> (выражение, заголовок CSV))
+EXPORT_VIEWS = {
+    'users': {
+        'title': "Пользователи",
+        'from': "users u",
+        'key': "u.id",
+        'columns': {
+            'id': ("u.id", 'ID'),
+            'name': ("u.name", 'Name'),
+            'email': ("u.email", 'Email'),
+            'created_at': ("u.created_at", 'Created At'),
+            'post_count': ("u.post_count", 'Post Count'),
+        },
+    },
+    'posts': {
+        'title': "Посты",
+        'from': "posts p",
+        'key': "p.id",
+        'columns': {
+            'id': ("p.id", 'ID'),
+            'title': ("p.title", 'Title'),
+            'content': (POST_CONTENT, 'Content'),
+            'user_id': ("p.user_id", 'User ID'),
+            'created_at': ("p.created_at", 'Created At'),
+        },
+    },
+    'posts_with_authors': {
+        'title': "Посты с авторами",
+        'from': "posts p JOIN users u ON u.id = p.user_id",
+        'key': "p.id",
+        'columns': {
+            'id': ("p.id", 'ID'),
+            'title': ("p.title", 'Title'),
+            'content': (POST_CONTENT, 'Content'),
+            'user_id': ("p.user_id", 'User ID'),
+            'author': ("u.name", 'Author'),
+            'author_email': ("u.email", 'Author Email'),
+            'created_at': ("p.created_at", 'Created At'),
+        },
+    },
+}
+
+# Столбцы по умолчанию совпадают с форматом импорта
+DEFAULT_EXPORT_COLUMNS = {
+    'users': ('id', 'name', 'email', 'created_at'),
+    'posts': ('id', 'title', 'content', 'user_id', 'created_at'),
+    'posts_with_authors': ('id', 'title', 'content', 'user_id', 'author', 'created_at'),
+}
+
+# Условия фильтров: имя -> (столбец источника, оператор)
+EXPORT_FILTERS = {
+    'user_id': ('user_id', '='),
+    'since': ('created_at', '>='),
+    'until': ('created_at', '<'),
+    'contains': (None, 'LIKE'),
+}
+
+# Текстовые столбцы, в которых ищет фильтр contains
+EXPORT_TEXT_COLUMNS = ('name', 'email', 'title', 'content', 'author', 'author_email')
+
+# Сжатие по расширению файла
+COMPRESSION_SUFFIXES = {
+    '.gz': 'gzip',
+    '.zst': 'zstd',
+}
+
+def split_compression(filename):
+    """Имя файла без расширения сжатия и вид сжатия (None без сжатия)"""
+    base, ext = os.path.splitext(filename)
+    compression = COMPRESSION_SUFFIXES.get(ext.lower())
+    return (base, compression) if compression else (filename, None)
+
+def export_format(filename):
+    """Формат экспорта по расширению: csv, jsonl или json"""
+    base, _ = split_compression(filename)
+    if os.path.splitext(base)[1].lower() == '.csv':
+        return 'csv'
+    return 'jsonl' if is_json_lines(base) else 'json'
+
+def open_export_file(filename):
+    """Текстовый файл для записи, сжимаемый по расширению (.gz, .zst)"""
+    _, compression = split_compression(filename)
+    if compression == 'gzip':
+        return gzip.open(filename, 'wt', compresslevel=EXPORT_GZIP_LEVEL, newline='',
+                         encoding='utf-8')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("Для сжатия zstd установите пакет zstandard")
+        raw = open(filename, 'wb')
+        stream = zstandard.ZstdCompressor().stream_writer(raw, closefd=True)
+        return io.TextIOWrapper(stream, encoding='utf-8', newline='')
+    return open(filename, 'w', newline='', encoding='utf-8', buffering=EXPORT_BUFFER_SIZE)
+
+class ExportQuery:
+    """Выборка для экспорта: источник, столбцы и фильтры"""
+    
+    def __init__(self, view, columns=None, filters=None, page_size=EXPORT_PAGE_SIZE):
+        if view not in EXPORT_VIEWS:
+            raise ValueError(f"Неизвестный источник экспорта: {view}")
+        self.view = view
+        self.source = EXPORT_VIEWS[view]
+        self.columns = list(columns or DEFAULT_EXPORT_COLUMNS[view])
+        unknown = [column for column in self.columns if column not in self.source['columns']]
+        if unknown:
+            raise ValueError(f"Неизвестные столбцы для {view}: {', '.join(unknown)}")
+        self.filters = {name: value for name, value in (filters or {}).items()
+                        if value not in (None, '')}
+        for name in self.filters:
+            if name not in EXPORT_FILTERS:
+                raise ValueError(f"Неизвестный фильтр: {name}")
+        self.page_size = page_size
+    
+    @property
+    def header(self):
+        """Заголовок CSV выбранных столбцов"""
+        return [self.source['columns'][column][1] for column in self.columns]
+    
+    def where(self):
+        """Условия фильтров и их параметры"""
+        conditions = []
+        parameters = []
+        for name, value in self.filters.items():
+            column, operator = EXPORT_FILTERS[name]
+            if column is None:
+                # Поиск подстроки во всех текстовых столбцах источника
+                texts = [expression for key, (expression, _) in self.source['columns'].items()
+                         if key in EXPORT_TEXT_COLUMNS]
+                conditions.append('(' + ' OR '.join(f"{text} LIKE ?" for text in texts) + ')')
+                parameters.extend([f'%{value}%'] * len(texts))
+                continue
+            if column not in self.source['columns']:
+                raise ValueError(f"Фильтр {name} не применим к {self.view}")
+            conditions.append(f"{self.source['columns'][column][0]} {operator} ?")
+            parameters.append(value)
+        return conditions, parameters
+    
+    def sql(self):
+        """Запрос одной страницы: ключ, затем выбранные столбцы"""
+        expressions = [self.source['columns'][column][0] for column in self.columns]
+        conditions, _ = self.where()
+        where = ' AND '.join([f"{self.source['key']} > ?"] + conditions)
+        return (f"SELECT {self.source['key']}, {', '.join(expressions)} "
+                f"FROM {self.source['from']} WHERE {where} "
+                f"ORDER BY {self.source['key']} LIMIT ?")
+    
+    def execute(self, connection, check=None):
+        """Курсор по выборке, читающий базу страницами"""
+        return PagedCursor(self, connection, check)
+
+class PagedCursor:
+    """Итератор строк экспорта с keyset-пагинацией и description как у курсора"""
+    
+    def __init__(self, query, connection, check=None):
+        self.query = query
+        self.connection = connection
+        # check() вызывается между страницами (например, для отмены задачи)
+        self.check = check
+        self.description = [(column,) + (None,) * 6 for column in query.columns]
+        self.pages = 0
+    
+    def __iter__(self):
+        sql = self.query.sql()
+        _, parameters = self.query.where()
+        last_key = 0
+        while True:
+            if self.check:
+                self.check()
+            # Каждая страница - отдельный короткий запрос: память ограничена
+            # размером страницы, а чтение не удерживает снимок базы на весь экспорт
+            rows = self.connection.execute(
+                sql, [last_key, *parameters, self.query.page_size]
+            ).fetchall()
+            self.pages += 1
+            for row in rows:
+                yield row[1:]
+            if len(rows) < self.query.page_size:
+                return
+            last_key = rows[-1][0]
+
+def export_rows(connection, filename, query, check=None):
+    """Потоковый экспорт выборки в файл; формат и сжатие по расширению"""
+    cursor = query.execute(connection, check)
+    file_format = export_format(filename)
+    with open_export_file(filename) as file:
+        if file_format == 'csv':
+            return write_csv_rows(file, cursor, query.header)
+        return write_json_rows(file, cursor, lines=file_format == 'jsonl')
@@ -0,0 +1,352 @@
+import csv
+import json
+import os
+import re
+import sqlite3
+
+from .db import is_interrupted
+
+# Количество строк в одной транзакции массового импорта
+IMPORT_BATCH_SIZE = 5000
+# Размер блока чтения при разборе больших JSON-массивов
+JSON_CHUNK_SIZE = 64 * 1024
+
+# Столбцы таблиц в порядке файлов экспорта
+TABLE_COLUMNS = {
+    'users': ('id', 'name', 'email', 'created_at'),
+    'posts': ('id', 'title', 'content', 'user_id', 'created_at'),
+}
+
+# Заголовки CSV-файлов экспорта
+CSV_HEADERS = {
+    'users': ['ID', 'Name', 'Email', 'Created At'],
+    'posts': ['ID', 'Title', 'Content', 'User ID', 'Created At'],
+}
+
+# Окончание имени файла отчета об отклоненных строках
+REJECT_SUFFIX = '.rejected.csv'
+
+# Пробельные символы JSON и разделитель после элемента массива (запятая или конец)
+JSON_WHITESPACE = re.compile(r'[ \t\n\r]*')
+JSON_SEPARATOR = re.compile(r'[ \t\n\r]*([,\]])[ \t\n\r]*')
+
+def is_csv(filename):
+    """Файл в формате CSV (по расширению)"""
+    return os.path.splitext(filename)[1].lower() == '.csv'
+
+def is_json_lines(filename):
+    """Файл в формате JSON Lines (по расширению)"""
+    return os.path.splitext(filename)[1].lower() in ('.jsonl', '.ndjson')
+
+def iter_json_array(file, chunk_size=JSON_CHUNK_SIZE):
+    """Поэлементное чтение JSON-массива без загрузки файла целиком"""
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = '', 0, False
+    
+    def skip_whitespace():
+        # Пробелы до следующего значимого символа; при нехватке дочитывается блок
+        nonlocal buffer, pos, eof
+        while True:
+            pos = JSON_WHITESPACE.match(buffer, pos).end()
+            if pos < len(buffer) or eof:
+                return
+            buffer, pos = file.read(chunk_size), 0
+            eof = not buffer
+    
+    skip_whitespace()
+    if buffer[pos:pos + 1] != '[':
+        raise ValueError("Ожидался JSON-массив (для построчного формата используйте .jsonl)")
+    pos += 1
+    skip_whitespace()
+    if buffer[pos:pos + 1] == ']':
+        pos += 1
+    else:
+        while True:
+            # Запятая без значения: [,1], [1,,2] или [1,]
+            if buffer[pos:pos + 1] in (',', ']'):
+                raise json.JSONDecodeError("Ожидалось значение", buffer, pos)
+            try:
+                if pos == len(buffer):
+                    raise json.JSONDecodeError("Неожиданный конец файла", buffer, pos)
+                item, end = decoder.raw_decode(buffer, pos)
+                # Значение на границе блока может продолжаться в следующем
+                if end == len(buffer) and not eof:
+                    raise json.JSONDecodeError("Неполное значение", buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                chunk = file.read(chunk_size)
+                eof = not chunk
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                continue
+            
+            yield item
+            # После элемента - ровно одна запятая или конец массива
+            match = JSON_SEPARATOR.match(buffer, end)
+            if match and (match.end() < len(buffer) or eof):
+                pos = match.end()
+                if match.group(1) == ']':
+                    break
+                continue
+            # Разделитель на границе блока
+            pos = end
+            skip_whitespace()
+            separator = buffer[pos:pos + 1]
+            pos += 1
+            if separator == ']':
+                break
+            if separator != ',':
+                raise json.JSONDecodeError("Ожидалась запятая или ']'", buffer, pos - 1)
+            skip_whitespace()
+    
+    skip_whitespace()
+    if pos < len(buffer):
+        raise json.JSONDecodeError("Лишние данные после массива", buffer, pos)
+
+class CsvSource:
+    """Потоковое чтение CSV с оценкой прогресса по позиции в файле"""
+    
+    def __init__(self, filename):
+        self.filename = filename
+        self.size = os.path.getsize(filename) or 1
+        self.file = None
+    
+    def __iter__(self):
+        """Строки файла вместе с номерами строк"""
+        with open(self.filename, 'r', newline='', encoding='utf-8') as file:
+            self.file = file
+            reader = csv.reader(file)
+            next(reader, None)  # Пропускаем заголовок
+            for row in reader:
+                yield reader.line_num, row
+    
+    def progress(self):
+        """Доля прочитанного файла от 0 до 1"""
+        if self.file is None or self.file.closed:
+            return 1.0
+        return min(self.file.buffer.tell() / self.size, 1.0)
+
+class JsonSource:
+    """Потоковое чтение JSON-массива или JSON Lines"""
+    
+    def __init__(self, filename, table):
+        self.filename = filename
+        self.columns = TABLE_COLUMNS[table]
+        self.lines = is_json_lines(filename)
+        self.size = os.path.getsize(filename) or 1
+        self.file = None
+    
+    def __iter__(self):
+        """Записи файла в порядке столбцов таблицы вместе с номерами"""
+        with open(self.filename, 'r', encoding='utf-8') as file:
+            self.file = file
+            for number, item in enumerate(self.items(file), 1):
+                if isinstance(item, dict):
+                    yield number, [item.get(column) for column in self.columns]
+                else:
+                    yield number, item if isinstance(item, list) else [item]
+    
+    def items(self, file):
+        """Разобранные JSON-значения файла"""
+        if not self.lines:
+            yield from iter_json_array(file)
+            return
+        
+        for line_no, line in enumerate(file, 1):
+            if line.strip():
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as e:
+                    raise ValueError(f"Строка {line_no}: {e}")
+    
+    def progress(self):
+        """Доля прочитанного файла от 0 до 1"""
+        if self.file is None or self.file.closed:
+            return 1.0
+        return min(self.file.buffer.tell() / self.size, 1.0)
+
+def write_csv_rows(file, cursor, header):
+    """Запись строк курсора в CSV по мере чтения"""
+    writer = csv.writer(file)
+    writer.writerow(header)
+    count = 0
+    for row in cursor:
+        writer.writerow(row)
+        count += 1
+    return count
+
+def write_json_rows(file, cursor, lines=False):
+    """Запись строк курсора в JSON-массив или JSON Lines по мере чтения"""
+    columns = [description[0] for description in cursor.description]
+    count = 0
+    if not lines:
+        file.write('[')
+    for row in cursor:
+        item = json.dumps(dict(zip(columns, row)), ensure_ascii=False)
+        if lines:
+            file.write(item + '\n')
+        else:
+            file.write((',\n  ' if count else '\n  ') + item)
+        count += 1
+    if not lines:
+        file.write('\n]\n' if count else ']\n')
+    return count
+
+class BulkImporter:
+    """Массовый импорт строк пакетами через executemany"""
+    
+    # Запросы вставки; пост без существующего автора не вставляется
+    INSERT_SQL = {
+        'users': "INSERT OR IGNORE INTO users (name, email) VALUES (?, ?)",
+        'posts': '''
+            INSERT INTO posts (title, content, user_id)
+            SELECT ?, ?, ? WHERE EXISTS (SELECT 1 FROM users WHERE id = ?)
+        ''',
+    }
+    
+    def __init__(self, table, batch_size=IMPORT_BATCH_SIZE, fast=False, reject_path=None):
+        self.connection = None
+        self.table = table
+        self.sql = self.INSERT_SQL[table]
+        self.batch_size = max(1, batch_size)
+        self.fast = fast
+        self.reject_path = reject_path
+        self.reject_file = None
+        self.reject_writer = None
+        
+        self.processed = 0
+        self.inserted = 0
+        self.skipped = 0
+        self.rejected = 0
+    
+    @staticmethod
+    def text(value):
+        """Строковое значение поля без пробелов по краям"""
+        return '' if value is None else str(value).strip()
+    
+    def parse(self, row):
+        """Проверка строки и преобразование в параметры запроса"""
+        if self.table == 'users':
+            # Формат экспорта: ID, Name, Email, Created At
+            if len(row) < 3:
+                raise ValueError("недостаточно столбцов")
+            name, email = self.text(row[1]), self.text(row[2])
+            if not name or not email:
+                raise ValueError("пустое имя или email")
+            return (name, email)
+        
+        # Формат постов: ID, Title, Content, User ID, Created At
+        if len(row) < 4:
+            raise ValueError("недостаточно столбцов")
+        title, content = self.text(row[1]), self.text(row[2])
+        if not title or not content:
+            raise ValueError("пустой заголовок или содержание")
+        try:
+            user_id = int(row[3])
+        except (TypeError, ValueError):
+            raise ValueError("ID автора должен быть числом")
+        return (title, content, user_id, user_id)
+    
+    def run(self, connection, source):
+        """Импорт строк источника; генератор отдает управление после каждого пакета"""
+        return self.run_parsed(connection, self.parsed(source))
+    
+    def parsed(self, source):
+        """Строки источника с параметрами запроса или ошибкой проверки"""
+        for line_no, row in source:
+            try:
+                yield line_no, row, self.parse(row)
+            except ValueError as e:
+                yield line_no, row, e
+    
+    def run_parsed(self, connection, rows):
+        """Вставка строк (line_no, row, params или ValueError) пакетами"""
+        self.connection = connection
+        saved_pragmas = self.enable_fast_mode() if self.fast else None
+        try:
+            batch = []
+            for line_no, row, params in rows:
+                self.processed += 1
+                if isinstance(params, ValueError):
+                    self.reject(line_no, row, str(params))
+                else:
+                    batch.append((line_no, row, params))
+                
+                if len(batch) >= self.batch_size:
+                    self.flush(batch)
+                    batch = []
+                    yield self.processed
+            
+            if batch:
+                self.flush(batch)
+            self.finish()
+            yield self.processed
+        finally:
+            if saved_pragmas:
+                self.restore_pragmas(*saved_pragmas)
+            if self.reject_file:
+                self.reject_file.close()
+    
+    def flush(self, batch):
+        """Вставка пакета строк одной транзакцией"""
+        rejected = 0
+        try:
+            # rowcount не учитывает изменения, сделанные триггерами
+            inserted = self.connection.executemany(
+                self.sql, [params for _, _, params in batch]
+            ).rowcount
+            self.connection.commit()
+        except sqlite3.Error as e:
+            self.connection.rollback()
+            if is_interrupted(e):
+                raise
+            # Поиск проблемных строк поштучной вставкой
+            inserted = 0
+            for line_no, row, params in batch:
+                try:
+                    inserted += self.connection.execute(self.sql, params).rowcount
+                except sqlite3.Error as e:
+                    self.reject(line_no, row, str(e))
+                    rejected += 1
+            self.connection.commit()
+        
+        self.inserted += inserted
+        self.skipped += len(batch) - inserted - rejected
+    
+    def finish(self):
+        """Завершение импорта после последнего пакета, пока действует ускоренный режим"""
+    
+    def reject(self, line_no, row, reason):
+        """Запись отклоненной строки в отчет"""
+        self.rejected += 1
+        if not self.reject_path:
+            return
+        if self.reject_writer is None:
+            self.reject_file = open(self.reject_path, 'w', newline='', encoding='utf-8')
+            self.reject_writer = csv.writer(self.reject_file)
+            self.reject_writer.writerow(['Line', 'Reason', 'Data'])
+        self.reject_writer.writerow([line_no, reason, *row])
+    
+    def enable_fast_mode(self):
+        """Ускоренная запись на время импорта"""
+        self.connection.commit()
+        synchronous = self.connection.execute("PRAGMA synchronous").fetchone()[0]
+        journal_mode = self.connection.execute("PRAGMA journal_mode").fetchone()[0]
+        self.connection.execute("PRAGMA synchronous = OFF")
+        self.connection.execute("PRAGMA journal_mode = WAL")
+        return synchronous, journal_mode
+    
+    def restore_pragmas(self, synchronous, journal_mode):
+        """Возврат настроек после импорта"""
+        self.connection.commit()
+        try:
+            self.connection.execute(f"PRAGMA journal_mode = {journal_mode}")
+        except sqlite3.OperationalError:
+            pass  # База занята другим соединением, WAL остается включенным
+        self.connection.execute(f"PRAGMA synchronous = {int(synchronous)}")
+    
+    def summary(self):
+        """Краткий итог импорта"""
+        return (f"добавлено {self.inserted}, пропущено {self.skipped}, "
+                f"отклонено {self.rejected}")
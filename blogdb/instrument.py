@@ -0,0 +1,220 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# Порог медленного запроса, секунды
+SLOW_QUERY_THRESHOLD = 0.1
+# Файл журнала медленных запросов и параметры ротации
+SLOW_LOG_FILE = 'slow_queries.log'
+SLOW_LOG_MAX_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+
+slow_log = logging.getLogger('blogdb.slow')
+
+# Запросы, для которых EXPLAIN QUERY PLAN имеет смысл
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+def configure_slow_log(filename=SLOW_LOG_FILE, max_bytes=SLOW_LOG_MAX_BYTES,
+                       backups=SLOW_LOG_BACKUPS):
+    """Запись медленных запросов в файл с ротацией"""
+    # logging.handlers импортируется здесь: модуль не нужен без журнала в файл
+    import logging.handlers
+    
+    handler = logging.handlers.RotatingFileHandler(
+        filename, maxBytes=max_bytes, backupCount=backups, encoding='utf-8'
+    )
+    handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+    slow_log.addHandler(handler)
+    slow_log.setLevel(logging.INFO)
+    slow_log.propagate = False
+    return handler
+
+def normalize(sql):
+    """Текст запроса в одну строку для группировки"""
+    return ' '.join(sql.split())
+
+class QueryStat:
+    """Накопленная статистика одного запроса"""
+    
+    def __init__(self, operation, sql):
+        self.operation = operation
+        self.sql = sql
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.rows = 0
+        self.slow = 0
+    
+    def as_row(self):
+        """Строка для таблицы метрик: времена в миллисекундах"""
+        return (self.operation or '', self.sql, self.count,
+                round(self.total * 1000, 1),
+                round(self.total * 1000 / self.count, 2) if self.count else 0,
+                round(self.max * 1000, 1), self.rows, self.slow)
+
+class QueryMonitor:
+    """Сбор времени выполнения запросов со всех соединений"""
+    
+    def __init__(self, slow_threshold=SLOW_QUERY_THRESHOLD):
+        self.slow_threshold = slow_threshold
+        self.lock = threading.Lock()
+        self.stats = {}
+        # Текущая операция приложения отдельно для каждого потока
+        self.context = threading.local()
+    
+    @contextmanager
+    def operation(self, name):
+        """Пометка запросов внутри блока именем операции (load_data, search_users...)"""
+        previous = getattr(self.context, 'name', None)
+        self.context.name = name
+        try:
+            yield
+        finally:
+            self.context.name = previous
+    
+    def record(self, connection, sql, parameters, elapsed, rows):
+        """Учет выполненного запроса"""
+        operation = getattr(self.context, 'name', None)
+        key = (operation, normalize(sql))
+        slow = elapsed >= self.slow_threshold
+        with self.lock:
+            stat = self.stats.get(key)
+            if stat is None:
+                stat = self.stats[key] = QueryStat(*key)
+            stat.count += 1
+            stat.total += elapsed
+            stat.max = max(stat.max, elapsed)
+            stat.rows += rows
+            stat.slow += slow
+        
+        if slow:
+            plan = self.explain(connection, sql, parameters)
+            slow_log.warning(
+                "%.1f мс, строк: %d, операция: %s\n  %s\n  план: %s",
+                elapsed * 1000, rows, operation or '-', key[1], plan
+            )
+    
+    @staticmethod
+    def explain(connection, sql, parameters):
+        """План выполнения запроса одной строкой"""
+        if not normalize(sql).upper().startswith(EXPLAINABLE):
+            return '-'
+        try:
+            # Обычный курсор, чтобы EXPLAIN не попал в статистику
+            cursor = sqlite3.Cursor(connection)
+            plan = cursor.execute('EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+        except sqlite3.Error as e:
+            return f"недоступен ({e})"
+        return '; '.join(row[-1] for row in plan)
+    
+    def snapshot(self, limit=None):
+        """Статистика запросов, самые затратные первыми"""
+        with self.lock:
+            stats = sorted(self.stats.values(), key=lambda stat: stat.total, reverse=True)
+            return [stat.as_row() for stat in stats[:limit]]
+    
+    def reset(self):
+        """Сброс накопленной статистики"""
+        with self.lock:
+            self.stats.clear()
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Курсор, измеряющий время выполнения и чтения каждого запроса"""
+    
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.current = None
+    
+    def execute(self, sql, parameters=()):
+        self.finish()
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            # Для изменяющих запросов учитываются затронутые строки
+            rows = max(self.rowcount, 0) if self.description is None else 0
+            self.current = [sql, parameters, time.perf_counter() - started, rows]
+    
+    def executemany(self, sql, seq_of_parameters):
+        self.finish()
+        seq_of_parameters = list(seq_of_parameters)
+        started = time.perf_counter()
+        try:
+            super().executemany(sql, seq_of_parameters)
+        finally:
+            first = seq_of_parameters[0] if seq_of_parameters else ()
+            self.current = [sql, first, time.perf_counter() - started, max(self.rowcount, 0)]
+            self.finish()
+        return self
+    
+    def timed_fetch(self, fetch, *args):
+        """Чтение строк с учетом затраченного времени"""
+        started = time.perf_counter()
+        try:
+            result = fetch(*args)
+        except StopIteration:
+            self.finish()
+            raise
+        if self.current:
+            self.current[2] += time.perf_counter() - started
+        return result
+    
+    def fetchone(self):
+        row = self.timed_fetch(super().fetchone)
+        if row is None:
+            self.finish()
+        elif self.current:
+            self.current[3] += 1
+        return row
+    
+    def fetchmany(self, size=None):
+        rows = self.timed_fetch(super().fetchmany, size or self.arraysize)
+        if self.current:
+            self.current[3] += len(rows)
+        if not rows:
+            self.finish()
+        return rows
+    
+    def fetchall(self):
+        rows = self.timed_fetch(super().fetchall)
+        if self.current:
+            self.current[3] += len(rows)
+        self.finish()
+        return rows
+    
+    def __next__(self):
+        row = self.timed_fetch(super().__next__)
+        if self.current:
+            self.current[3] += 1
+        return row
+    
+    def close(self):
+        self.finish()
+        super().close()
+    
+    def __del__(self):
+        self.finish()
+    
+    def finish(self):
+        """Передача статистики завершенного запроса монитору"""
+        current, self.current = getattr(self, 'current', None), None
+        monitor = getattr(self.connection, 'monitor', None)
+        if current and monitor:
+            sql, parameters, elapsed, rows = current
+            monitor.record(self.connection, sql, parameters, elapsed, rows)
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Соединение, все запросы которого проходят через InstrumentedCursor"""
+    
+    monitor = None
+    
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+    
+    def execute(self, sql, parameters=()):
+        return self.cursor().execute(sql, parameters)
+    
+    def executemany(self, sql, seq_of_parameters):
+        return self.cursor().executemany(sql, seq_of_parameters)
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from urllib.parse import urlsplit
+
+from .bench import percentile
+
+# Запросы по умолчанию: чтение страниц, отчетов и поиск
+DEFAULT_PATHS = (
+    '/users?limit=100',
+    '/posts?limit=100',
+    '/posts/recent',
+    '/stats/top-posters',
+    '/search/posts?q=sqlite',
+    '/search/users?q=user',
+)
+DEFAULT_CONCURRENCY = 16
+DEFAULT_DURATION = 10
+
+async def read_response(reader):
+    """Чтение ответа сервера; возвращает код и тело"""
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("сервер закрыл соединение")
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    
+    if headers.get('transfer-encoding') == 'chunked':
+        body = b''
+        while True:
+            size = int((await reader.readline()).strip(), 16)
+            chunk = await reader.readexactly(size + 2)
+            if not size:
+                break
+            body += chunk[:-2]
+    else:
+        body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return status, headers, body
+
+class LoadTest:
+    """Нагрузка на HTTP API несколькими соединениями keep-alive"""
+    
+    def __init__(self, url, paths=DEFAULT_PATHS, concurrency=DEFAULT_CONCURRENCY,
+                 duration=DEFAULT_DURATION, seed=42):
+        address = urlsplit(url)
+        self.host = address.hostname or '127.0.0.1'
+        self.port = address.port or 80
+        self.paths = list(paths)
+        self.concurrency = max(1, concurrency)
+        self.duration = duration
+        self.rng = random.Random(seed)
+        # path -> задержки успешных запросов, секунды
+        self.latencies = {path: [] for path in self.paths}
+        self.errors = {path: 0 for path in self.paths}
+    
+    async def client(self, deadline):
+        """Один клиент: запросы подряд до окончания времени"""
+        reader = writer = None
+        while time.perf_counter() < deadline:
+            path = self.rng.choice(self.paths)
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.open_connection(self.host, self.port)
+                started = time.perf_counter()
+                writer.write(f"GET {path} HTTP/1.1\r\nHost: {self.host}\r\n\r\n"
+                             .encode('latin-1'))
+                await writer.drain()
+                status, headers, _ = await read_response(reader)
+                elapsed = time.perf_counter() - started
+            except (OSError, asyncio.IncompleteReadError, ValueError):
+                self.errors[path] += 1
+                if writer is not None:
+                    writer.close()
+                reader = writer = None
+                # Сервер недоступен: не перегружать цикл повторными попытками
+                await asyncio.sleep(0.05)
+                continue
+            
+            if status >= 400:
+                self.errors[path] += 1
+            else:
+                self.latencies[path].append(elapsed)
+            if headers.get('connection') == 'close':
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+    
+    async def run(self):
+        """Запуск клиентов; возвращает отчет"""
+        started = time.perf_counter()
+        deadline = started + self.duration
+        await asyncio.gather(*(self.client(deadline) for _ in range(self.concurrency)))
+        return self.report(time.perf_counter() - started)
+    
+    def report(self, elapsed):
+        """Запросы в секунду и задержки p50/p99/p99.9 по каждому пути и в целом"""
+        def stats(latencies, errors):
+            result = {
+                'requests': len(latencies),
+                'errors': errors,
+                'rps': round(len(latencies) / elapsed, 1),
+            }
+            if latencies:
+                for name, fraction in (('p50_ms', 0.5), ('p99_ms', 0.99), ('p999_ms', 0.999)):
+                    result[name] = round(percentile(latencies, fraction) * 1000, 3)
+                result['max_ms'] = round(max(latencies) * 1000, 3)
+            return result
+        
+        every = [value for values in self.latencies.values() for value in values]
+        return {
+            'meta': {
+                'url': f"http://{self.host}:{self.port}",
+                'concurrency': self.concurrency,
+                'duration_s': round(elapsed, 3),
+            },
+            'total': stats(every, sum(self.errors.values())),
+            'paths': {path: stats(self.latencies[path], self.errors[path])
+                      for path in self.paths},
+        }
+
+def print_report(report):
+    """Итоги нагрузки в виде таблицы"""
+    print(f"{'Запрос':32} {'rps':>9} {'p50, мс':>9} {'p99, мс':>9} {'p99.9, мс':>10} "
+          f"{'ошибок':>7}")
+    rows = list(report['paths'].items()) + [('ВСЕГО', report['total'])]
+    for path, stats in rows:
+        print(f"{path:32} {stats['rps']:>9} {stats.get('p50_ms', '-'):>9} "
+              f"{stats.get('p99_ms', '-'):>9} {stats.get('p999_ms', '-'):>10} "
+              f"{stats['errors']:>7}")
+
+def main(argv=None):
+    """Запуск нагрузочного теста из командной строки"""
+    parser = argparse.ArgumentParser(
+        prog='python -m blogdb.loadtest',
+        description="Нагрузочный тест HTTP API (python -m blogdb.server)"
+    )
+    parser.add_argument('--url', default='http://127.0.0.1:8080')
+    parser.add_argument('--concurrency', '-c', type=int, default=DEFAULT_CONCURRENCY,
+                        help="одновременных соединений")
+    parser.add_argument('--duration', '-d', type=float, default=DEFAULT_DURATION,
+                        help="длительность, секунды")
+    parser.add_argument('--paths', nargs='+', default=list(DEFAULT_PATHS),
+                        help="пути запросов GET (выбираются случайно)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', '-o', help="файл отчета JSON")
+    args = parser.parse_args(argv)
+    
+    test = LoadTest(args.url, args.paths, args.concurrency, args.duration, args.seed)
+    report = asyncio.run(test.run())
+    print_report(report)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as file:
+            file.write(json.dumps(report, indent=2, ensure_ascii=False) + '\n')
+    # Код 1, если ни один запрос не выполнен успешно
+    sys.exit(0 if report['total']['requests'] else 1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,452 @@
+import sqlite3
+
+from .db import has_table
+
+# Полнотекстовый индекс FTS5 поверх users (external content) и триггеры,
+# поддерживающие его в актуальном состоянии
+USERS_FTS_SCHEMA = (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS users_fts USING fts5(
+        name, email,
+        content='users', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_fts_insert AFTER INSERT ON users BEGIN
+        INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_fts_delete AFTER DELETE ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_fts_update AFTER UPDATE OF name, email ON users BEGIN
+        INSERT INTO users_fts (users_fts, rowid, name, email)
+        VALUES ('delete', old.id, old.name, old.email);
+        INSERT INTO users_fts (rowid, name, email) VALUES (new.id, new.name, new.email);
+    END
+    ''',
+)
+
+# Индексация поста при вставке: текст еще в posts.content
+POSTS_FTS_INSERT = '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    '''
+
+# Первоначальные индексы и триггеры: users и posts (external content)
+FTS_SCHEMA = USERS_FTS_SCHEMA + (
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5(
+        title, content,
+        content='posts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+    ''',
+    POSTS_FTS_INSERT,
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_fts_update AFTER UPDATE OF title, content ON posts BEGIN
+        INSERT INTO posts_fts (posts_fts, rowid, title, content)
+        VALUES ('delete', old.id, old.title, old.content);
+        INSERT INTO posts_fts (rowid, title, content) VALUES (new.id, new.title, new.content);
+    END
+    ''',
+)
+
+# Миграции схемы; номер миграции = ее позиция в списке MIGRATIONS,
+# примененная версия хранится в PRAGMA user_version
+
+def migrate_initial_schema(connection):
+    """Исходные таблицы users и posts"""
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT UNIQUE NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            title TEXT NOT NULL,
+            content TEXT NOT NULL,
+            user_id INTEGER NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE
+        )
+    ''')
+
+def migrate_post_indexes(connection):
+    """Индексы для JOIN/GROUP BY по автору и сортировки по дате"""
+    # Индекс содержит rowid, поэтому COUNT(p.id) по автору читается только из него
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_posts_user_id ON posts (user_id)")
+    connection.execute("CREATE INDEX IF NOT EXISTS idx_posts_created_at ON posts (created_at)")
+
+def migrate_orphan_posts(connection):
+    """Удаление постов удаленных пользователей перед включением внешних ключей"""
+    # Пока foreign_keys был выключен, каскадное удаление не срабатывало
+    connection.execute(
+        "DELETE FROM posts WHERE user_id NOT IN (SELECT id FROM users)"
+    )
+    violations = connection.execute("PRAGMA foreign_key_check").fetchall()
+    if violations:
+        raise sqlite3.IntegrityError(f"Нарушены внешние ключи: {violations[:5]}")
+
+def migrate_fulltext_search(connection):
+    """Полнотекстовые индексы и однократное заполнение их существующими данными"""
+    existing = connection.execute(
+        "SELECT COUNT(*) FROM sqlite_master WHERE name IN ('users_fts', 'posts_fts')"
+    ).fetchone()[0]
+    try:
+        for statement in FTS_SCHEMA:
+            connection.execute(statement)
+    except sqlite3.OperationalError:
+        # SQLite собран без FTS5: поиск работает через LIKE
+        return
+    
+    if existing < 2:
+        connection.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+        connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+
+def rebuild_post_counts(connection):
+    """Пересчет счетчиков постов; возвращает число исправленных пользователей"""
+    cursor = connection.execute('''
+        UPDATE users
+        SET post_count = (SELECT COUNT(*) FROM posts WHERE user_id = users.id)
+        WHERE post_count != (SELECT COUNT(*) FROM posts WHERE user_id = users.id)
+    ''')
+    return cursor.rowcount
+
+def migrate_post_counts(connection):
+    """Счетчик постов пользователя, поддерживаемый триггерами"""
+    connection.execute(
+        "ALTER TABLE users ADD COLUMN post_count INTEGER NOT NULL DEFAULT 0"
+    )
+    rebuild_post_counts(connection)
+    
+    connection.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_count_insert AFTER INSERT ON posts BEGIN
+            UPDATE users SET post_count = post_count + 1 WHERE id = new.user_id;
+        END
+    ''')
+    connection.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_count_delete AFTER DELETE ON posts BEGIN
+            UPDATE users SET post_count = post_count - 1 WHERE id = old.user_id;
+        END
+    ''')
+    connection.execute('''
+        CREATE TRIGGER IF NOT EXISTS posts_count_update AFTER UPDATE OF user_id ON posts
+        WHEN old.user_id IS NOT new.user_id BEGIN
+            UPDATE users SET post_count = post_count - 1 WHERE id = old.user_id;
+            UPDATE users SET post_count = post_count + 1 WHERE id = new.user_id;
+        END
+    ''')
+    # Рейтинг читается по индексу без сортировки
+    connection.execute(
+        "CREATE INDEX IF NOT EXISTS idx_users_post_count ON users (post_count DESC, id)"
+    )
+
+# Представление с распакованными текстами: источник индекса posts_fts
+POST_TEXTS_VIEW = '''
+    CREATE VIEW IF NOT EXISTS post_texts AS
+    SELECT p.id, p.title, unpack_body(b.body) AS content
+    FROM posts p
+    JOIN post_bodies b ON b.post_id = p.id
+'''
+
+# Индекс постов по представлению post_texts (тексты хранятся в post_bodies)
+POST_TEXTS_FTS = '''
+    CREATE VIRTUAL TABLE posts_fts USING fts5(
+        title, content,
+        content='post_texts', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2'
+    )
+'''
+
+# Тело поста до и после изменения (для индекса и триггеров)
+STORED_CONTENT = "(SELECT unpack_body(body) FROM post_bodies WHERE post_id = {}.id)"
+
+def post_body_triggers(fulltext):
+    """Триггеры, переносящие posts.content в post_bodies и обновляющие индекс"""
+    old_content = STORED_CONTENT.format('old')
+    new_content = STORED_CONTENT.format('new')
+    # posts.content заполняется только при вставке и изменении; текст сразу
+    # переносится в post_bodies, а в строке поста остается пустая строка
+    insert = '''
+        CREATE TRIGGER IF NOT EXISTS posts_body_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO post_bodies (post_id, body) VALUES (new.id, pack_body(new.content));
+            UPDATE posts SET content = '' WHERE id = new.id;
+        END
+    '''
+    update = f'''
+        CREATE TRIGGER IF NOT EXISTS posts_body_update AFTER UPDATE OF title, content ON posts
+        WHEN new.content != '' OR old.title IS NOT new.title BEGIN
+            {"INSERT INTO posts_fts (posts_fts, rowid, title, content) "
+             f"VALUES ('delete', old.id, old.title, {old_content});" if fulltext else ""}
+            UPDATE post_bodies SET body = pack_body(new.content)
+            WHERE post_id = new.id AND new.content != '';
+            {"INSERT INTO posts_fts (rowid, title, content) "
+             f"VALUES (new.id, new.title, {new_content});" if fulltext else ""}
+            UPDATE posts SET content = '' WHERE id = new.id AND new.content != '';
+        END
+    '''
+    triggers = [insert, update]
+    if fulltext:
+        # BEFORE: при каскадном удалении тело поста еще доступно
+        triggers.append(f'''
+            CREATE TRIGGER IF NOT EXISTS posts_fts_delete BEFORE DELETE ON posts BEGIN
+                INSERT INTO posts_fts (posts_fts, rowid, title, content)
+                VALUES ('delete', old.id, old.title, {old_content});
+            END
+        ''')
+    return triggers
+
+def migrate_post_bodies(connection):
+    """Перенос текстов постов в отдельную таблицу со сжатием"""
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS post_bodies (
+            post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE,
+            body BLOB NOT NULL
+        )
+    ''')
+    connection.execute(
+        "INSERT INTO post_bodies (post_id, body) SELECT id, pack_body(content) FROM posts"
+    )
+    
+    # Старые триггеры индекса читают posts.content, который теперь пуст
+    connection.execute("DROP TRIGGER IF EXISTS posts_fts_delete")
+    connection.execute("DROP TRIGGER IF EXISTS posts_fts_update")
+    connection.execute("UPDATE posts SET content = ''")
+    connection.execute(POST_TEXTS_VIEW)
+    
+    fulltext = has_table(connection, 'posts_fts')
+    if fulltext:
+        # Индекс читает тексты из представления; вставку индексирует posts_fts_insert
+        connection.execute("DROP TABLE posts_fts")
+        connection.execute(POST_TEXTS_FTS)
+        connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    
+    for trigger in post_body_triggers(fulltext):
+        connection.execute(trigger)
+
+# Журнал изменений (CDC): триггеры записывают только таблицу, id строки и операцию,
+# значения при экспорте читаются из самих таблиц
+CHANGELOG_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_changelog_insert AFTER INSERT ON users BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('users', new.id, 'I');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_changelog_update
+    AFTER UPDATE OF id, name, email, created_at ON users
+    WHEN old.id IS NOT new.id OR old.name IS NOT new.name OR old.email IS NOT new.email
+      OR old.created_at IS NOT new.created_at BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('users', new.id, 'U');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS users_changelog_delete AFTER DELETE ON users BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('users', old.id, 'D');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_changelog_insert AFTER INSERT ON posts BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('posts', new.id, 'I');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_changelog_update
+    AFTER UPDATE OF id, title, user_id, created_at ON posts
+    WHEN old.id IS NOT new.id OR old.title IS NOT new.title
+      OR old.user_id IS NOT new.user_id OR old.created_at IS NOT new.created_at BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('posts', new.id, 'U');
+    END
+    ''',
+    # Текст поста меняется в post_bodies (posts.content только промежуточный)
+    '''
+    CREATE TRIGGER IF NOT EXISTS post_bodies_changelog_update
+    AFTER UPDATE OF body ON post_bodies WHEN old.body IS NOT new.body BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('posts', new.post_id, 'U');
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS posts_changelog_delete AFTER DELETE ON posts BEGIN
+        INSERT INTO changelog (table_name, row_id, op) VALUES ('posts', old.id, 'D');
+    END
+    ''',
+)
+
+def migrate_changelog(connection):
+    """Журнал изменений users и posts для инкрементального экспорта"""
+    # AUTOINCREMENT: номера не переиспользуются и после сжатия журнала
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS changelog (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D'))
+        )
+    ''')
+    # Последний выгруженный номер каждого получателя изменений
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS changelog_cursors (
+            consumer TEXT PRIMARY KEY,
+            seq INTEGER NOT NULL,
+            updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    # История сжатия: изменения до seq включительно удалены
+    connection.execute('''
+        CREATE TABLE IF NOT EXISTS changelog_compactions (
+            seq INTEGER PRIMARY KEY,
+            deleted INTEGER NOT NULL,
+            compacted_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    for trigger in CHANGELOG_TRIGGERS:
+        connection.execute(trigger)
+    # Существующие строки попадают в журнал как вставки: выгрузка с начала
+    # журнала равна полному экспорту
+    connection.execute(
+        "INSERT INTO changelog (table_name, row_id, op) SELECT 'users', id, 'I' FROM users "
+        "ORDER BY id"
+    )
+    connection.execute(
+        "INSERT INTO changelog (table_name, row_id, op) SELECT 'posts', id, 'I' FROM posts "
+        "ORDER BY id"
+    )
+
+# Длина текста поста в символах: отчеты по длине не распаковывают тела.
+# Триггеры срабатывают после posts_body_insert и posts_body_update
+BODY_LENGTH_TRIGGERS = (
+    '''
+    CREATE TRIGGER IF NOT EXISTS post_bodies_length_insert AFTER INSERT ON post_bodies BEGIN
+        UPDATE post_bodies SET content_length = length(unpack_body(new.body))
+        WHERE post_id = new.post_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS post_bodies_length_update
+    AFTER UPDATE OF body ON post_bodies WHEN old.body IS NOT new.body BEGIN
+        UPDATE post_bodies SET content_length = length(unpack_body(new.body))
+        WHERE post_id = new.post_id;
+    END
+    ''',
+)
+
+def migrate_body_lengths(connection):
+    """Столбец post_bodies.content_length с длиной текста поста"""
+    connection.execute("ALTER TABLE post_bodies ADD COLUMN content_length INTEGER")
+    connection.execute("UPDATE post_bodies SET content_length = length(unpack_body(body))")
+    for trigger in BODY_LENGTH_TRIGGERS:
+        connection.execute(trigger)
+
+def migrate_changelog_archive(connection):
+    """Операция A в журнале изменений: пост перенесен в архивную базу"""
+    # Ограничение CHECK меняется только пересозданием таблицы; триггеры журнала
+    # пересоздаются, номера изменений и счетчик AUTOINCREMENT сохраняются
+    sequence = connection.execute(
+        "SELECT seq FROM sqlite_sequence WHERE name = 'changelog'"
+    ).fetchone()
+    connection.execute('''
+        CREATE TABLE changelog_new (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            table_name TEXT NOT NULL,
+            row_id INTEGER NOT NULL,
+            op TEXT NOT NULL CHECK (op IN ('I', 'U', 'D', 'A'))
+        )
+    ''')
+    connection.execute(
+        "INSERT INTO changelog_new SELECT seq, table_name, row_id, op FROM changelog"
+    )
+    # Триггеры, пишущие в журнал
+    triggers = [row[0] for row in connection.execute(
+        "SELECT name FROM sqlite_master WHERE type = 'trigger' "
+        "AND sql LIKE '%INSERT INTO changelog %'"
+    )]
+    for trigger in triggers:
+        connection.execute(f"DROP TRIGGER {trigger}")
+    connection.execute("DROP TABLE changelog")
+    connection.execute("ALTER TABLE changelog_new RENAME TO changelog")
+    # Журнал мог быть сжат целиком: счетчик не должен начаться заново
+    if sequence and not connection.execute(
+        "UPDATE sqlite_sequence SET seq = ? WHERE name = 'changelog'", sequence
+    ).rowcount:
+        connection.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('changelog', ?)",
+                           sequence)
+    for trigger in CHANGELOG_TRIGGERS:
+        connection.execute(trigger)
+
+def enable_fulltext_search(connection):
+    """Полнотекстовые индексы для базы последней версии, созданной без FTS5"""
+    # migrate_fulltext_search без FTS5 ничего не создает, но версия схемы
+    # увеличивается; индексы создаются, когда SQLite начинает поддерживать FTS5
+    try:
+        connection.execute(POST_TEXTS_FTS)
+    except sqlite3.OperationalError:
+        return False
+    for statement in USERS_FTS_SCHEMA:
+        connection.execute(statement)
+    connection.execute(POSTS_FTS_INSERT)
+    # Триггер изменения поста пересоздается вместе с обновлением индекса
+    connection.execute("DROP TRIGGER IF EXISTS posts_body_update")
+    for trigger in post_body_triggers(fulltext=True):
+        connection.execute(trigger)
+    connection.execute("INSERT INTO users_fts (users_fts) VALUES ('rebuild')")
+    connection.execute("INSERT INTO posts_fts (posts_fts) VALUES ('rebuild')")
+    return True
+
+MIGRATIONS = [
+    migrate_initial_schema,
+    migrate_post_indexes,
+    migrate_orphan_posts,
+    migrate_fulltext_search,
+    migrate_post_counts,
+    migrate_post_bodies,
+    migrate_changelog,
+    migrate_body_lengths,
+    migrate_changelog_archive,
+]
+
+def apply_migrations(connection):
+    """Обновление схемы базы до последней версии; возвращает число миграций"""
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+    if version > len(MIGRATIONS):
+        raise sqlite3.DatabaseError(
+            f"Версия схемы {version} новее, чем поддерживает приложение ({len(MIGRATIONS)})"
+        )
+    
+    connection.commit()
+    for number, migration in enumerate(MIGRATIONS[version:], version + 1):
+        # Каждая миграция и новая версия схемы фиксируются одной транзакцией
+        connection.execute("BEGIN")
+        try:
+            migration(connection)
+            connection.execute(f"PRAGMA user_version = {number}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    
+    if not has_table(connection, 'posts_fts'):
+        connection.execute("BEGIN")
+        try:
+            enable_fulltext_search(connection)
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+    return len(MIGRATIONS) - version
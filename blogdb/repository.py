@@ -0,0 +1,271 @@
+import re
+
+from .bodies import BODY_CHUNK_SIZE, iter_body
+from .db import has_table
+from .files import TABLE_COLUMNS
+from .migrations import rebuild_post_counts
+
+# Максимальное количество результатов полнотекстового поиска
+SEARCH_LIMIT = 100
+# Количество пользователей в рейтинге статистики
+STATS_LIMIT = 100
+# Количество постов в списке последних
+RECENT_LIMIT = 10
+# Больше id в массовой операции передается через временную таблицу, а не IN (?, ...)
+BULK_IN_LIMIT = 500
+
+def build_fts_query(keyword):
+    """Запрос FTS5 из пользовательского ввода: все слова, поиск по префиксу"""
+    words = re.findall(r'\w+', keyword)
+    return ' '.join(f'"{word}"*' for word in words)
+
+def id_condition(connection, column, ids):
+    """Условие column IN (...) и его параметры для массовой операции над ids"""
+    if len(ids) <= BULK_IN_LIMIT:
+        return f"{column} IN ({', '.join('?' * len(ids))})", list(ids)
+    # Временная таблица заполняется в той же транзакции, что и основной запрос
+    connection.execute("CREATE TEMP TABLE IF NOT EXISTS bulk_ids (id INTEGER PRIMARY KEY)")
+    connection.execute("DELETE FROM temp.bulk_ids")
+    connection.executemany("INSERT OR IGNORE INTO temp.bulk_ids (id) VALUES (?)",
+                           ((row_id,) for row_id in ids))
+    return f"{column} IN (SELECT id FROM temp.bulk_ids)", []
+
+class UserRepository:
+    """Операции с таблицей пользователей"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.fts_enabled = has_table(connection, 'users_fts')
+    
+    def page(self, after_id, limit):
+        """Страница пользователей с id больше after_id (keyset-пагинация)"""
+        return self.connection.execute(
+            "SELECT id, name, email, created_at FROM users WHERE id > ? ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+    
+    def get(self, user_id):
+        """Пользователь по id или None"""
+        return self.connection.execute(
+            "SELECT id, name, email, created_at FROM users WHERE id = ?", (user_id,)
+        ).fetchone()
+    
+    def exists(self, user_id):
+        """Существует ли пользователь с таким id"""
+        return self.connection.execute(
+            "SELECT 1 FROM users WHERE id = ?", (user_id,)
+        ).fetchone() is not None
+    
+    def add(self, name, email):
+        """Добавление пользователя; возвращает его id"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO users (name, email) VALUES (?, ?)", (name, email)
+            )
+        return cursor.lastrowid
+    
+    def add_many(self, users):
+        """Добавление пар (name, email) одной транзакцией; дубликаты пропускаются"""
+        with self.connection:
+            return self.connection.executemany(
+                "INSERT OR IGNORE INTO users (name, email) VALUES (?, ?)", users
+            ).rowcount
+    
+    def update(self, user_id, name, email):
+        """Изменение имени и email; возвращает 0, если пользователя нет"""
+        with self.connection:
+            return self.connection.execute(
+                "UPDATE users SET name = ?, email = ? WHERE id = ?", (name, email, user_id)
+            ).rowcount
+    
+    def delete(self, user_id):
+        """Удаление пользователя вместе с его постами"""
+        with self.connection:
+            self.connection.execute("DELETE FROM users WHERE id = ?", (user_id,))
+    
+    def delete_many(self, user_ids):
+        """Удаление пользователей с их постами одним запросом; возвращает число удаленных"""
+        if not user_ids:
+            return 0
+        with self.connection:
+            condition, params = id_condition(self.connection, 'id', user_ids)
+            return self.connection.execute(
+                f"DELETE FROM users WHERE {condition}", params
+            ).rowcount
+    
+    def iter_all(self):
+        """Курсор по всем пользователям в порядке id"""
+        return self.connection.execute(
+            f"SELECT {', '.join(TABLE_COLUMNS['users'])} FROM users ORDER BY id"
+        )
+    
+    def search(self, keyword, limit=SEARCH_LIMIT):
+        """Курсор по найденным пользователям, лучшие совпадения первыми"""
+        # Ввод без слов (например, только знаки препинания) FTS5 не разбирает
+        query = build_fts_query(keyword) if self.fts_enabled else ''
+        if not query:
+            return self.connection.execute('''
+                SELECT id, name, email, created_at FROM users
+                WHERE name LIKE ? OR email LIKE ?
+                LIMIT ?
+            ''', (f'%{keyword}%', f'%{keyword}%', limit))
+        
+        # Ранжированный поиск по индексу с подсветкой совпадений
+        return self.connection.execute('''
+            SELECT u.id, highlight(users_fts, 0, '[', ']'),
+                   highlight(users_fts, 1, '[', ']'), u.created_at
+            FROM users_fts
+            JOIN users u ON u.id = users_fts.rowid
+            WHERE users_fts MATCH ?
+            ORDER BY users_fts.rank
+            LIMIT ?
+        ''', (query, limit))
+    
+    def top_posters(self, limit=STATS_LIMIT):
+        """Курсор по пользователям с наибольшим числом постов"""
+        return self.connection.execute('''
+            SELECT name, post_count
+            FROM users
+            ORDER BY post_count DESC, id
+            LIMIT ?
+        ''', (limit,))
+    
+    def rebuild_post_counts(self):
+        """Пересчет счетчиков постов; возвращает число исправленных пользователей"""
+        with self.connection:
+            return rebuild_post_counts(self.connection)
+
+class PostRepository:
+    """Операции с таблицей постов"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.fts_enabled = has_table(connection, 'posts_fts')
+    
+    def page(self, after_id, limit):
+        """Страница постов с автором: id, title, author, created_at, user_id"""
+        return self.connection.execute('''
+            SELECT p.id, p.title, u.name, p.created_at, p.user_id
+            FROM posts p
+            JOIN users u ON p.user_id = u.id
+            WHERE p.id > ?
+            ORDER BY p.id
+            LIMIT ?
+        ''', (after_id, limit)).fetchall()
+    
+    def get(self, post_id):
+        """Пост с автором в формате page() или None"""
+        return self.connection.execute('''
+            SELECT p.id, p.title, u.name, p.created_at, p.user_id
+            FROM posts p
+            JOIN users u ON p.user_id = u.id
+            WHERE p.id = ?
+        ''', (post_id,)).fetchone()
+    
+    def content(self, post_id):
+        """Текст поста или None"""
+        row = self.connection.execute(
+            "SELECT unpack_body(body) FROM post_bodies WHERE post_id = ?", (post_id,)
+        ).fetchone()
+        return row[0] if row else None
+    
+    def iter_content(self, post_id, chunk_size=BODY_CHUNK_SIZE):
+        """Текст поста частями через sqlite3.Blob, без загрузки тела целиком"""
+        exists = self.connection.execute(
+            "SELECT 1 FROM post_bodies WHERE post_id = ?", (post_id,)
+        ).fetchone()
+        if not exists:
+            return
+        with self.connection.blobopen('post_bodies', 'body', post_id, readonly=True) as blob:
+            yield from iter_body(blob, chunk_size)
+    
+    def add(self, title, content, user_id):
+        """Добавление поста; возвращает его id"""
+        with self.connection:
+            cursor = self.connection.execute(
+                "INSERT INTO posts (title, content, user_id) VALUES (?, ?, ?)",
+                (title, content, user_id)
+            )
+        return cursor.lastrowid
+    
+    def add_many(self, posts):
+        """Добавление троек (title, content, user_id) одной транзакцией"""
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO posts (title, content, user_id) VALUES (?, ?, ?)", posts
+            )
+    
+    def update(self, post_id, title, content, user_id):
+        """Изменение поста; возвращает 0, если поста нет"""
+        # Новый текст переносится в post_bodies триггером posts_body_update
+        with self.connection:
+            return self.connection.execute(
+                "UPDATE posts SET title = ?, content = ?, user_id = ? WHERE id = ?",
+                (title, content, user_id, post_id)
+            ).rowcount
+    
+    def delete(self, post_id):
+        """Удаление поста"""
+        with self.connection:
+            self.connection.execute("DELETE FROM posts WHERE id = ?", (post_id,))
+    
+    def delete_many(self, post_ids):
+        """Удаление постов одним запросом; возвращает число удаленных"""
+        if not post_ids:
+            return 0
+        with self.connection:
+            condition, params = id_condition(self.connection, 'id', post_ids)
+            return self.connection.execute(
+                f"DELETE FROM posts WHERE {condition}", params
+            ).rowcount
+    
+    def set_author(self, post_ids, user_id):
+        """Смена автора постов одним запросом; возвращает число измененных"""
+        if not post_ids:
+            return 0
+        with self.connection:
+            condition, params = id_condition(self.connection, 'id', post_ids)
+            return self.connection.execute(
+                f"UPDATE posts SET user_id = ? WHERE {condition} AND user_id != ?",
+                [user_id, *params, user_id]
+            ).rowcount
+    
+    def iter_all(self):
+        """Курсор по всем постам в порядке id"""
+        return self.connection.execute(
+            f"SELECT {', '.join(TABLE_COLUMNS['posts'])} FROM posts ORDER BY id"
+        )
+    
+    def recent(self, limit=RECENT_LIMIT):
+        """Курсор по последним постам: title, author, created_at"""
+        return self.connection.execute('''
+            SELECT p.title, u.name, p.created_at
+            FROM posts p
+            JOIN users u ON p.user_id = u.id
+            ORDER BY p.created_at DESC
+            LIMIT ?
+        ''', (limit,))
+    
+    def search(self, keyword, limit=SEARCH_LIMIT):
+        """Курсор по найденным постам: id, title, author, created_at, фрагмент"""
+        query = build_fts_query(keyword) if self.fts_enabled else ''
+        if not query:
+            return self.connection.execute('''
+                SELECT p.id, p.title, u.name, p.created_at, substr(t.content, 1, 80)
+                FROM post_texts t
+                JOIN posts p ON p.id = t.id
+                JOIN users u ON u.id = p.user_id
+                WHERE t.title LIKE ? OR t.content LIKE ?
+                LIMIT ?
+            ''', (f'%{keyword}%', f'%{keyword}%', limit))
+        
+        return self.connection.execute('''
+            SELECT p.id, highlight(posts_fts, 0, '[', ']'), u.name, p.created_at,
+                   snippet(posts_fts, 1, '[', ']', '…', 12)
+            FROM posts_fts
+            JOIN posts p ON p.id = posts_fts.rowid
+            JOIN users u ON u.id = p.user_id
+            WHERE posts_fts MATCH ?
+            ORDER BY posts_fts.rank
+            LIMIT ?
+        ''', (query, limit))
@@ -0,0 +1,482 @@
+import argparse
+import asyncio
+import json
+import logging
+import re
+import sqlite3
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+from . import (
+    CONFIG_FILE, RECENT_LIMIT, SEARCH_LIMIT, STATS_LIMIT, PostRepository, ReadPool,
+    ResultCache, UserRepository, load_config, open_database,
+)
+
+# Адрес по умолчанию: сервис доступен только с этой машины
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8080
+# Строк на странице списка по умолчанию и наибольшее
+API_PAGE_SIZE = 100
+API_MAX_PAGE_SIZE = 1000
+# Строк JSON Lines, после которых ответ отправляется клиенту (drain)
+STREAM_LINES = 200
+# Наибольший размер тела запроса, байт
+MAX_BODY_SIZE = 1024 * 1024
+# Ожидание следующего запроса в открытом соединении, секунды
+KEEP_ALIVE_TIMEOUT = 15
+
+# Поля строк, которые возвращают репозитории
+USER_FIELDS = ('id', 'name', 'email', 'created_at')
+POST_FIELDS = ('id', 'title', 'author', 'created_at', 'user_id')
+FOUND_POST_FIELDS = ('id', 'title', 'author', 'created_at', 'snippet')
+RECENT_FIELDS = ('title', 'author', 'created_at')
+STATS_FIELDS = ('name', 'post_count')
+
+logger = logging.getLogger('blogdb.server')
+
+class HttpError(Exception):
+    """Ошибка запроса с кодом ответа HTTP"""
+    
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class Request:
+    """Разобранный HTTP-запрос"""
+    
+    def __init__(self, method, target, version, headers, body=b''):
+        self.method = method
+        url = urlsplit(target)
+        self.path = url.path.rstrip('/') or '/'
+        self.query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        self.headers = headers
+        self.body = body
+        connection = headers.get('connection', '').lower()
+        # HTTP/1.1 держит соединение открытым, если клиент не попросил закрыть
+        if version == 'HTTP/1.1':
+            self.keep_alive = connection != 'close'
+        else:
+            self.keep_alive = connection == 'keep-alive'
+    
+    def int_param(self, name, default, maximum=None):
+        """Целый параметр строки запроса в пределах [0, maximum]"""
+        value = self.query.get(name)
+        if value is None:
+            return default
+        try:
+            value = int(value)
+        except ValueError:
+            raise HttpError(400, f"{name} должен быть числом")
+        if value < 0:
+            raise HttpError(400, f"{name} не может быть отрицательным")
+        return min(value, maximum) if maximum is not None else value
+    
+    def text_param(self, name):
+        """Обязательный текстовый параметр строки запроса"""
+        value = self.query.get(name, '').strip()
+        if not value:
+            raise HttpError(400, f"не задан параметр {name}")
+        return value
+    
+    def json(self, *fields):
+        """Тело запроса JSON с обязательными полями; возвращает их значения"""
+        try:
+            data = json.loads(self.body or b'null')
+        except ValueError:
+            raise HttpError(400, "тело запроса должно быть JSON-объектом")
+        if not isinstance(data, dict):
+            raise HttpError(400, "тело запроса должно быть JSON-объектом")
+        # Строка из одних пробелов - тоже незаданное поле, как в форме и при импорте
+        values = [data.get(field) for field in fields]
+        values = [value.strip() if isinstance(value, str) else value for value in values]
+        missing = [field for field, value in zip(fields, values) if value in (None, '')]
+        if missing:
+            raise HttpError(400, f"не заданы поля: {', '.join(missing)}")
+        return values
+
+class Response:
+    """Ответ: JSON-объект или строки JSON Lines"""
+    
+    def __init__(self, status=200, data=None, fields=None, rows=None, headers=None):
+        self.status = status
+        self.data = data
+        # Строки (rows) выводятся по одной в JSON Lines с именами полей fields
+        self.fields = fields
+        self.rows = rows
+        self.headers = headers or {}
+
+def page_response(fields, rows, limit):
+    """Страница строк; X-Next-After - id последней строки, если есть следующая"""
+    headers = {}
+    if rows and len(rows) == limit:
+        headers['X-Next-After'] = str(rows[-1][0])
+    return Response(fields=fields, rows=rows, headers=headers)
+
+def as_int(value, name):
+    """Число из поля JSON"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise HttpError(400, f"{name} должен быть числом")
+
+class BlogServer:
+    """HTTP API базы блога: чтение через пул соединений, запись одним соединением"""
+    
+    def __init__(self, db_name, profile=None, readers=None):
+        self.db_name = db_name
+        self.profile = profile
+        if readers is None:
+            readers = profile.readers if profile else 2
+        readers = max(1, readers)
+        self.pool = ReadPool(db_name, readers, profile=profile)
+        self.read_executor = ThreadPoolExecutor(readers, thread_name_prefix='blogdb-read')
+        # Изменения выполняются по очереди в одном потоке со своим соединением
+        self.write_executor = ThreadPoolExecutor(1, thread_name_prefix='blogdb-write',
+                                                 initializer=self.open_writer)
+        self.writer = None
+        # Отчеты (рейтинг, последние посты, поиск) до изменения данных
+        self.report_cache = ResultCache()
+        self.server = None
+        
+        self.routes = [
+            ('GET', r'/users', self.list_users),
+            ('POST', r'/users', self.add_user),
+            ('GET', r'/users/(\d+)', self.get_user),
+            ('PUT', r'/users/(\d+)', self.update_user),
+            ('DELETE', r'/users/(\d+)', self.delete_user),
+            ('GET', r'/posts', self.list_posts),
+            ('POST', r'/posts', self.add_post),
+            ('GET', r'/posts/recent', self.recent_posts),
+            ('GET', r'/posts/(\d+)', self.get_post),
+            ('PUT', r'/posts/(\d+)', self.update_post),
+            ('DELETE', r'/posts/(\d+)', self.delete_post),
+            ('GET', r'/search/users', self.search_users),
+            ('GET', r'/search/posts', self.search_posts),
+            ('GET', r'/stats/top-posters', self.top_posters),
+        ]
+        self.routes = [(method, re.compile(pattern + '$'), handler)
+                       for method, pattern, handler in self.routes]
+    
+    def open_writer(self):
+        """Пишущее соединение потока записи; схема обновляется до последней версии"""
+        self.writer = open_database(self.db_name, profile=self.profile)
+    
+    async def read(self, operation, *args):
+        """operation(connection, *args) в потоке чтения с соединением из пула"""
+        def job():
+            with self.pool.acquire() as connection:
+                return operation(connection, *args)
+        return await asyncio.get_running_loop().run_in_executor(self.read_executor, job)
+    
+    async def write(self, operation, *args, tables=()):
+        """operation(connection, *args) в потоке записи; отчеты по tables устаревают"""
+        def job():
+            try:
+                return operation(self.writer, *args)
+            finally:
+                # Отчет, прочитанный во время изменения, не должен попасть в кэш
+                self.report_cache.invalidate(*tables)
+        return await asyncio.get_running_loop().run_in_executor(self.write_executor, job)
+    
+    async def report(self, key, tables, query):
+        """Строки отчета query(connection) из кэша или из базы"""
+        def job(connection):
+            rows, stamp = self.report_cache.lookup(connection, key, tables)
+            if rows is None:
+                rows = query(connection).fetchall()
+                self.report_cache.store(key, stamp, rows)
+            return rows
+        return await self.read(job)
+    
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Открытие базы и запуск приема соединений"""
+        # Пишущее соединение открывается первым: оно применяет миграции
+        await self.write(lambda connection: None)
+        self.server = await asyncio.start_server(self.handle_connection, host, port)
+        return self.server
+    
+    def close(self):
+        """Остановка потоков и закрытие соединений"""
+        if self.server:
+            self.server.close()
+        self.read_executor.shutdown()
+        if self.writer is not None:
+            self.write_executor.submit(self.writer.close).result()
+        self.write_executor.shutdown()
+        self.pool.close()
+    
+    async def handle_connection(self, reader, writer):
+        """Обработка запросов одного соединения (keep-alive)"""
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(self.read_request(reader),
+                                                     KEEP_ALIVE_TIMEOUT)
+                except HttpError as e:
+                    # Запрос прочитан не полностью, соединение дальше не используется
+                    await self.send(writer, Response(e.status, {'error': str(e)}), False)
+                    break
+                if request is None:
+                    break
+                await self.send(writer, await self.dispatch(request), request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+    
+    async def read_request(self, reader):
+        """Чтение запроса; None, если клиент закрыл соединение"""
+        line = await reader.readline()
+        if not line.strip():
+            return None
+        try:
+            method, target, version = line.decode('latin-1').split()
+        except ValueError:
+            raise HttpError(400, "неверная строка запроса")
+        
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        
+        try:
+            length = int(headers.get('content-length', 0))
+        except ValueError:
+            raise HttpError(400, "неверный Content-Length")
+        if length > MAX_BODY_SIZE:
+            raise HttpError(413, f"тело запроса больше {MAX_BODY_SIZE} байт")
+        body = await reader.readexactly(length) if length else b''
+        return Request(method.upper(), target, version, headers, body)
+    
+    async def dispatch(self, request):
+        """Вызов обработчика по методу и пути запроса"""
+        allowed = False
+        for method, pattern, handler in self.routes:
+            match = pattern.match(request.path)
+            if not match:
+                continue
+            allowed = True
+            if method != request.method:
+                continue
+            try:
+                return await handler(request, *match.groups())
+            except HttpError as e:
+                return Response(e.status, {'error': str(e)})
+            except sqlite3.IntegrityError as e:
+                return Response(409, {'error': str(e)})
+            except Exception:
+                logger.exception("Ошибка обработки %s %s", request.method, request.path)
+                return Response(500, {'error': "внутренняя ошибка сервера"})
+        if allowed:
+            return Response(405, {'error': f"метод {request.method} не поддерживается"})
+        return Response(404, {'error': f"нет ресурса {request.path}"})
+    
+    async def send(self, writer, response, keep_alive):
+        """Отправка ответа; строки JSON Lines передаются частями (chunked)"""
+        status = HTTPStatus(response.status)
+        headers = dict(response.headers)
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        if response.rows is not None:
+            headers['Content-Type'] = 'application/x-ndjson; charset=utf-8'
+            headers['Transfer-Encoding'] = 'chunked'
+            body = None
+        elif response.data is not None:
+            body = json.dumps(response.data, ensure_ascii=False).encode('utf-8')
+            headers['Content-Type'] = 'application/json; charset=utf-8'
+            headers['Content-Length'] = str(len(body))
+        else:
+            body = b''
+            headers['Content-Length'] = '0'
+        
+        head = f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+        head += ''.join(f"{name}: {value}\r\n" for name, value in headers.items())
+        writer.write((head + '\r\n').encode('latin-1'))
+        if body is not None:
+            writer.write(body)
+            await writer.drain()
+            return
+        
+        rows, fields = response.rows, response.fields
+        for start in range(0, len(rows), STREAM_LINES):
+            chunk = ''.join(json.dumps(dict(zip(fields, row)), ensure_ascii=False) + '\n'
+                            for row in rows[start:start + STREAM_LINES]).encode('utf-8')
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk))
+            await writer.drain()
+        writer.write(b'0\r\n\r\n')
+        await writer.drain()
+    
+    async def list_users(self, request):
+        """GET /users?after=&limit= - страница пользователей"""
+        after = request.int_param('after', 0)
+        limit = request.int_param('limit', API_PAGE_SIZE, API_MAX_PAGE_SIZE)
+        rows = await self.read(lambda connection: UserRepository(connection).page(after, limit))
+        return page_response(USER_FIELDS, rows, limit)
+    
+    async def get_user(self, request, user_id):
+        """GET /users/{id}"""
+        row = await self.read(lambda connection: UserRepository(connection).get(int(user_id)))
+        if row is None:
+            raise HttpError(404, f"пользователь {user_id} не найден")
+        return Response(data=dict(zip(USER_FIELDS, row)))
+    
+    async def add_user(self, request):
+        """POST /users {name, email}"""
+        name, email = (str(value).strip() for value in request.json('name', 'email'))
+        user_id = await self.write(lambda connection: UserRepository(connection).add(name, email),
+                                   tables=('users',))
+        return Response(201, {'id': user_id}, headers={'Location': f"/users/{user_id}"})
+    
+    async def update_user(self, request, user_id):
+        """PUT /users/{id} {name, email}"""
+        name, email = (str(value).strip() for value in request.json('name', 'email'))
+        updated = await self.write(
+            lambda connection: UserRepository(connection).update(int(user_id), name, email),
+            tables=('users',)
+        )
+        if not updated:
+            raise HttpError(404, f"пользователь {user_id} не найден")
+        return Response(204)
+    
+    async def delete_user(self, request, user_id):
+        """DELETE /users/{id} - пользователь вместе с его постами"""
+        deleted = await self.write(
+            lambda connection: UserRepository(connection).delete_many([int(user_id)]),
+            tables=('users', 'posts')
+        )
+        if not deleted:
+            raise HttpError(404, f"пользователь {user_id} не найден")
+        return Response(204)
+    
+    async def list_posts(self, request):
+        """GET /posts?after=&limit= - страница постов с авторами"""
+        after = request.int_param('after', 0)
+        limit = request.int_param('limit', API_PAGE_SIZE, API_MAX_PAGE_SIZE)
+        rows = await self.read(lambda connection: PostRepository(connection).page(after, limit))
+        return page_response(POST_FIELDS, rows, limit)
+    
+    async def get_post(self, request, post_id):
+        """GET /posts/{id} - пост с текстом"""
+        def job(connection):
+            posts = PostRepository(connection)
+            row = posts.get(int(post_id))
+            return row, posts.content(int(post_id)) if row else None
+        row, content = await self.read(job)
+        if row is None:
+            raise HttpError(404, f"пост {post_id} не найден")
+        post = dict(zip(POST_FIELDS, row))
+        post['content'] = content
+        return Response(data=post)
+    
+    async def add_post(self, request):
+        """POST /posts {title, content, user_id}"""
+        title, content, user_id = request.json('title', 'content', 'user_id')
+        title, content = str(title).strip(), str(content).strip()
+        user_id = as_int(user_id, 'user_id')
+        post_id = await self.write(
+            lambda connection: PostRepository(connection).add(title, content, user_id),
+            tables=('users', 'posts')
+        )
+        return Response(201, {'id': post_id}, headers={'Location': f"/posts/{post_id}"})
+    
+    async def update_post(self, request, post_id):
+        """PUT /posts/{id} {title, content, user_id}"""
+        title, content, user_id = request.json('title', 'content', 'user_id')
+        title, content = str(title).strip(), str(content).strip()
+        user_id = as_int(user_id, 'user_id')
+        updated = await self.write(
+            lambda connection: PostRepository(connection).update(int(post_id), title,
+                                                                 content, user_id),
+            tables=('users', 'posts')
+        )
+        if not updated:
+            raise HttpError(404, f"пост {post_id} не найден")
+        return Response(204)
+    
+    async def delete_post(self, request, post_id):
+        """DELETE /posts/{id}"""
+        deleted = await self.write(
+            lambda connection: PostRepository(connection).delete_many([int(post_id)]),
+            tables=('users', 'posts')
+        )
+        if not deleted:
+            raise HttpError(404, f"пост {post_id} не найден")
+        return Response(204)
+    
+    async def recent_posts(self, request):
+        """GET /posts/recent?limit= - последние посты"""
+        limit = request.int_param('limit', RECENT_LIMIT, API_MAX_PAGE_SIZE)
+        rows = await self.report(('recent', limit), ('users', 'posts'),
+                                 lambda connection: PostRepository(connection).recent(limit))
+        return Response(fields=RECENT_FIELDS, rows=rows)
+    
+    async def search_users(self, request):
+        """GET /search/users?q=&limit= - поиск пользователей"""
+        keyword = request.text_param('q')
+        limit = request.int_param('limit', SEARCH_LIMIT, API_MAX_PAGE_SIZE)
+        rows = await self.report(
+            ('search_users', keyword, limit), ('users',),
+            lambda connection: UserRepository(connection).search(keyword, limit)
+        )
+        return Response(fields=USER_FIELDS, rows=rows)
+    
+    async def search_posts(self, request):
+        """GET /search/posts?q=&limit= - полнотекстовый поиск постов"""
+        keyword = request.text_param('q')
+        limit = request.int_param('limit', SEARCH_LIMIT, API_MAX_PAGE_SIZE)
+        rows = await self.report(
+            ('search_posts', keyword, limit), ('users', 'posts'),
+            lambda connection: PostRepository(connection).search(keyword, limit)
+        )
+        return Response(fields=FOUND_POST_FIELDS, rows=rows)
+    
+    async def top_posters(self, request):
+        """GET /stats/top-posters?limit= - пользователи с наибольшим числом постов"""
+        limit = request.int_param('limit', STATS_LIMIT, API_MAX_PAGE_SIZE)
+        rows = await self.report(('top_posters', limit), ('users', 'posts'),
+                                 lambda connection: UserRepository(connection).top_posters(limit))
+        return Response(fields=STATS_FIELDS, rows=rows)
+
+async def serve(server, host, port):
+    """Работа сервера до прерывания"""
+    listener = await server.start(host, port)
+    print(f"Сервер запущен: http://{host}:{port}", file=sys.stderr)
+    async with listener:
+        await listener.serve_forever()
+
+def main(argv=None):
+    """Запуск HTTP API из командной строки"""
+    parser = argparse.ArgumentParser(
+        prog='python -m blogdb.server',
+        description="HTTP API базы блога (JSON и JSON Lines)"
+    )
+    parser.add_argument('--config', default=CONFIG_FILE,
+                        help=f"файл настроек (по умолчанию {CONFIG_FILE})")
+    parser.add_argument('--db', help="файл базы данных (по умолчанию из файла настроек)")
+    parser.add_argument('--host', default=DEFAULT_HOST)
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--readers', type=int,
+                        help="соединений для чтения (по умолчанию - readers из настроек)")
+    args = parser.parse_args(argv)
+    
+    try:
+        config = load_config(args.config, args.db)
+    except ValueError as e:
+        sys.exit(f"Ошибка настроек: {e}")
+    logging.basicConfig(level=logging.INFO)
+    server = BlogServer(config.db_name, config.profile, args.readers)
+    try:
+        asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+if __name__ == '__main__':
+    main()
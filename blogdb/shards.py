@@ -0,0 +1,124 @@
+import csv
+import glob
+import os
+from collections import deque
+
+from .files import IMPORT_BATCH_SIZE, REJECT_SUFFIX, BulkImporter, CsvSource, JsonSource, is_csv
+from .sync import SyncImporter
+
+# Расширения файлов, которые импортируются из каталога
+SHARD_EXTENSIONS = ('.csv', '.json', '.jsonl', '.ndjson')
+# Разобранных файлов в очереди на каждый процесс (ограничивает память)
+SHARDS_PER_WORKER = 2
+
+def find_shards(path):
+    """Файлы для импорта: все подходящие файлы каталога или файлы по шаблону glob"""
+    if os.path.isdir(path):
+        filenames = [os.path.join(path, name) for name in os.listdir(path)
+                     if os.path.splitext(name)[1].lower() in SHARD_EXTENSIONS]
+    else:
+        filenames = glob.glob(path)
+    # Отчеты об отклоненных строках прошлых импортов - не данные
+    return sorted(filename for filename in filenames
+                  if os.path.isfile(filename) and not filename.lower().endswith(REJECT_SUFFIX))
+
+def parse_shard(table, filename, sync=False):
+    """Разбор и проверка одного файла (выполняется в дочернем процессе)"""
+    source = CsvSource(filename) if is_csv(filename) else JsonSource(filename, table)
+    rows = []
+    for line_no, row, params in (SyncImporter if sync else BulkImporter)(table).parsed(source):
+        # Для правильных строк вместо исходных данных передаются параметры:
+        # они нужны только для отчета об ошибках вставки
+        rows.append((line_no, params, params) if not isinstance(params, ValueError)
+                    else (line_no, row, params))
+    return rows
+
+class ShardImporter:
+    """Импорт набора файлов: разбор в пуле процессов, запись одним соединением"""
+    
+    def __init__(self, table, workers=None, batch_size=IMPORT_BATCH_SIZE, fast=False,
+                 reject_path=None, sync=False, delete_missing=False):
+        self.table = table
+        self.filenames = []
+        self.workers = workers or os.cpu_count() or 1
+        # В режиме синхронизации все файлы сливаются с таблицей как один источник
+        self.sync = sync
+        self.delete_missing = sync and delete_missing
+        if sync:
+            self.importer = SyncImporter(table, batch_size=batch_size, fast=fast,
+                                         reject_path=reject_path,
+                                         delete_missing=delete_missing)
+        else:
+            self.importer = BulkImporter(table, batch_size=batch_size, fast=fast,
+                                         reject_path=reject_path)
+        self.done = 0
+        # Файлы, которые не удалось разобрать: (имя, ошибка)
+        self.failed = []
+    
+    @property
+    def reject_path(self):
+        """Файл отчета об отклоненных строках"""
+        return self.importer.reject_path
+    
+    @property
+    def rejected(self):
+        """Количество отклоненных строк"""
+        return self.importer.rejected
+    
+    def run(self, connection, filenames):
+        """Импорт файлов; генератор отдает число обработанных строк после каждого пакета"""
+        # multiprocessing нужен только пакетному импорту и долго импортируется
+        from concurrent.futures import ProcessPoolExecutor
+        
+        self.filenames = list(filenames)
+        pool = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            # SQLite допускает одного писателя: все строки вставляет это соединение
+            yield from self.importer.run_parsed(connection, self.rows(pool))
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
+    
+    def rows(self, pool):
+        """Разобранные строки файлов в порядке списка"""
+        files = iter(self.filenames)
+        pending = deque()
+        
+        def submit():
+            filename = next(files, None)
+            if filename is not None:
+                pending.append((filename, pool.submit(parse_shard, self.table, filename,
+                                                           self.sync)))
+        
+        for _ in range(self.workers * SHARDS_PER_WORKER):
+            submit()
+        
+        while pending:
+            filename, future = pending.popleft()
+            submit()
+            try:
+                rows = future.result()
+            except (OSError, ValueError, csv.Error) as e:
+                self.failed.append((filename, str(e)))
+                self.done += 1
+                continue
+            
+            name = os.path.basename(filename)
+            for line_no, row, params in rows:
+                yield f"{name}:{line_no}", row, params
+            self.done += 1
+        
+        # Строки неразобранного файла были бы удалены как отсутствующие в источнике
+        if self.delete_missing and self.failed:
+            raise ValueError(f"не удалось разобрать файлов: {len(self.failed)}, "
+                             "синхронизация с удалением отменена")
+    
+    def progress(self):
+        """Доля обработанных файлов от 0 до 1"""
+        return self.done / len(self.filenames) if self.filenames else 1.0
+    
+    def summary(self):
+        """Краткий итог импорта"""
+        summary = f"файлов {self.done} из {len(self.filenames)}, {self.importer.summary()}"
+        if self.failed:
+            summary += f", файлов с ошибками {len(self.failed)}"
+        return summary
@@ -0,0 +1,174 @@
+from .files import IMPORT_BATCH_SIZE, BulkImporter
+
+# Слияние промежуточной таблицы с основной: ключ, столбцы и запросы.
+# Повтор ключа в файле заменяет предыдущую строку (INSERT OR REPLACE)
+SYNC_TABLES = {
+    'users': {
+        'key': 'email',
+        'stage': '''
+            CREATE TEMP TABLE sync_users (
+                email TEXT PRIMARY KEY,
+                id INTEGER,
+                name TEXT NOT NULL
+            )
+        ''',
+        'insert': "INSERT OR REPLACE INTO temp.sync_users (id, name, email) VALUES (?, ?, ?)",
+        # Строки, которых нет в таблице
+        'new': '''
+            SELECT COUNT(*) FROM temp.sync_users s
+            WHERE NOT EXISTS (SELECT 1 FROM users u WHERE u.email = s.email)
+        ''',
+        # ID из файла сохраняется, если он не занят другим пользователем и не повторяется
+        # в файле; иначе ID назначается при вставке
+        'resolve': '''
+            UPDATE temp.sync_users SET id = NULL
+            WHERE id IS NOT NULL AND (
+                EXISTS (SELECT 1 FROM users u WHERE u.id = sync_users.id)
+                OR rowid != (SELECT MIN(t.rowid) FROM temp.sync_users t WHERE t.id = sync_users.id)
+            )
+        ''',
+        # Сначала строки со своими ID, затем остальные: назначенный ID
+        # не может совпасть с ID из файла, вставленным позже
+        'merge': tuple(f'''
+            INSERT INTO users (id, name, email)
+            SELECT s.id, s.name, s.email
+            FROM temp.sync_users s WHERE s.id IS {condition}
+            ON CONFLICT (email) DO UPDATE SET name = excluded.name
+            WHERE users.name IS NOT excluded.name
+        ''' for condition in ('NOT NULL', 'NULL')),
+        'delete': '''
+            DELETE FROM users
+            WHERE email NOT IN (SELECT email FROM temp.sync_users)
+        ''',
+    },
+    'posts': {
+        'key': 'id',
+        'stage': '''
+            CREATE TEMP TABLE sync_posts (
+                id INTEGER PRIMARY KEY,
+                title TEXT NOT NULL,
+                content TEXT NOT NULL,
+                user_id INTEGER NOT NULL
+            )
+        ''',
+        'insert': '''
+            INSERT OR REPLACE INTO temp.sync_posts (id, title, content, user_id)
+            VALUES (?, ?, ?, ?)
+        ''',
+        'new': '''
+            SELECT COUNT(*) FROM temp.sync_posts s
+            WHERE NOT EXISTS (SELECT 1 FROM posts p WHERE p.id = s.id)
+              AND EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+        ''',
+        # Посты без существующего автора пропускаются; изменение content
+        # переносится в post_bodies триггером posts_body_update; архивные базы не
+        # учитываются: архивный пост из файла снова добавляется в posts
+        'merge': ('''
+            INSERT INTO posts (id, title, content, user_id)
+            SELECT s.id, s.title, s.content, s.user_id
+            FROM temp.sync_posts s
+            WHERE EXISTS (SELECT 1 FROM users u WHERE u.id = s.user_id)
+            ON CONFLICT (id) DO UPDATE SET
+                title = excluded.title, content = excluded.content, user_id = excluded.user_id
+            WHERE posts.title IS NOT excluded.title
+               OR posts.user_id IS NOT excluded.user_id
+               OR (SELECT unpack_body(body) FROM post_bodies WHERE post_id = posts.id)
+                  IS NOT excluded.content
+        ''',),
+        'delete': '''
+            DELETE FROM posts
+            WHERE id NOT IN (SELECT id FROM temp.sync_posts)
+        ''',
+    },
+}
+
+class SyncImporter(BulkImporter):
+    """Синхронизация таблицы с файлом: загрузка во временную таблицу и одно слияние"""
+    
+    def __init__(self, table, batch_size=IMPORT_BATCH_SIZE, fast=False, reject_path=None,
+                 delete_missing=False):
+        super().__init__(table, batch_size=batch_size, fast=fast, reject_path=reject_path)
+        self.merge_sql = SYNC_TABLES[table]
+        self.sql = self.merge_sql['insert']
+        self.stage = f"temp.sync_{table}"
+        # Удалять строки, которых нет в файле
+        self.delete_missing = delete_missing
+        
+        self.staged = 0
+        self.updated = 0
+        self.unchanged = 0
+        self.deleted = 0
+    
+    @staticmethod
+    def row_id(value, required):
+        """ID из файла: число или None"""
+        if value in (None, ''):
+            if required:
+                raise ValueError("для синхронизации постов нужен ID")
+            return None
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            raise ValueError("ID должен быть числом")
+    
+    def parse(self, row):
+        """Проверка строки и преобразование в параметры промежуточной таблицы"""
+        params = super().parse(row)
+        if self.table == 'users':
+            return (self.row_id(row[0], False), *params)
+        title, content, user_id, _ = params
+        return (self.row_id(row[0], True), title, content, user_id)
+    
+    def run_parsed(self, connection, rows):
+        """Загрузка строк во временную таблицу, затем слияние одной транзакцией"""
+        connection.execute(f"DROP TABLE IF EXISTS {self.stage}")
+        connection.execute(self.merge_sql['stage'])
+        try:
+            yield from super().run_parsed(connection, rows)
+        finally:
+            if connection.in_transaction:
+                connection.rollback()
+            connection.execute(f"DROP TABLE IF EXISTS {self.stage}")
+    
+    def flush(self, batch):
+        """Пакет строк во временную таблицу (основные таблицы не меняются)"""
+        self.connection.executemany(self.sql, [params for _, _, params in batch])
+        self.staged += len(batch)
+    
+    def finish(self):
+        """Слияние после загрузки всех строк: fast действует и на запись в основную таблицу"""
+        self.merge()
+    
+    def merge(self):
+        """Слияние временной таблицы с основной и подсчет изменений"""
+        # Отклоненные строки были бы удалены как отсутствующие в источнике
+        if self.delete_missing and self.rejected:
+            raise ValueError(f"отклонено строк: {self.rejected}, "
+                             "синхронизация с удалением отменена")
+        connection = self.connection
+        with connection:
+            self.inserted = connection.execute(self.merge_sql['new']).fetchone()[0]
+            if 'resolve' in self.merge_sql:
+                connection.execute(self.merge_sql['resolve'])
+            # rowcount учитывает только вставленные и действительно измененные строки
+            changed = sum(connection.execute(sql).rowcount for sql in self.merge_sql['merge'])
+            self.updated = changed - self.inserted
+            if self.delete_missing:
+                self.deleted = connection.execute(self.merge_sql['delete']).rowcount
+            key = self.merge_sql['key']
+            applied = connection.execute(
+                f"SELECT COUNT(*) FROM {self.stage} s "
+                f"WHERE EXISTS (SELECT 1 FROM {self.table} t WHERE t.{key} = s.{key})"
+            ).fetchone()[0]
+        
+        self.unchanged = applied - self.inserted - self.updated
+        # Повторы ключа в файле и посты без автора
+        self.skipped = self.staged - applied
+    
+    def summary(self):
+        """Краткий итог синхронизации"""
+        summary = (f"добавлено {self.inserted}, обновлено {self.updated}, "
+                   f"без изменений {self.unchanged}")
+        if self.delete_missing:
+            summary += f", удалено {self.deleted}"
+        return summary + f", пропущено {self.skipped}, отклонено {self.rejected}"
@@ -0,0 +1,99 @@
+import os
+import tempfile
+import unittest
+
+from blogdb import PostRepository, UserRepository, open_database
+from blogdb.analytics import PostSnapshot, numpy
+
+# Те же отчеты запросами к базе
+TOP_AUTHORS_SQL = '''
+    SELECT u.name, COUNT(*), SUM(length(t.content))
+    FROM post_texts t
+    JOIN posts p ON p.id = t.id
+    JOIN users u ON u.id = p.user_id
+    GROUP BY u.id
+    ORDER BY SUM(length(t.content)) DESC, u.id
+'''
+
+@unittest.skipIf(numpy is None, "нужен пакет numpy")
+class PostSnapshotTest(unittest.TestCase):
+    """Снимок постов в NumPy совпадает с данными базы"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'blog.db'))
+        self.users = UserRepository(self.connection)
+        self.posts = PostRepository(self.connection)
+        self.user_ids = [self.users.add(f"Автор {n}", f"author{n}@x") for n in range(6)]
+        for n in range(40):
+            self.posts.add(f"Пост {n}", 'текст ' * (n % 7 + 1), self.user_ids[n % 5])
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def expected_top_authors(self, limit):
+        return [(name, posts, chars, round(chars / posts))
+                for name, posts, chars in self.connection.execute(TOP_AUTHORS_SQL)][:limit]
+    
+    def assert_matches_database(self, snapshot):
+        self.assertEqual(sorted(snapshot.columns['ids'].tolist()),
+                         [row[0] for row in self.connection.execute(
+                             "SELECT id FROM posts ORDER BY id")])
+        for limit in (1, 3, 100):
+            with self.subTest(limit=limit):
+                self.assertEqual(snapshot.top_authors(self.connection, limit),
+                                 self.expected_top_authors(limit))
+        posts, authors = self.connection.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT user_id) FROM posts"
+        ).fetchone()
+        summary = snapshot.summary()
+        self.assertEqual((summary['posts'], summary['authors']), (posts, authors))
+        self.assertEqual(sum(count for _, count, _ in snapshot.length_histogram()), posts)
+    
+    def test_incremental_refresh(self):
+        snapshot = PostSnapshot(fetch_size=7)
+        self.assertEqual(snapshot.refresh(self.connection), 40)
+        self.assert_matches_database(snapshot)
+        self.assertEqual(snapshot.refresh(self.connection), 0)
+        
+        # Новый пост, измененный текст, смена автора и удаление
+        self.posts.add('Новый', 'длинный текст ' * 50, self.user_ids[5])
+        self.posts.update(3, 'Пост 3', 'x', self.user_ids[3])
+        self.posts.set_author([4, 9], self.user_ids[0])
+        self.posts.delete_many([1, 2])
+        self.assertEqual(snapshot.refresh(self.connection), 4)
+        self.assert_matches_database(snapshot)
+        
+        # Пост удален вместе с автором
+        self.users.delete_many([self.user_ids[1]])
+        snapshot.refresh(self.connection)
+        self.assert_matches_database(snapshot)
+    
+    def test_reports_use_one_snapshot(self):
+        snapshot = PostSnapshot()
+        snapshot.refresh(self.connection)
+        expected = (snapshot.top_authors(self.connection, 3), snapshot.summary())
+        # Второй снимок без половины постов, как после refresh в другом потоке
+        keep = snapshot.columns['ids'] % 2 == 0
+        later = {name: values[keep] for name, values in snapshot.columns.items()}
+        
+        refreshed = RefreshedSnapshot()
+        refreshed.versions = [snapshot.columns, later]
+        self.assertEqual(refreshed.top_authors(self.connection, 3), expected[0])
+        refreshed.versions = [snapshot.columns, later]
+        self.assertEqual(refreshed.summary(), expected[1])
+
+class RefreshedSnapshot(PostSnapshot):
+    """Снимок, столбцы которого заменяются сразу после первого чтения"""
+    
+    @property
+    def columns(self):
+        return self.versions.pop(0) if len(self.versions) > 1 else self.versions[0]
+    
+    @columns.setter
+    def columns(self, value):
+        self.versions = [value]
+
+if __name__ == '__main__':
+    unittest.main()
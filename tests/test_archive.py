@@ -0,0 +1,84 @@
+import json
+import os
+import tempfile
+import unittest
+
+from blogdb import (
+    ArchiveRepository, PostArchiver, apply_migrations, compact_changelog, export_changes,
+    last_seq, open_database,
+)
+
+class PostArchiverTest(unittest.TestCase):
+    """Перенос постов в архив и его отражение в журнале изменений"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+        self.connection = open_database(self.db_name)
+        with self.connection:
+            self.connection.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+            self.connection.executemany(
+                "INSERT INTO posts (title, content, user_id, created_at) VALUES (?, ?, 1, ?)",
+                [('old', 'old text', '2020-05-01 10:00:00'),
+                 ('new', 'new text', '2024-05-01 10:00:00')]
+            )
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def archive(self, before='2023-01-01'):
+        archiver = PostArchiver(self.db_name, before)
+        for _ in archiver.run(self.connection):
+            pass
+        return archiver
+    
+    def changes(self, since):
+        path = os.path.join(self.directory.name, 'changes.jsonl')
+        export_changes(self.connection, path, since=since)
+        with open(path, encoding='utf-8') as file:
+            return [json.loads(line) for line in file]
+    
+    def test_archived_posts_are_exported_as_moved(self):
+        since = last_seq(self.connection)
+        archiver = self.archive()
+        self.assertEqual(archiver.periods, {'2020': 1})
+        records = self.changes(since)
+        self.assertEqual([(record['op'], record['id']) for record in records], [('A', 1)])
+        
+        # Удаление по-прежнему выгружается как D
+        since = last_seq(self.connection)
+        with self.connection:
+            self.connection.execute("DELETE FROM posts WHERE id = 2")
+        self.assertEqual([record['op'] for record in self.changes(since)], ['D'])
+    
+    def test_posts_without_iso_date_are_skipped(self):
+        with self.connection:
+            self.connection.executemany(
+                "INSERT INTO posts (title, content, user_id, created_at) VALUES (?, ?, 1, ?)",
+                [('empty', 'x', ''), ('junk', 'x', '1999-xx'), ('text', 'x', '12/05/2019')]
+            )
+        archiver = self.archive()
+        self.assertEqual((archiver.moved, archiver.skipped), (1, 3))
+        self.assertIn("пропущено постов без даты ГГГГ-ММ-ДД: 3", archiver.summary())
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0], 4)
+    
+    def test_archived_posts_stay_readable(self):
+        self.archive()
+        repository = ArchiveRepository(self.connection, self.db_name)
+        self.assertEqual(repository.posts_by_period().fetchall(),
+                         [('основная база', 1), ('2020', 1)])
+    
+    def test_migration_keeps_changelog_sequence(self):
+        seq = last_seq(self.connection)
+        compact_changelog(self.connection, seq)
+        with self.connection:
+            self.connection.execute("PRAGMA user_version = 8")
+        apply_migrations(self.connection)
+        self.assertEqual(last_seq(self.connection), seq)
+        with self.connection:
+            self.connection.execute("INSERT INTO users (name, email) VALUES ('B', 'b@x')")
+        self.assertEqual(last_seq(self.connection), seq + 1)
+
+if __name__ == '__main__':
+    unittest.main()
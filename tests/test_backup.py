@@ -0,0 +1,80 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from blogdb import (
+    PostRepository, UserRepository, create_snapshot, list_snapshots, open_database,
+    restore_snapshot,
+)
+from blogdb.backup import check_integrity
+
+class BackupTest(unittest.TestCase):
+    """Резервные копии: создание, проверка, хранение и восстановление"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+        self.backup_dir = os.path.join(self.directory.name, 'backups')
+        self.connection = open_database(self.db_name)
+        self.users = UserRepository(self.connection)
+        self.posts = PostRepository(self.connection)
+        self.user_id = self.users.add('Анна', 'anna@x')
+        self.post_id = self.posts.add('Пост', 'текст поста ' * 100, self.user_id)
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def snapshot(self, keep=10, **options):
+        path, backup = create_snapshot(self.connection, self.db_name, self.backup_dir,
+                                       keep=keep, **options)
+        return path, backup
+    
+    def test_snapshots_in_the_same_second_do_not_collide(self):
+        paths = [self.snapshot()[0] for _ in range(5)]
+        self.assertEqual(len(set(paths)), 5)
+        self.assertEqual(list_snapshots(self.db_name, self.backup_dir), paths)
+        self.assertEqual(sorted(os.listdir(self.backup_dir)),
+                         sorted(os.path.basename(path) for path in paths))
+        
+        # Старые копии сверх keep удаляются, копии другой базы не затрагиваются
+        other = os.path.join(self.backup_dir, 'blog-2-20200101-000000.db')
+        with open(other, 'wb'):
+            pass
+        path = self.snapshot(keep=2)[0]
+        self.assertEqual(list_snapshots(self.db_name, self.backup_dir), [paths[-1], path])
+        self.assertTrue(os.path.exists(other))
+    
+    def test_restore_round_trip(self):
+        path, backup = self.snapshot(pages=1, pause=0)
+        self.assertEqual(check_integrity(path), [])
+        self.assertGreater(backup.summary()['steps'], 1)
+        # Копия - самостоятельный файл без журнала WAL
+        self.assertFalse(os.path.exists(path + '-wal'))
+        
+        self.posts.update(self.post_id, 'Изменен', 'новый текст', self.user_id)
+        self.users.add('Борис', 'boris@x')
+        restore_snapshot(path, self.connection)
+        
+        self.assertEqual([row[1] for row in self.users.page(0, 10)], ['Анна'])
+        self.assertEqual(self.posts.content(self.post_id), 'текст поста ' * 100)
+        self.assertEqual(self.posts.get(self.post_id)[1], 'Пост')
+        self.assertEqual(self.connection.execute("PRAGMA integrity_check").fetchone()[0], 'ok')
+    
+    def test_damaged_snapshot_is_not_restored(self):
+        path = self.snapshot()[0]
+        # Пост без автора: копия не проходит foreign_key_check
+        damaged = sqlite3.connect(path)
+        damaged.execute("PRAGMA foreign_keys = OFF")
+        damaged.execute("UPDATE posts SET user_id = 99")
+        damaged.commit()
+        damaged.close()
+        self.assertEqual(len(check_integrity(path)), 1)
+        
+        with self.assertRaises(ValueError):
+            restore_snapshot(path, self.connection)
+        self.assertEqual(self.posts.get(self.post_id)[4], self.user_id)
+
+if __name__ == '__main__':
+    unittest.main()
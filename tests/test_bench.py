@@ -0,0 +1,37 @@
+import os
+import tempfile
+import unittest
+
+from blogdb import open_database
+from blogdb.bench import POSTS_PER_USER, generate
+
+class GenerateTest(unittest.TestCase):
+    """Синтетические данные замеров"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'bench.db'))
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def test_existing_database_is_topped_up(self):
+        self.assertEqual(generate(self.connection, 50, seed=1), 50 // POSTS_PER_USER)
+        # Повторный запуск с --db на меньшей базе догенерирует посты с тем же seed
+        self.assertEqual(generate(self.connection, 100, seed=1), 100 // POSTS_PER_USER)
+        users, emails = self.connection.execute(
+            "SELECT COUNT(*), COUNT(DISTINCT email) FROM users"
+        ).fetchone()
+        self.assertEqual((users, emails), (15, 15))
+        # Новые посты написаны новыми пользователями
+        authors = self.connection.execute(
+            "SELECT MIN(user_id), MAX(user_id) FROM posts WHERE id > 50"
+        ).fetchone()
+        self.assertGreater(authors[0], 5)
+        self.assertLessEqual(authors[1], 15)
+        self.assertEqual(self.connection.execute("SELECT COUNT(*) FROM posts").fetchone()[0],
+                         150)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from blogdb import (
+    check_integrity, open_database, pack_body, register_body_functions, unpack_body,
+)
+from blogdb.bodies import CODEC_PLAIN, CODEC_ZLIB
+
+class PostBodiesTest(unittest.TestCase):
+    """Сжатые тела постов и зависимость схемы от функций pack_body/unpack_body"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+        self.connection = open_database(self.db_name)
+        with self.connection:
+            self.connection.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+            self.connection.execute("INSERT INTO posts (title, content, user_id) "
+                                    "VALUES ('t', ?, 1)", ('текст ' * 100,))
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def test_pack_round_trip(self):
+        for text in ('', 'коротко', 'длинный текст ' * 200):
+            for codec in (CODEC_PLAIN, CODEC_ZLIB):
+                with self.subTest(length=len(text), codec=codec):
+                    self.assertEqual(unpack_body(pack_body(text, codec)), text)
+        self.assertEqual(pack_body('коротко', CODEC_ZLIB)[0], CODEC_PLAIN)
+    
+    def test_insert_moves_text_to_compressed_body(self):
+        content, body = self.connection.execute(
+            "SELECT p.content, b.body FROM posts p JOIN post_bodies b ON b.post_id = p.id"
+        ).fetchone()
+        self.assertEqual(content, '')
+        self.assertEqual(body[0], CODEC_ZLIB)
+        self.assertEqual(unpack_body(body), 'текст ' * 100)
+    
+    def test_plain_connection_needs_body_functions(self):
+        plain = sqlite3.connect(self.db_name)
+        try:
+            # Метаданные читаются без функций
+            self.assertEqual(plain.execute("SELECT title FROM posts").fetchall(), [('t',)])
+            for sql in ("INSERT INTO posts (title, content, user_id) VALUES ('t2', 'x', 1)",
+                        "SELECT content FROM post_texts"):
+                with self.subTest(sql=sql):
+                    with self.assertRaisesRegex(sqlite3.OperationalError, 'no such function'):
+                        plain.execute(sql).fetchall()
+            plain.rollback()
+            
+            register_body_functions(plain)
+            plain.execute("INSERT INTO posts (title, content, user_id) VALUES ('t2', 'x', 1)")
+            plain.commit()
+            self.assertEqual(plain.execute(
+                "SELECT content FROM post_texts WHERE title = 't2'"
+            ).fetchone(), ('x',))
+        finally:
+            plain.close()
+    
+    def test_integrity_check_works_without_body_functions(self):
+        self.assertEqual(check_integrity(self.db_name), [])
+
+if __name__ == '__main__':
+    unittest.main()
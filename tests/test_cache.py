@@ -0,0 +1,74 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from blogdb import ResultCache, connect, open_database
+
+class ResultCacheTest(unittest.TestCase):
+    """Отчеты из кэша не должны устаревать после изменений другими соединениями"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+        writer = open_database(self.db_name)
+        writer.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+        writer.commit()
+        self.writer = writer
+    
+    def tearDown(self):
+        self.writer.close()
+        self.directory.cleanup()
+    
+    def count_users(self, connection):
+        return connection.execute("SELECT COUNT(*) FROM users").fetchall()
+    
+    def test_new_connection_sees_change_of_other_process(self):
+        cache = ResultCache()
+        first = connect(self.db_name, read_only=True)
+        rows, stamp = cache.lookup(first, 'users', ('users',))
+        self.assertIsNone(rows)
+        cache.store('users', stamp, self.count_users(first))
+        first.close()
+        
+        # Другой процесс: соединение, о котором кэш ничего не знает
+        other = sqlite3.connect(self.db_name)
+        other.execute("INSERT INTO users (name, email) VALUES ('B', 'b@x')")
+        other.commit()
+        other.close()
+        
+        second = connect(self.db_name, read_only=True)
+        try:
+            rows, _ = cache.lookup(second, 'users', ('users',))
+            self.assertIsNone(rows)
+            self.assertEqual(self.count_users(second), [(2,)])
+        finally:
+            second.close()
+    
+    def test_same_connection_hits_cache_without_changes(self):
+        cache = ResultCache()
+        connection = connect(self.db_name, read_only=True)
+        try:
+            _, stamp = cache.lookup(connection, 'users', ('users',))
+            cache.store('users', stamp, self.count_users(connection))
+            rows, _ = cache.lookup(connection, 'users', ('users',))
+            self.assertEqual(rows, [(1,)])
+            
+            self.writer.execute("INSERT INTO users (name, email) VALUES ('B', 'b@x')")
+            self.writer.commit()
+            rows, _ = cache.lookup(connection, 'users', ('users',))
+            self.assertIsNone(rows)
+        finally:
+            connection.close()
+    
+    def test_closed_connections_are_not_kept(self):
+        cache = ResultCache()
+        connection = connect(self.db_name, read_only=True)
+        cache.lookup(connection, 'users', ('users',))
+        self.assertEqual(len(cache.data_versions), 1)
+        connection.close()
+        del connection
+        self.assertEqual(len(cache.data_versions), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,119 @@
+import json
+import os
+import tempfile
+import unittest
+
+from blogdb import (
+    ChangeQuery, apply_migrations, compact_changelog, compacted_through, connect,
+    export_changes, get_cursor, last_seq, open_database, save_cursor,
+)
+from blogdb.migrations import MIGRATIONS, migrate_changelog
+
+class ChangelogTest(unittest.TestCase):
+    """Журнал изменений: итоговая операция по строке, сжатие и начальное заполнение"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+        self.connection = open_database(self.db_name)
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def execute(self, *statements):
+        with self.connection:
+            for statement in statements:
+                self.connection.execute(statement)
+    
+    def changes(self, since, table='users'):
+        return [row[2:4] for row in
+                ChangeQuery(table).execute(self.connection, since, last_seq(self.connection))]
+    
+    def test_net_operation_per_row(self):
+        self.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')",
+                     "INSERT INTO users (name, email) VALUES ('B', 'b@x')",
+                     "INSERT INTO users (name, email) VALUES ('C', 'c@x')")
+        since = last_seq(self.connection)
+        self.execute(
+            # Добавлена и изменена: I
+            "INSERT INTO users (name, email) VALUES ('D', 'd@x')",
+            "UPDATE users SET name = 'D2' WHERE email = 'd@x'",
+            # Добавлена и удалена: не выгружается
+            "INSERT INTO users (name, email) VALUES ('E', 'e@x')",
+            "DELETE FROM users WHERE email = 'e@x'",
+            # Изменена дважды: U с последним значением
+            "UPDATE users SET name = 'A2' WHERE id = 1",
+            "UPDATE users SET name = 'A3' WHERE id = 1",
+            # Изменена и удалена: D
+            "UPDATE users SET name = 'B2' WHERE id = 2",
+            "DELETE FROM users WHERE id = 2",
+            # Присвоение того же значения не записывается
+            "UPDATE users SET name = 'C' WHERE id = 3",
+        )
+        self.assertEqual(self.changes(since), [('I', 4), ('U', 1), ('D', 2)])
+        rows = ChangeQuery('users', ['name']).execute(self.connection, since,
+                                                      last_seq(self.connection)).fetchall()
+        self.assertEqual([row[2:] for row in rows], [('I', 4, 'D2'), ('U', 1, 'A3'),
+                                                     ('D', 2, None)])
+    
+    def test_post_body_update_is_a_change(self):
+        self.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')",
+                     "INSERT INTO posts (title, content, user_id) VALUES ('t', 'old', 1)")
+        since = last_seq(self.connection)
+        self.execute("UPDATE posts SET content = 'new' WHERE id = 1")
+        self.assertEqual(self.changes(since, 'posts'), [('U', 1)])
+    
+    def test_export_after_compaction_requires_full_export(self):
+        self.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')",
+                     "INSERT INTO users (name, email) VALUES ('B', 'b@x')")
+        save_cursor(self.connection, 'mirror', 1)
+        save_cursor(self.connection, 'backup', 2)
+        # Сжатие до номера, выгруженного всеми получателями
+        self.assertEqual(compact_changelog(self.connection), 1)
+        self.assertEqual(compacted_through(self.connection), 1)
+        self.assertEqual(get_cursor(self.connection, 'mirror'), 1)
+        
+        path = os.path.join(self.directory.name, 'changes.jsonl')
+        with self.assertRaisesRegex(ValueError, 'полный экспорт'):
+            export_changes(self.connection, path, since=0)
+        count, until = export_changes(self.connection, path, since=1)
+        self.assertEqual((count, until), (1, 2))
+        with open(path, encoding='utf-8') as file:
+            record = json.loads(file.readline())
+        self.assertEqual((record['seq'], record['table'], record['op'], record['id']),
+                         (2, 'users', 'I', 2))
+        
+        # Номера после сжатия всего журнала не переиспользуются
+        self.assertEqual(compact_changelog(self.connection, 2), 1)
+        self.execute("INSERT INTO users (name, email) VALUES ('C', 'c@x')")
+        self.assertEqual(last_seq(self.connection), 3)
+    
+    def test_existing_rows_are_seeded_as_inserts(self):
+        # База, созданная до появления журнала: миграции до migrate_changelog
+        connection = connect(os.path.join(self.directory.name, 'old.db'))
+        try:
+            version = MIGRATIONS.index(migrate_changelog)
+            with connection:
+                for migration in MIGRATIONS[:version]:
+                    migration(connection)
+                connection.execute(f"PRAGMA user_version = {version}")
+                connection.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+                connection.execute("INSERT INTO users (name, email) VALUES ('B', 'b@x')")
+                connection.execute("INSERT INTO posts (title, content, user_id) "
+                                   "VALUES ('t', 'text', 2)")
+            apply_migrations(connection)
+            
+            self.assertEqual(connection.execute(
+                "SELECT table_name, row_id, op FROM changelog ORDER BY seq"
+            ).fetchall(), [('users', 1, 'I'), ('users', 2, 'I'), ('posts', 1, 'I')])
+            # Выгрузка с начала журнала равна полному экспорту
+            rows = ChangeQuery('posts', ['title', 'content']).execute(
+                connection, 0, last_seq(connection)
+            ).fetchall()
+            self.assertEqual([row[2:] for row in rows], [('I', 1, 't', 'text')])
+        finally:
+            connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,155 @@
+import csv
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from blogdb import ExportQuery, UserRepository, export_rows, open_database
+from blogdb.export import export_format, zstandard
+
+class ExportTest(unittest.TestCase):
+    """Постраничный экспорт: страницы, фильтры, столбцы, форматы и сжатие"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'blog.db'))
+        users = UserRepository(self.connection)
+        self.user_ids = [users.add(name, f"{name.lower()}@x") for name in ('Анна', 'Борис')]
+        with self.connection:
+            for n in range(7):
+                self.connection.execute(
+                    "INSERT INTO posts (title, content, user_id, created_at) VALUES (?, ?, ?, ?)",
+                    (f"Пост {n}", f"текст {n}" + (' про sqlite' if n % 3 == 0 else ''),
+                     self.user_ids[n % 2], f"2024-01-0{n + 1} 12:00:00")
+                )
+        self.post_ids = [row[0] for row in self.connection.execute(
+            "SELECT id FROM posts ORDER BY id")]
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+    
+    def ids(self, query):
+        return [row[0] for row in query.execute(self.connection)]
+    
+    def test_pages_cross_batch_boundaries(self):
+        for page_size, pages in ((1, 8), (3, 3), (7, 2), (8, 1), (100, 1)):
+            with self.subTest(page_size=page_size):
+                cursor = ExportQuery('posts', ['id'], page_size=page_size).execute(
+                    self.connection)
+                self.assertEqual([row[0] for row in cursor], self.post_ids)
+                # Полная последняя страница требует еще одного пустого запроса
+                self.assertEqual(cursor.pages, pages)
+        
+        # Пропуски в id не теряют строки на границе страницы
+        with self.connection:
+            self.connection.execute("DELETE FROM posts WHERE id IN (?, ?)",
+                                    (self.post_ids[2], self.post_ids[3]))
+        remaining = [post_id for post_id in self.post_ids if post_id not in self.post_ids[2:4]]
+        self.assertEqual(self.ids(ExportQuery('posts', ['id'], page_size=2)), remaining)
+    
+    def test_check_is_called_between_pages(self):
+        calls = []
+        
+        def check():
+            calls.append(len(calls))
+            if len(calls) == 3:
+                raise KeyboardInterrupt
+        
+        cursor = ExportQuery('posts', ['id'], page_size=2).execute(self.connection, check)
+        rows = []
+        with self.assertRaises(KeyboardInterrupt):
+            for row in cursor:
+                rows.append(row[0])
+        self.assertEqual(rows, self.post_ids[:4])
+    
+    def test_filters(self):
+        anna, boris = self.user_ids
+        cases = [
+            ({'user_id': anna}, self.post_ids[0::2]),
+            ({'user_id': boris, 'since': '2024-01-03'}, [self.post_ids[3], self.post_ids[5]]),
+            ({'since': '2024-01-03', 'until': '2024-01-05'}, self.post_ids[2:4]),
+            ({'contains': 'sqlite'}, self.post_ids[0::3]),
+            ({'contains': 'Пост 6', 'user_id': None, 'since': ''}, [self.post_ids[6]]),
+        ]
+        for filters, expected in cases:
+            with self.subTest(filters=filters):
+                self.assertEqual(self.ids(ExportQuery('posts', ['id'], filters, page_size=2)),
+                                 expected)
+        
+        self.assertEqual(self.ids(ExportQuery('users', ['id'], {'contains': 'борис'})),
+                         [boris])
+        authors = ExportQuery('posts_with_authors', ['id', 'author'], {'contains': 'Анна'})
+        self.assertEqual(self.ids(authors), self.post_ids[0::2])
+        
+        with self.assertRaises(ValueError):
+            ExportQuery('posts', filters={'author': 'Анна'})
+        with self.assertRaises(ValueError):
+            ExportQuery('users', filters={'user_id': anna}).sql()
+    
+    def test_columns(self):
+        query = ExportQuery('posts_with_authors', ['author', 'title', 'content'],
+                            {'user_id': self.user_ids[1]})
+        self.assertEqual(query.header, ['Author', 'Title', 'Content'])
+        self.assertEqual(list(query.execute(self.connection))[0], ('Борис', 'Пост 1', 'текст 1'))
+        self.assertNotIn('unpack_body', ExportQuery('posts', ['id', 'title']).sql())
+        self.assertEqual(ExportQuery('users').header, ['ID', 'Name', 'Email', 'Created At'])
+        for view, columns in (('users', ['title']), ('nope', None)):
+            with self.subTest(view=view), self.assertRaises(ValueError):
+                ExportQuery(view, columns)
+    
+    def test_formats(self):
+        query = ExportQuery('posts', ['id', 'title', 'content'], page_size=3)
+        expected = [[post_id, f"Пост {n}", f"текст {n}" + (' про sqlite' if n % 3 == 0 else '')]
+                    for n, post_id in enumerate(self.post_ids)]
+        
+        self.assertEqual(export_rows(self.connection, self.path('posts.csv'), query), 7)
+        with open(self.path('posts.csv'), newline='', encoding='utf-8') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(rows[0], ['ID', 'Title', 'Content'])
+        self.assertEqual(rows[1:], [[str(row[0])] + row[1:] for row in expected])
+        
+        export_rows(self.connection, self.path('posts.json'), query)
+        with open(self.path('posts.json'), encoding='utf-8') as file:
+            items = json.load(file)
+        self.assertEqual([[item['id'], item['title'], item['content']] for item in items],
+                         expected)
+        
+        export_rows(self.connection, self.path('posts.jsonl.gz'), query)
+        with gzip.open(self.path('posts.jsonl.gz'), 'rt', encoding='utf-8') as file:
+            items = [json.loads(line) for line in file]
+        self.assertEqual([item['id'] for item in items], self.post_ids)
+        
+        export_rows(self.connection, self.path('posts.CSV.GZ'), query)
+        with gzip.open(self.path('posts.CSV.GZ'), 'rt', newline='', encoding='utf-8') as file:
+            self.assertEqual(len(list(csv.reader(file))), 8)
+        
+        # Пустая выборка - корректный файл
+        empty = ExportQuery('posts', ['id'], {'user_id': 999})
+        self.assertEqual(export_rows(self.connection, self.path('empty.json'), empty), 0)
+        with open(self.path('empty.json'), encoding='utf-8') as file:
+            self.assertEqual(json.load(file), [])
+    
+    def test_format_by_extension(self):
+        cases = {
+            'a.csv': 'csv', 'a.csv.gz': 'csv', 'a.CSV.zst': 'csv', 'a.jsonl': 'jsonl',
+            'a.ndjson.gz': 'jsonl', 'a.json': 'json', 'a.json.gz': 'json', 'a.gz': 'json',
+        }
+        for filename, expected in cases.items():
+            with self.subTest(filename=filename):
+                self.assertEqual(export_format(filename), expected)
+    
+    @unittest.skipIf(zstandard is None, "нужен пакет zstandard")
+    def test_zstd(self):
+        query = ExportQuery('users')
+        export_rows(self.connection, self.path('users.csv.zst'), query)
+        with open(self.path('users.csv.zst'), 'rb') as file:
+            data = zstandard.ZstdDecompressor().stream_reader(file).read().decode('utf-8')
+        self.assertEqual(data.splitlines()[0], 'ID,Name,Email,Created At')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,149 @@
+import csv
+import io
+import json
+import os
+import tempfile
+import unittest
+
+from blogdb import BulkImporter, CsvSource, JsonSource, iter_json_array, open_database
+
+class IterJsonArrayTest(unittest.TestCase):
+    """Поэлементное чтение JSON-массива блоками"""
+    
+    ITEMS = [
+        {'name': 'Анна', 'email': 'a@x', 'tags': ['], [', '{"}'], 'id': 12345},
+        [1, 2.5, -3e2, None, True, False],
+        'строка с \\"кавычками\\" и ]',
+        9876543210,
+        {},
+        [],
+    ]
+    
+    def read(self, text, chunk_size):
+        return list(iter_json_array(io.StringIO(text), chunk_size=chunk_size))
+    
+    def test_values_split_at_every_block_boundary(self):
+        text = '  \n[ ' + ' ,\n '.join(json.dumps(item, ensure_ascii=False)
+                                       for item in self.ITEMS) + ' ]\n'
+        for chunk_size in range(1, len(text) + 1):
+            with self.subTest(chunk_size=chunk_size):
+                self.assertEqual(self.read(text, chunk_size), self.ITEMS)
+    
+    def test_empty_array(self):
+        for chunk_size in (1, 2, 64):
+            self.assertEqual(self.read(' [ ] ', chunk_size), [])
+    
+    def test_not_an_array(self):
+        with self.assertRaises(ValueError):
+            self.read('{"id": 1}', 4)
+    
+    def test_malformed_and_truncated_arrays(self):
+        for text in ('[{"id": 1}, {"id": }]', '[{"id": 1}, {"id": 2', '[1, 2'):
+            for chunk_size in (1, 3, 100):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    with self.assertRaises(json.JSONDecodeError):
+                        self.read(text, chunk_size)
+    
+    def test_separators_match_json_load(self):
+        cases = ('[1 2]', '[,,1]', '[,1]', '[1,]', '[1,,2]', '[1, 2,]', ',[1]', '[1] x', '[1]]',
+                 '[1;2]', '[,]', '[', '[1', '[1,', '[1 , 2 ]', ' [\t1,\r\n2\n] \n', '[[],{}]')
+        for text in cases:
+            try:
+                expected = json.loads(text)
+            except ValueError:
+                expected = None
+            for chunk_size in (1, 2, 3, 100):
+                with self.subTest(text=text, chunk_size=chunk_size):
+                    if expected is None:
+                        with self.assertRaises(ValueError):
+                            self.read(text, chunk_size)
+                    else:
+                        self.assertEqual(self.read(text, chunk_size), expected)
+
+class BulkImporterTest(unittest.TestCase):
+    """Импорт пакетами: отклоненные, пропущенные и вставленные строки"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'blog.db'))
+        self.reject_path = os.path.join(self.directory.name, 'rejected.csv')
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def write(self, name, text):
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        return path
+    
+    def run_import(self, table, source, batch_size=100):
+        importer = BulkImporter(table, batch_size=batch_size, reject_path=self.reject_path)
+        for _ in importer.run(self.connection, source):
+            pass
+        return importer
+    
+    def rejected_rows(self):
+        with open(self.reject_path, newline='', encoding='utf-8') as file:
+            return list(csv.reader(file))
+    
+    def count(self, table):
+        return self.connection.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    
+    def test_malformed_rows_are_rejected_with_line_numbers(self):
+        path = self.write('users.csv', 'ID,Name,Email,Created At\n'
+                                       '1,A,a@x,\n'
+                                       '2,B\n'
+                                       '3,,c@x,\n'
+                                       '4,D,d@x,\n'
+                                       '5,A again,a@x,\n')
+        importer = self.run_import('users', CsvSource(path), batch_size=2)
+        self.assertEqual((importer.processed, importer.inserted, importer.skipped,
+                          importer.rejected), (5, 2, 1, 2))
+        self.assertEqual(self.count('users'), 2)
+        rows = self.rejected_rows()
+        self.assertEqual(rows[0], ['Line', 'Reason', 'Data'])
+        self.assertEqual([(row[0], row[1]) for row in rows[1:]],
+                         [('3', 'недостаточно столбцов'), ('4', 'пустое имя или email')])
+        self.assertEqual(rows[1][2:], ['2', 'B'])
+    
+    def test_posts_without_author_are_skipped(self):
+        self.connection.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+        self.connection.commit()
+        path = self.write('posts.jsonl', '\n'.join(json.dumps(item) for item in [
+            {'title': 't1', 'content': 'c1', 'user_id': 1},
+            {'title': 't2', 'content': 'c2', 'user_id': 99},
+            {'title': 't3', 'content': 'c3', 'user_id': 'x'},
+        ]) + '\n')
+        importer = self.run_import('posts', JsonSource(path, 'posts'))
+        self.assertEqual((importer.inserted, importer.skipped, importer.rejected), (1, 1, 1))
+        self.assertEqual(self.count('posts'), 1)
+    
+    def test_failed_batch_falls_back_to_row_by_row_insert(self):
+        self.connection.execute("INSERT INTO users (name, email) VALUES ('A', 'a@x')")
+        self.connection.execute('''
+            CREATE TEMP TRIGGER reject_bad BEFORE INSERT ON main.posts
+            WHEN new.title = 'bad' BEGIN SELECT RAISE(ABORT, 'плохая строка'); END
+        ''')
+        self.connection.commit()
+        lines = [f'{i},{"bad" if i == 3 else f"t{i}"},text {i},{2 if i == 5 else 1},'
+                 for i in range(1, 8)]
+        path = self.write('posts.csv', 'ID,Title,Content,User ID,Created At\n'
+                                       + '\n'.join(lines) + '\n')
+        importer = self.run_import('posts', CsvSource(path), batch_size=4)
+        # Пакет со сбойной строкой откатывается целиком и вставляется поштучно
+        self.assertEqual((importer.processed, importer.inserted, importer.skipped,
+                          importer.rejected), (7, 5, 1, 1))
+        self.assertEqual(self.count('posts'), 5)
+        self.assertEqual(self.count('post_bodies'), 5)
+        rows = self.rejected_rows()
+        self.assertEqual((rows[1][0], rows[1][1]), ('4', 'плохая строка'))
+    
+    def test_malformed_json_lines_stop_import(self):
+        path = self.write('users.jsonl', '{"name": "A", "email": "a@x"}\n{"name": \n')
+        with self.assertRaisesRegex(ValueError, 'Строка 2'):
+            self.run_import('users', JsonSource(path, 'users'))
+
+if __name__ == '__main__':
+    unittest.main()
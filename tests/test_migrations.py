@@ -0,0 +1,56 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from blogdb import MIGRATIONS, PostRepository, UserRepository, has_table, migrations, open_database
+
+class FulltextMigrationTest(unittest.TestCase):
+    """Полнотекстовый поиск для базы, созданной SQLite без FTS5"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db_name = os.path.join(self.directory.name, 'blog.db')
+    
+    def tearDown(self):
+        self.directory.cleanup()
+    
+    def test_indexes_are_created_once_fts5_is_available(self):
+        # SQLite без FTS5: создание виртуальной таблицы завершается ошибкой
+        missing_module = ("CREATE VIRTUAL TABLE users_fts USING no_such_module (name)",)
+        with mock.patch.object(migrations, 'FTS_SCHEMA', missing_module), \
+             mock.patch.object(migrations, 'POST_TEXTS_FTS', missing_module[0]):
+            connection = open_database(self.db_name)
+            with connection:
+                connection.execute("INSERT INTO users (name, email) VALUES ('Анна', 'anna@x')")
+                connection.execute("INSERT INTO posts (title, content, user_id) "
+                                   "VALUES ('Первый', 'про sqlite', 1)")
+            self.assertFalse(has_table(connection, 'posts_fts'))
+            self.assertEqual(connection.execute("PRAGMA user_version").fetchone()[0],
+                             len(MIGRATIONS))
+            self.assertEqual(len(PostRepository(connection).search('sqlite').fetchall()), 1)
+            connection.close()
+        
+        connection = open_database(self.db_name)
+        try:
+            self.assertTrue(has_table(connection, 'users_fts'))
+            posts = PostRepository(connection)
+            self.assertTrue(posts.fts_enabled)
+            # Существующие строки проиндексированы
+            self.assertEqual([row[0] for row in posts.search('sqlite')], [1])
+            self.assertEqual([row[0] for row in UserRepository(connection).search('анна')], [1])
+            
+            # Триггеры поддерживают индекс при вставке, изменении и удалении
+            second = posts.add('Второй', 'про индексы', 1)
+            self.assertEqual([row[0] for row in posts.search('индексы')], [second])
+            posts.update(1, 'Первый', 'про fts5', 1)
+            self.assertEqual(posts.search('sqlite').fetchall(), [])
+            self.assertEqual([row[0] for row in posts.search('fts5')], [1])
+            with connection:
+                connection.execute("DELETE FROM posts WHERE id = ?", (second,))
+            self.assertEqual(posts.search('индексы').fetchall(), [])
+        finally:
+            connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+import os
+import tempfile
+import unittest
+
+from blogdb import PostRepository, UserRepository, build_fts_query, open_database
+
+class SearchTest(unittest.TestCase):
+    """Поиск пользователей и постов по индексу FTS5"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'blog.db'))
+        self.users = UserRepository(self.connection)
+        self.posts = PostRepository(self.connection)
+        self.user_id = self.users.add('Анна', 'anna@x')
+        self.users.add('Восклицательный!!!', 'loud@x')
+        self.post_id = self.posts.add('Про SQLite', 'индексы и запросы!!!', self.user_id)
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def test_words_are_matched_by_prefix(self):
+        self.assertTrue(self.users.fts_enabled and self.posts.fts_enabled)
+        self.assertEqual([row[0] for row in self.users.search('анн')], [self.user_id])
+        rows = self.posts.search('sqlite индекс').fetchall()
+        self.assertEqual([(row[0], row[1], row[2]) for row in rows],
+                         [(self.post_id, 'Про [SQLite]', 'Анна')])
+    
+    def test_input_without_words_does_not_break_fts(self):
+        for keyword in ('!!!', '  ', '"*"'):
+            with self.subTest(keyword=keyword):
+                self.assertEqual(build_fts_query(keyword), '')
+                # Вместо синтаксической ошибки FTS5 - поиск подстроки
+                users = self.users.search(keyword).fetchall()
+                posts = self.posts.search(keyword).fetchall()
+                if keyword == '!!!':
+                    self.assertEqual([row[1] for row in users], ['Восклицательный!!!'])
+                    self.assertEqual([row[0] for row in posts], [self.post_id])
+                else:
+                    self.assertEqual((users, posts), ([], []))
+
+if __name__ == '__main__':
+    unittest.main()
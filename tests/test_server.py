@@ -0,0 +1,144 @@
+import asyncio
+import http.client
+import json
+import os
+import tempfile
+import threading
+import unittest
+from urllib.parse import quote
+
+from blogdb.server import BlogServer
+
+class BlogServerTest(unittest.TestCase):
+    """HTTP API на запущенном сервере: страницы, ошибки запросов и поиск"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = BlogServer(os.path.join(self.directory.name, 'blog.db'), readers=2)
+        # Сервер работает в своем цикле событий, запросы отправляются из теста
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        listener = self.call(self.server.start('127.0.0.1', 0))
+        self.port = listener.sockets[0].getsockname()[1]
+    
+    def tearDown(self):
+        self.call(self.finish_connections())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.server.close()
+        self.loop.close()
+        self.directory.cleanup()
+    
+    def call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result(10)
+    
+    async def finish_connections(self):
+        """Ожидание обработчиков соединений, закрытых клиентом"""
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        if tasks:
+            await asyncio.wait(tasks, timeout=5)
+    
+    def request(self, method, path, data=None, body=None):
+        """Статус, заголовки и тело ответа (объект JSON или список строк JSON Lines)"""
+        if data is not None:
+            body = json.dumps(data).encode('utf-8')
+        connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=10)
+        try:
+            connection.request(method, path, body, {'Connection': 'close'})
+            response = connection.getresponse()
+            payload = response.read().decode('utf-8')
+        finally:
+            connection.close()
+        if response.getheader('Content-Type', '').startswith('application/x-ndjson'):
+            payload = [json.loads(line) for line in payload.splitlines()]
+        elif payload:
+            payload = json.loads(payload)
+        return response.status, response.headers, payload
+    
+    def add_user(self, name, email):
+        status, headers, payload = self.request('POST', '/users',
+                                                {'name': name, 'email': email})
+        self.assertEqual(status, 201, payload)
+        self.assertEqual(headers['Location'], f"/users/{payload['id']}")
+        return payload['id']
+    
+    def test_users_are_paged_by_id(self):
+        ids = [self.add_user(f"Пользователь {n}", f"user{n}@x") for n in range(5)]
+        seen, path = [], '/users?limit=2'
+        while path:
+            status, headers, rows = self.request('GET', path)
+            self.assertEqual(status, 200)
+            self.assertLessEqual(len(rows), 2)
+            seen.extend(row['id'] for row in rows)
+            after = headers['X-Next-After']
+            path = f'/users?limit=2&after={after}' if after else None
+        self.assertEqual(seen, ids)
+        
+        status, _, user = self.request('GET', f'/users/{ids[0]}')
+        self.assertEqual((status, user['name'], user['email']),
+                         (200, 'Пользователь 0', 'user0@x'))
+    
+    def test_invalid_requests_are_rejected(self):
+        user_id = self.add_user('Анна', 'anna@x')
+        cases = [
+            ('POST', '/users', {'name': '  ', 'email': 'blank@x'}, 400),
+            ('POST', '/users', {'name': 'Без email'}, 400),
+            ('POST', '/users', [1, 2], 400),
+            ('PUT', f'/users/{user_id}', {'name': 'Анна', 'email': ' \t'}, 400),
+            ('POST', '/posts', {'title': 'Заголовок', 'content': 'Текст', 'user_id': 'x'}, 400),
+            ('GET', '/users?limit=-1', None, 400),
+            ('GET', '/users?after=abc', None, 400),
+            ('GET', '/search/posts?q=%20', None, 400),
+            ('GET', '/users/999', None, 404),
+            ('PUT', '/users/999', {'name': 'Нет', 'email': 'no@x'}, 404),
+            ('DELETE', '/posts/999', None, 404),
+            ('GET', '/no-such-resource', None, 404),
+            ('PATCH', '/users', None, 405),
+            ('POST', '/users', {'name': 'Анна', 'email': 'anna@x'}, 409),
+            ('POST', '/posts', {'title': 'Заголовок', 'content': 'Текст', 'user_id': 999},
+             409),
+        ]
+        for method, path, data, expected in cases:
+            with self.subTest(method=method, path=path, data=data):
+                status, _, payload = self.request(method, path, data)
+                self.assertEqual(status, expected)
+                self.assertIn('error', payload)
+        
+        status, _, user = self.request('GET', f'/users/{user_id}')
+        self.assertEqual((status, user['name']), (200, 'Анна'))
+        status, _, rows = self.request('GET', '/users')
+        self.assertEqual([row['id'] for row in rows], [user_id])
+    
+    def test_request_body_values_are_stripped(self):
+        user_id = self.add_user('  Борис ', ' boris@x ')
+        _, _, user = self.request('GET', f'/users/{user_id}')
+        self.assertEqual((user['name'], user['email']), ('Борис', 'boris@x'))
+    
+    def test_search(self):
+        user_id = self.add_user('Анна', 'anna@x')
+        status, _, payload = self.request('POST', '/posts', {
+            'title': 'Про SQLite', 'content': 'индексы и запросы', 'user_id': user_id,
+        })
+        self.assertEqual(status, 201)
+        post_id = payload['id']
+        
+        status, _, rows = self.request('GET', '/search/posts?q=sqlite')
+        self.assertEqual(status, 200)
+        self.assertEqual([(row['id'], row['title'], row['author']) for row in rows],
+                         [(post_id, 'Про [SQLite]', 'Анна')])
+        # Ввод без слов не приводит к ошибке FTS5
+        for path in ('/search/users?q=!!!', '/search/posts?q=!!!'):
+            with self.subTest(path=path):
+                self.assertEqual(self.request('GET', path)[:3:2], (200, []))
+        
+        # Кэшированный результат поиска устаревает после изменения
+        self.assertEqual(len(self.request('GET', '/search/users?q=' + quote('анн'))[2]), 1)
+        self.add_user('Анника', 'annika@x')
+        self.assertEqual(len(self.request('GET', '/search/users?q=' + quote('анн'))[2]), 2)
+        status, _, _ = self.request('DELETE', f'/posts/{post_id}')
+        self.assertEqual(status, 204)
+        self.assertEqual(self.request('GET', '/search/posts?q=sqlite')[2], [])
+
+if __name__ == '__main__':
+    unittest.main()
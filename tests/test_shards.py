@@ -0,0 +1,51 @@
+import os
+import tempfile
+import unittest
+
+from blogdb import REJECT_SUFFIX, ShardImporter, find_shards, open_database
+
+class FindShardsTest(unittest.TestCase):
+    """Выбор файлов для импорта из каталога и по шаблону"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+    
+    def tearDown(self):
+        self.directory.cleanup()
+    
+    def write(self, name, text):
+        path = os.path.join(self.path, name)
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write(text)
+        return path
+    
+    def test_reject_reports_are_not_imported(self):
+        data = self.write('1.csv', 'ID,Name,Email,Created At\n1,A,a@x,\n2,,b@x,\n')
+        self.write('2.jsonl', '{"name": "C", "email": "c@x"}\n')
+        self.write('notes.txt', 'не данные')
+        # Отчеты прошлых импортов: каталога и отдельного файла
+        self.write('users' + REJECT_SUFFIX, 'Line,Reason,Data\n1.csv:3,пустое имя или email,2\n')
+        self.write('1.csv' + REJECT_SUFFIX, 'Line,Reason,Data\n3,пустое имя или email,2\n')
+        expected = [data, os.path.join(self.path, '2.jsonl')]
+        self.assertEqual(find_shards(self.path), expected)
+        self.assertEqual(find_shards(os.path.join(self.path, '*.csv')), [data])
+    
+    def test_repeated_directory_import_skips_previous_report(self):
+        self.write('1.csv', 'ID,Name,Email,Created At\n1,A,a@x,\n2,,b@x,\n')
+        connection = open_database(os.path.join(self.path, 'blog.db'))
+        try:
+            for _ in range(2):
+                importer = ShardImporter('users', workers=1, reject_path=os.path.join(
+                    self.path, 'users' + REJECT_SUFFIX))
+                for _ in importer.run(connection, find_shards(self.path)):
+                    pass
+                self.assertEqual(importer.done, 1)
+                self.assertEqual(importer.rejected, 1)
+            names = [row[0] for row in connection.execute("SELECT name FROM users")]
+            self.assertEqual(names, ['A'])
+        finally:
+            connection.close()
+
+if __name__ == '__main__':
+    unittest.main()
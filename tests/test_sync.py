@@ -0,0 +1,71 @@
+import os
+import tempfile
+import unittest
+
+from blogdb import CsvSource, SyncImporter, open_database
+
+class SyncUsersTest(unittest.TestCase):
+    """Синхронизация пользователей с файлом: ID из файла и назначенные ID"""
+    
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.connection = open_database(os.path.join(self.directory.name, 'blog.db'))
+    
+    def tearDown(self):
+        self.connection.close()
+        self.directory.cleanup()
+    
+    def sync(self, lines, **options):
+        path = os.path.join(self.directory.name, 'users.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write('ID,Name,Email,Created At\n' + ''.join(line + '\n' for line in lines))
+        importer = SyncImporter('users', **options)
+        for _ in importer.run(self.connection, CsvSource(path)):
+            pass
+        return importer
+    
+    def users(self):
+        return self.connection.execute("SELECT id, name, email FROM users ORDER BY id").fetchall()
+    
+    def test_assigned_id_does_not_collide_with_later_explicit_id(self):
+        importer = self.sync([',A,a@x,', '1,C,c@x,'])
+        self.assertEqual(self.users(), [(1, 'C', 'c@x'), (2, 'A', 'a@x')])
+        self.assertEqual((importer.inserted, importer.updated, importer.skipped), (2, 0, 0))
+    
+    def test_taken_and_repeated_ids_are_reassigned(self):
+        self.sync(['5,A,a@x,'])
+        importer = self.sync(['5,B,b@x,', '7,C,c@x,', '7,D,d@x,', '5,A2,a@x,'])
+        self.assertEqual(self.users(), [(5, 'A2', 'a@x'), (7, 'C', 'c@x'),
+                                        (8, 'B', 'b@x'), (9, 'D', 'd@x')])
+        self.assertEqual((importer.inserted, importer.updated, importer.unchanged), (3, 1, 0))
+    
+    def test_repeated_sync_is_unchanged(self):
+        lines = [',A,a@x,', '3,B,b@x,']
+        self.sync(lines)
+        importer = self.sync(lines, delete_missing=True)
+        self.assertEqual((importer.inserted, importer.updated, importer.unchanged,
+                          importer.deleted), (0, 0, 2, 0))
+    
+    def test_fast_mode_covers_the_merge(self):
+        synchronous = self.connection.execute("PRAGMA synchronous").fetchone()[0]
+        
+        class RecordingImporter(SyncImporter):
+            def merge(self):
+                self.merge_synchronous = self.connection.execute(
+                    "PRAGMA synchronous").fetchone()[0]
+                super().merge()
+        
+        path = os.path.join(self.directory.name, 'users.csv')
+        with open(path, 'w', encoding='utf-8', newline='') as file:
+            file.write('ID,Name,Email,Created At\n,A,a@x,\n')
+        importer = RecordingImporter('users', fast=True)
+        for _ in importer.run(self.connection, CsvSource(path)):
+            pass
+        self.assertEqual(importer.merge_synchronous, 0)
+        self.assertEqual(importer.inserted, 1)
+        self.assertNotEqual(synchronous, 0)
+        self.assertEqual(self.connection.execute("PRAGMA synchronous").fetchone()[0],
+                         synchronous)
+
+if __name__ == '__main__':
+    unittest.main()